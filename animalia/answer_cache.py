@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""AnswerCache is an in-process cache of answers to queries.
+
+Answers are only valid for the knowledge base they were computed from. Every entry is
+therefore tagged with the knowledge base generation, a counter that FactManager increments
+whenever facts are added or deleted. Looking up or storing an answer for a newer generation
+discards all entries of older generations, so stale answers are never served. Least recently
+used entries are evicted once the cache grows beyond its configured size.
+
+"""
+
+from __future__ import unicode_literals
+
+import collections
+import logging
+import threading
+
+
+logger = logging.getLogger('animalia.AnswerCache')
+
+
+class AnswerCache(object):
+    __doc__ = __doc__
+
+    def __init__(self, max_entries=None):
+        """
+        :type max_entries: int
+        :arg max_entries: optional maximum number of cached answers
+        """
+        self.max_entries = max_entries
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._answers = collections.OrderedDict()
+
+    def get(self, question, generation):
+        """Look up cached answer to question.
+
+        :rtype: (bool, object)
+        :return: (True, answer) if answer is cached for generation, (False, None) otherwise;
+          answer itself may be None for questions that could not be answered
+
+        :type question: unicode
+        :arg question: normalized question
+
+        :type generation: int
+        :arg generation: current knowledge base generation
+
+        """
+        with self._lock:
+            self._advance_generation(generation)
+            if generation == self.generation and question in self._answers:
+                answer = self._answers.pop(question)
+                self._answers[question] = answer
+                self.hits += 1
+                return True, answer
+            self.misses += 1
+            return False, None
+
+    def set(self, question, generation, answer):
+        """Cache answer to question computed from specified knowledge base generation.
+
+        Answers computed from a generation older than the latest known generation are ignored.
+
+        :type question: unicode
+        :arg question: normalized question
+
+        :type generation: int
+        :arg generation: knowledge base generation that answer was computed from
+
+        :type answer: object
+        :arg answer: answer to question
+
+        """
+        with self._lock:
+            self._advance_generation(generation)
+            if generation != self.generation:
+                return
+            self._answers.pop(question, None)
+            self._answers[question] = answer
+            if self.max_entries and len(self._answers) > self.max_entries:
+                self._answers.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached answers and reset hit and miss counts.
+        """
+        with self._lock:
+            self._answers.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Summarize cache usage.
+
+        :rtype: dict
+        :return: dict with keys 'entries', 'generation', 'hits', 'misses' and 'hit_rate'
+
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._answers),
+                    'generation': self.generation,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'hit_rate': float(self.hits) / lookups if lookups else 0.0}
+
+
+    # private methods
+
+    def _advance_generation(self, generation):
+        """Discard all entries if generation is newer than generation of cached answers.
+        """
+        if generation > self.generation:
+            if self._answers:
+                logger.debug("Discarding {0} answers of generation {1}".format(
+                        len(self._answers), self.generation))
+            self._answers.clear()
+            self.generation = generation
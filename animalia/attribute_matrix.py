@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""AttributeMatrix is a sparse concept-by-attribute matrix of persisted relationships.
+
+An attribute is a relationship type with an object, e.g. ('eat', 'bugs') or ('is', 'mammals'),
+and its column holds the rows of the concepts that have it, with the count of each
+relationship, e.g. 4 for 'otter has four legs'. Columns are stored as NumPy arrays, so that
+which-animal and how-many queries are evaluated as vectorized operations on boolean masks with
+one element per concept: a relationship condition sets the rows of matching columns, a negated
+condition inverts the mask, the concept type condition ANDs the mask of concepts of the type,
+and counting is a sum. No relationships are loaded to answer queries.
+
+Concept types are matched transitively, as in FactQuery and QueryCompiler: the mask of a
+concept type ORs the 'is' columns of the type and of all concept types that are, directly or
+transitively, of the type; see ConceptHierarchy.
+
+The matrix is loaded from the database on first use and kept current by applying changes as
+they are committed; see fact_model.add_commit_listener.
+
+"""
+
+from __future__ import unicode_literals
+
+import collections
+import logging
+import threading
+
+import numpy as np
+
+from concept_hierarchy import ConceptHierarchy
+import fact_model
+
+
+logger = logging.getLogger('animalia.AttributeMatrix')
+
+
+class AttributeColumn(object):
+    """Concepts having one attribute, with counts of their relationships.
+    """
+    __slots__ = ('counts', '_arrays')
+
+    # Count stored for relationships without count
+    no_count = -1
+
+    def __init__(self):
+        # row -> count of relationship, or None
+        self.counts = {}
+        self._arrays = None
+
+    def add(self, row, count):
+        self.counts[row] = count
+        self._arrays = None
+
+    def remove(self, row):
+        self.counts.pop(row, None)
+        self._arrays = None
+
+    def rows(self, count=None):
+        """Rows of concepts having attribute, optionally only those with specified count.
+
+        :rtype: :py:class:`numpy.ndarray`
+        :return: array of row numbers
+
+        """
+        if self._arrays is None:
+            items = self.counts.items()
+            self._arrays = (
+                np.fromiter((row for row, c in items), dtype=np.int64, count=len(items)),
+                np.fromiter((self.no_count if c is None else c for row, c in items),
+                            dtype=np.int64, count=len(items)))
+        rows, counts = self._arrays
+        if count is not None:
+            rows = rows[counts == count]
+        return rows
+
+
+class AttributeMatrix(object):
+    __doc__ = __doc__
+
+    # Matrix shared by all callers in process; see get_matrix
+    _matrix = None
+    _matrix_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+        # Concept rows: name -> row and row -> name
+        self._rows = {}
+        self._concept_names = []
+
+        # Names of relationship types, including synonyms -> persisted relationship_type_id
+        self._relationship_type_ids = {}
+
+        # (relationship_type_id, object row) -> AttributeColumn
+        self._columns = {}
+        # relationship_type_id -> set of object rows that have columns
+        self._objects_by_type = collections.defaultdict(set)
+
+    @classmethod
+    def get_matrix(cls):
+        """Get matrix shared by all callers in current process, loading it if necessary.
+
+        :rtype: :py:class:`AttributeMatrix`
+        :return: shared matrix
+
+        """
+        with cls._matrix_lock:
+            if cls._matrix is None:
+                matrix = cls.load()
+                fact_model.add_commit_listener(matrix.apply_changes)
+                cls._matrix = matrix
+            return cls._matrix
+
+    @classmethod
+    def reset(cls):
+        """Discard shared matrix; it is reloaded from database on next call to get_matrix.
+        """
+        with cls._matrix_lock:
+            if cls._matrix is not None:
+                fact_model.remove_commit_listener(cls._matrix.apply_changes)
+            cls._matrix = None
+
+    @classmethod
+    def load(cls):
+        """Create matrix from persisted relationship types and relationships.
+
+        :rtype: :py:class:`AttributeMatrix`
+        :return: newly loaded matrix
+
+        """
+        matrix = cls()
+        for name, relationship_type_id in fact_model.RelationshipType.select_name_id_pairs():
+            matrix.add_relationship_type(name, relationship_type_id)
+        for record in fact_model.Relationship.select_records():
+            matrix.add_relationship(record)
+        logger.info("Loaded attribute matrix: {0}".format(matrix.stats()))
+        return matrix
+
+    def add_relationship_type(self, relationship_type_name, relationship_type_id):
+        """Add relationship type name; synonyms share relationship_type_id.
+
+        :type relationship_type_name: unicode
+        :arg relationship_type_name: name of relationship type, e.g. 'is a'
+
+        :type relationship_type_id: int
+        :arg relationship_type_id: persisted id of relationship type
+
+        """
+        with self._lock:
+            self._relationship_type_ids[relationship_type_name] = relationship_type_id
+
+    def add_relationship(self, record):
+        """Set attribute of subject, or update count of existing attribute.
+
+        :type record: :py:class:`fact_model.RelationshipRecord`
+        :arg record: data of persisted relationship
+
+        """
+        with self._lock:
+            subject = self._row(record.subject_name)
+            obj = self._row(record.object_name)
+            key = (record.relationship_type_id, obj)
+            column = self._columns.get(key)
+            if column is None:
+                column = self._columns[key] = AttributeColumn()
+                self._objects_by_type[record.relationship_type_id].add(obj)
+            column.add(subject, record.count)
+
+    def remove_relationship(self, record):
+        """Clear attribute of subject if set.
+
+        :type record: :py:class:`fact_model.RelationshipRecord`
+        :arg record: data of deleted relationship
+
+        """
+        with self._lock:
+            subject = self._rows.get(record.subject_name)
+            obj = self._rows.get(record.object_name)
+            key = (record.relationship_type_id, obj)
+            column = self._columns.get(key)
+            if column is None or subject is None:
+                return
+            column.remove(subject)
+            if not column.counts:
+                del self._columns[key]
+                self._objects_by_type[record.relationship_type_id].discard(obj)
+
+    def apply_changes(self, changes):
+        """Apply committed changes to matrix.
+
+        :type changes: :py:class:`fact_model.CommittedChanges`
+        :arg changes: relationship types and relationships saved or deleted by commit
+
+        """
+        with self._lock:
+            for name, relationship_type_id in changes.saved_relationship_types:
+                self.add_relationship_type(name, relationship_type_id)
+            for record in changes.deleted_relationships:
+                self.remove_relationship(record)
+            for record in changes.saved_relationships:
+                self.add_relationship(record)
+
+    def concept_names(self, mask):
+        """Get names of concepts selected by mask.
+
+        :rtype: [unicode, ...]
+        :return: names of concepts whose rows are set in mask
+
+        :type mask: :py:class:`numpy.ndarray`
+        :arg mask: boolean mask returned by which_animal_mask
+
+        """
+        with self._lock:
+            return [self._concept_names[row] for row in np.flatnonzero(mask)]
+
+    def which_animal_mask(self, parsed_query, subject_type='animals', object_is_species=False):
+        """Select concepts of subject_type that match relationship of 'which animals' query.
+
+        Equivalent of :py:meth:`query_compiler.QueryCompiler.compile_which_animal_query`.
+
+        :rtype: :py:class:`numpy.ndarray`
+        :return: boolean mask with one element per concept; see concept_names
+
+        :type parsed_query: :py:class:`ParsedSentence`
+        :arg parsed_query: parsed 'which animals' query
+
+        :type subject_type: unicode
+        :arg subject_type: concept type of animals to select, e.g. 'animals' or 'reptiles'
+
+        :type object_is_species: bool
+        :arg object_is_species: True if parsed object is a species, e.g. 'reptiles'
+
+        """
+        relationship_number = parsed_query.relationship_number
+        if relationship_number:
+            relationship_number = int(relationship_number)
+        else:
+            relationship_number = None
+
+        with self._lock:
+            relationship_type_id = self._relationship_type_ids.get(
+                parsed_query.relationship_type_name)
+            objects = set()
+            obj = self._rows.get(parsed_query.object_name)
+            if obj is not None:
+                objects.add(obj)
+            if object_is_species:
+                objects.update(self._rows_of_type(
+                        self._objects_by_type.get(relationship_type_id, ()),
+                        parsed_query.object_name))
+            mask = self._columns_mask(relationship_type_id, objects, relationship_number)
+            if parsed_query.relationship_negation:
+                np.logical_not(mask, out=mask)
+            mask &= self.type_mask(subject_type)
+            return mask
+
+    def stats(self):
+        """Summarize size of matrix.
+
+        :rtype: dict
+        :return: dict with keys 'concepts', 'attributes' and 'relationships'
+
+        """
+        with self._lock:
+            return {'concepts': len(self._concept_names),
+                    'attributes': len(self._columns),
+                    'relationships': sum(len(c.counts) for c in self._columns.itervalues())}
+
+    def type_mask(self, concept_type):
+        """Select concepts that are, directly or transitively, of concept_type.
+
+        :rtype: :py:class:`numpy.ndarray`
+        :return: boolean mask with one element per concept
+
+        :type concept_type: unicode
+        :arg concept_type: name of concept type, e.g. 'animals' or 'reptiles'
+
+        """
+        with self._lock:
+            is_type_id = self._relationship_type_ids.get('is')
+            concept_types = set()
+            row = self._rows.get(concept_type)
+            if row is not None:
+                concept_types.add(row)
+            if concept_type not in ConceptHierarchy.meta_types:
+                concept_types.update(self._rows_of_type(
+                        self._objects_by_type.get(is_type_id, ()), concept_type))
+            return self._columns_mask(is_type_id, concept_types)
+
+
+    # private methods
+
+    def _columns_mask(self, relationship_type_id, objects, relationship_number=None):
+        """OR columns of relationship type with any of objects into new mask.
+        """
+        mask = np.zeros(len(self._concept_names), dtype=bool)
+        for obj in objects:
+            column = self._columns.get((relationship_type_id, obj))
+            if column is not None:
+                mask[column.rows(relationship_number)] = True
+        return mask
+
+    def _row(self, concept_name):
+        row = self._rows.get(concept_name)
+        if row is None:
+            row = self._rows[concept_name] = len(self._concept_names)
+            self._concept_names.append(concept_name)
+        return row
+
+    def _rows_of_type(self, rows, concept_type):
+        """Rows among rows whose concepts are, directly or transitively, of concept_type.
+        """
+        hierarchy = ConceptHierarchy.get_hierarchy()
+        return [row for row in rows if hierarchy.is_a(self._concept_names[row], concept_type)]
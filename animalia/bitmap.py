@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Bitmap is a compressed set of non-negative ints, used for posting lists of concept ids.
+
+Ints are partitioned by their high 16 bits into containers of up to 65536 values, as in
+Roaring bitmaps. A container with few values is a sorted array of their low 16 bits, at two
+bytes per value; a container with more than 4096 values, where the array would be larger, is
+an 8 KiB bitset. Sparse posting lists therefore cost little more than their values, and dense
+ones one bit per possible value.
+
+Intersection (&), union (|) and difference (-) are evaluated container by container: array
+containers with set operations on their values, bitsets as single operations on Python longs.
+Cardinality is kept per container, so len() is a sum over containers.
+
+"""
+
+from __future__ import unicode_literals
+
+import array
+import binascii
+import bisect
+
+
+# Values per container and maximum number of values kept as sorted array
+_CONTAINER_BITS = 16
+_CONTAINER_SIZE = 1 << _CONTAINER_BITS
+_LOW_MASK = _CONTAINER_SIZE - 1
+_ARRAY_MAX = 4096
+
+# Positions of set bits in each byte value
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte & (1 << bit)) for byte in range(256)]
+
+
+class _BitsetContainer(object):
+    """Container of more than _ARRAY_MAX values as bitset of _CONTAINER_SIZE bits.
+    """
+    __slots__ = ('bits', 'cardinality')
+
+    def __init__(self, bits=None, cardinality=0):
+        self.bits = bits if bits is not None else bytearray(_CONTAINER_SIZE // 8)
+        self.cardinality = cardinality
+
+    def __contains__(self, low):
+        return bool(self.bits[low >> 3] & (1 << (low & 7)))
+
+    def __iter__(self):
+        for i, byte in enumerate(self.bits):
+            if byte:
+                for bit in _BYTE_BITS[byte]:
+                    yield (i << 3) | bit
+
+    def __len__(self):
+        return self.cardinality
+
+    def add(self, low):
+        if low not in self:
+            self.bits[low >> 3] |= 1 << (low & 7)
+            self.cardinality += 1
+
+    def copy(self):
+        return _BitsetContainer(bytearray(self.bits), self.cardinality)
+
+    def discard(self, low):
+        if low in self:
+            self.bits[low >> 3] &= ~(1 << (low & 7)) & 0xff
+            self.cardinality -= 1
+
+    def to_long(self):
+        return long(binascii.hexlify(bytes(self.bits[::-1])), 16)
+
+
+def _array_container(values):
+    """Create array container from sorted low values.
+    """
+    return array.array(b'H', values)
+
+def _container_from_long(value):
+    """Create container holding set bits of value; None if no bits are set.
+    """
+    cardinality = bin(value).count('1')
+    if not cardinality:
+        return None
+    digits = '{0:x}'.format(value).zfill(_CONTAINER_SIZE // 4)
+    bitset = _BitsetContainer(bytearray(binascii.unhexlify(digits))[::-1], cardinality)
+    if cardinality <= _ARRAY_MAX:
+        return _array_container(bitset)
+    return bitset
+
+def _container_from_values(values):
+    """Create container holding sorted low values; None if values are empty.
+    """
+    if not values:
+        return None
+    if len(values) <= _ARRAY_MAX:
+        return _array_container(values)
+    bitset = _BitsetContainer()
+    for low in values:
+        bitset.add(low)
+    return bitset
+
+def _container_to_long(container):
+    if isinstance(container, _BitsetContainer):
+        return container.to_long()
+    bitset = _BitsetContainer()
+    for low in container:
+        bitset.add(low)
+    return bitset.to_long()
+
+def _copy_container(container):
+    if isinstance(container, _BitsetContainer):
+        return container.copy()
+    return _array_container(container)
+
+
+class Bitmap(object):
+    __doc__ = __doc__
+    __slots__ = ('_containers',)
+
+    def __init__(self, values=()):
+        """
+        :type values: iterable of int
+        :arg values: optional initial values
+        """
+        # high 16 bits -> container of low 16 bits
+        self._containers = {}
+        for value in values:
+            self.add(value)
+
+    @classmethod
+    def union(cls, bitmaps):
+        """Union of any number of bitmaps.
+
+        :rtype: :py:class:`Bitmap`
+        :return: new bitmap holding values of all bitmaps
+
+        :type bitmaps: iterable of :py:class:`Bitmap`
+        :arg bitmaps: bitmaps to combine
+
+        """
+        by_high = {}
+        for bitmap in bitmaps:
+            for high, container in bitmap._containers.iteritems():
+                by_high.setdefault(high, []).append(container)
+        result = cls()
+        for high, containers in by_high.iteritems():
+            if len(containers) == 1:
+                result._containers[high] = _copy_container(containers[0])
+            elif all(isinstance(c, array.array) for c in containers):
+                values = set()
+                for container in containers:
+                    values.update(container)
+                result._containers[high] = _container_from_values(sorted(values))
+            else:
+                value = 0
+                for container in containers:
+                    value |= _container_to_long(container)
+                result._containers[high] = _container_from_long(value)
+        return result
+
+    def __and__(self, other):
+        result = Bitmap()
+        for high, container in self._containers.iteritems():
+            other_container = other._containers.get(high)
+            if other_container is not None:
+                combined = self._intersect(container, other_container)
+                if combined is not None:
+                    result._containers[high] = combined
+        return result
+
+    def __contains__(self, value):
+        container = self._containers.get(value >> _CONTAINER_BITS)
+        if container is None:
+            return False
+        low = value & _LOW_MASK
+        if isinstance(container, _BitsetContainer):
+            return low in container
+        i = bisect.bisect_left(container, low)
+        return i < len(container) and container[i] == low
+
+    def __eq__(self, other):
+        return isinstance(other, Bitmap) and list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __iter__(self):
+        for high in sorted(self._containers):
+            base = high << _CONTAINER_BITS
+            for low in self._containers[high]:
+                yield base | low
+
+    def __len__(self):
+        return sum(len(container) for container in self._containers.itervalues())
+
+    def __or__(self, other):
+        return Bitmap.union([self, other])
+
+    def __repr__(self):
+        return 'Bitmap(<{0} values>)'.format(len(self))
+
+    def __sub__(self, other):
+        result = Bitmap()
+        for high, container in self._containers.iteritems():
+            other_container = other._containers.get(high)
+            if other_container is None:
+                combined = _copy_container(container)
+            else:
+                combined = self._subtract(container, other_container)
+            if combined is not None:
+                result._containers[high] = combined
+        return result
+
+    def add(self, value):
+        """Add non-negative int to bitmap.
+        """
+        high, low = value >> _CONTAINER_BITS, value & _LOW_MASK
+        container = self._containers.get(high)
+        if container is None:
+            self._containers[high] = _array_container([low])
+        elif isinstance(container, _BitsetContainer):
+            container.add(low)
+        else:
+            i = bisect.bisect_left(container, low)
+            if i == len(container) or container[i] != low:
+                container.insert(i, low)
+                if len(container) > _ARRAY_MAX:
+                    self._containers[high] = _container_from_values(container)
+
+    def discard(self, value):
+        """Remove int from bitmap if present.
+        """
+        high, low = value >> _CONTAINER_BITS, value & _LOW_MASK
+        container = self._containers.get(high)
+        if container is None:
+            return
+        if isinstance(container, _BitsetContainer):
+            container.discard(low)
+            if len(container) <= _ARRAY_MAX:
+                self._containers[high] = _container_from_values(list(container))
+        else:
+            i = bisect.bisect_left(container, low)
+            if i < len(container) and container[i] == low:
+                del container[i]
+        if not len(self._containers[high] or ()):
+            del self._containers[high]
+
+    def size_in_bytes(self):
+        """Approximate memory used by values of bitmap, excluding fixed object overhead.
+
+        :rtype: int
+        :return: bytes used by arrays and bitsets of containers
+
+        """
+        return sum(len(c.bits) if isinstance(c, _BitsetContainer) else c.itemsize * len(c)
+                   for c in self._containers.itervalues())
+
+
+    # private methods
+
+    @staticmethod
+    def _intersect(container, other):
+        """Intersect containers; None if intersection is empty.
+        """
+        if isinstance(container, array.array):
+            if isinstance(other, array.array):
+                return _container_from_values(sorted(set(container).intersection(other)))
+            return _container_from_values([low for low in container if low in other])
+        if isinstance(other, array.array):
+            return _container_from_values([low for low in other if low in container])
+        return _container_from_long(container.to_long() & other.to_long())
+
+    @staticmethod
+    def _subtract(container, other):
+        """Subtract other container from container; None if difference is empty.
+        """
+        if isinstance(container, array.array):
+            if isinstance(other, array.array):
+                return _container_from_values(sorted(set(container).difference(other)))
+            return _container_from_values([low for low in container if low not in other])
+        return _container_from_long(container.to_long() & ~_container_to_long(other))
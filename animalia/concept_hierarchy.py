@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""ConceptHierarchy is the transitive closure of persisted 'is' relationships.
+
+For every concept the hierarchy holds the set of all concepts it is, directly or through
+other concepts, e.g. if 'otter is mammal' and 'mammal is vertebrate', then otter is both
+mammal and vertebrate. Membership checks are set lookups regardless of hierarchy depth.
+
+Meta types such as 'species' classify concepts without being inherited: 'mammal is species'
+does not make otter a species.
+
+The hierarchy is an in-memory copy of concept_ancestors, which is computed by
+fact_model.ConceptAncestor. It is loaded from the database on first use and updated with the
+rows that commits add to or delete from concept_ancestors; see fact_model.add_commit_listener.
+
+"""
+
+from __future__ import unicode_literals
+
+import collections
+import logging
+import threading
+
+import fact_model
+
+
+logger = logging.getLogger('animalia.ConceptHierarchy')
+
+
+class ConceptHierarchy(object):
+    __doc__ = __doc__
+
+    # Concept types that are not inherited through 'is' relationships
+    meta_types = fact_model.ConceptAncestor.meta_types
+
+    # Hierarchy shared by all callers in process; see get_hierarchy
+    _hierarchy = None
+    _hierarchy_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+        # concept -> set of all concepts it is, directly or transitively
+        self._ancestors = collections.defaultdict(set)
+        # concept -> set of all concepts that are it, directly or transitively
+        self._descendants = collections.defaultdict(set)
+
+    @classmethod
+    def get_hierarchy(cls):
+        """Get hierarchy shared by all callers in current process, loading it if necessary.
+
+        :rtype: :py:class:`ConceptHierarchy`
+        :return: shared hierarchy
+
+        """
+        with cls._hierarchy_lock:
+            if cls._hierarchy is None:
+                hierarchy = cls.load()
+                fact_model.add_commit_listener(hierarchy.apply_changes)
+                cls._hierarchy = hierarchy
+            return cls._hierarchy
+
+    @classmethod
+    def reset(cls):
+        """Discard shared hierarchy; it is reloaded from database on next call to get_hierarchy.
+        """
+        with cls._hierarchy_lock:
+            if cls._hierarchy is not None:
+                fact_model.remove_commit_listener(cls._hierarchy.apply_changes)
+            cls._hierarchy = None
+
+    @classmethod
+    def load(cls):
+        """Create hierarchy from persisted closure of 'is' relationships.
+
+        :rtype: :py:class:`ConceptHierarchy`
+        :return: newly loaded hierarchy
+
+        """
+        hierarchy = cls()
+        for ancestor_name, descendant_name in fact_model.ConceptAncestor.select_name_pairs():
+            hierarchy.add_ancestor(descendant_name, ancestor_name)
+        logger.info("Loaded concept hierarchy: {0}".format(hierarchy.stats()))
+        return hierarchy
+
+    def add_ancestor(self, concept_name, concept_type):
+        """Add concept type to ancestors of concept.
+
+        :type concept_name: unicode
+        :arg concept_name: descendant in concept_ancestors, e.g. 'otter'
+
+        :type concept_type: unicode
+        :arg concept_type: ancestor in concept_ancestors, e.g. 'mammal' or 'vertebrate'
+
+        """
+        with self._lock:
+            self._ancestors[concept_name].add(concept_type)
+            self._descendants[concept_type].add(concept_name)
+
+    def remove_ancestor(self, concept_name, concept_type):
+        """Remove concept type from ancestors of concept.
+
+        :type concept_name: unicode
+        :arg concept_name: descendant in concept_ancestors, e.g. 'otter'
+
+        :type concept_type: unicode
+        :arg concept_type: ancestor in concept_ancestors, e.g. 'mammal' or 'vertebrate'
+
+        """
+        with self._lock:
+            self._discard(self._ancestors, concept_name, concept_type)
+            self._discard(self._descendants, concept_type, concept_name)
+
+    def apply_changes(self, changes):
+        """Apply rows of concept_ancestors added or deleted by commit to hierarchy.
+
+        :type changes: :py:class:`fact_model.CommittedChanges`
+        :arg changes: changes saved or deleted by commit
+
+        """
+        with self._lock:
+            for record in changes.changed_ancestors:
+                if record.deleted:
+                    self.remove_ancestor(record.descendant_name, record.ancestor_name)
+                else:
+                    self.add_ancestor(record.descendant_name, record.ancestor_name)
+
+    def ancestors(self, concept_name):
+        """Find all concepts that specified concept is, directly or transitively.
+
+        :rtype: set
+        :return: names of concept types of concept
+
+        :type concept_name: unicode
+        :arg concept_name: name of concept
+
+        """
+        with self._lock:
+            return set(self._ancestors.get(concept_name, ()))
+
+    def descendants(self, concept_type):
+        """Find all concepts that are specified concept type, directly or transitively.
+
+        :rtype: set
+        :return: names of concepts having concept type
+
+        :type concept_type: unicode
+        :arg concept_type: name of concept type
+
+        """
+        with self._lock:
+            return set(self._descendants.get(concept_type, ()))
+
+    def is_a(self, concept_name, concept_type):
+        """Determine if concept is of concept type, directly or transitively.
+
+        :rtype: bool
+        :return: True if concept_type is among ancestors of concept, False otherwise
+
+        :type concept_name: unicode
+        :arg concept_name: name of concept, e.g. 'otter'
+
+        :type concept_type: unicode
+        :arg concept_type: name of concept type, e.g. 'mammal'
+
+        """
+        with self._lock:
+            ancestors = self._ancestors.get(concept_name)
+            return bool(ancestors) and concept_type in ancestors
+
+    def stats(self):
+        """Summarize size of hierarchy.
+
+        :rtype: dict
+        :return: dict with keys 'concepts' and 'closure_pairs'
+
+        """
+        with self._lock:
+            return {'concepts': len(set(self._ancestors) | set(self._descendants)),
+                    'closure_pairs': sum(len(a) for a in self._ancestors.itervalues())}
+
+
+    # private methods
+
+    @staticmethod
+    def _discard(index, key, value):
+        """Discard value from set in index, removing key if set is empty.
+        """
+        values = index.get(key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del index[key]
@@ -0,0 +1,426 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""FactGraph is an in-process copy of persisted relationships indexed for fast lookup.
+
+Concept names and relationship types are interned to ints. Relationships are indexed by
+(relationship_type, subject) and by (relationship_type, object), so that FactQuery can
+answer questions without SQL. The graph is loaded from the database on first use and kept
+current by applying changes as they are committed; see fact_model.add_commit_listener.
+
+Relationship type synonyms, e.g. 'is' and 'is a', share a relationship_type_id in the
+database and therefore share an interned id in the graph.
+
+Subjects of each (relationship_type, object) and (relationship_type, object, count) are kept
+as posting lists: compressed bitmaps of interned subject ids. Which-animal queries, including
+negated and how-many ones, are answered by combining posting lists with AND, ANDNOT and
+popcount, without building relationships or sets of names; see which_animal_subjects.
+
+"""
+
+from __future__ import unicode_literals
+
+import collections
+import logging
+import threading
+
+from bitmap import Bitmap
+from concept_hierarchy import ConceptHierarchy
+import fact_model
+
+
+logger = logging.getLogger('animalia.FactGraph')
+
+
+class GraphConcept(object):
+    """Stand-in for :py:class:`fact_model.Concept` in results selected from FactGraph.
+    """
+    __slots__ = ('concept_name', '_graph', '_interned_id')
+
+    def __init__(self, graph, interned_id):
+        self._graph = graph
+        self._interned_id = interned_id
+        self.concept_name = graph.concept_name(interned_id)
+
+    @property
+    def concept_types(self):
+        """Names of concepts that are objects of 'is' relationships with this concept.
+        """
+        return self._graph.concept_types(self.concept_name)
+
+
+class GraphRelationship(object):
+    """Stand-in for :py:class:`fact_model.Relationship` in results selected from FactGraph.
+    """
+    __slots__ = ('relationship_id', 'relationship_type_id', 'subject', 'object', 'count',
+                 'fact_id')
+
+    def __init__(self, relationship_id=None, relationship_type_id=None, subject=None,
+                 object=None, count=None, fact_id=None):
+        self.relationship_id = relationship_id
+        self.relationship_type_id = relationship_type_id
+        self.subject = subject
+        self.object = object
+        self.count = count
+        self.fact_id = fact_id
+
+
+class FactGraph(object):
+    __doc__ = __doc__
+
+    # Graph shared by all callers in process; see get_graph
+    _graph = None
+    _graph_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+        # Interned concepts: name -> int and int -> name
+        self._concept_ids = {}
+        self._concept_names = []
+
+        # Interned relationship types: name -> int and relationship_type_id -> int
+        self._relationship_type_ids = {}
+        self._relationship_type_ids_by_persisted_id = {}
+        self._persisted_relationship_type_ids = []
+
+        # (relationship_type, subject, object) -> (count, relationship_id, fact_id)
+        self._edges = {}
+        # (relationship_type, subject) -> set of objects
+        self._objects_by_subject = collections.defaultdict(set)
+        # (relationship_type, object) -> Bitmap of subjects
+        self._subjects_by_object = collections.defaultdict(Bitmap)
+        # (relationship_type, object, count) -> Bitmap of subjects, for relationships with count
+        self._subjects_by_object_count = collections.defaultdict(Bitmap)
+        # relationship_type -> set of objects
+        self._objects_by_type = collections.defaultdict(set)
+        # relationship_type -> set of (subject, object)
+        self._edges_by_type = collections.defaultdict(set)
+
+    @classmethod
+    def get_graph(cls):
+        """Get graph shared by all callers in current process, loading it if necessary.
+
+        :rtype: :py:class:`FactGraph`
+        :return: shared graph
+
+        """
+        with cls._graph_lock:
+            if cls._graph is None:
+                graph = cls.load()
+                fact_model.add_commit_listener(graph.apply_changes)
+                cls._graph = graph
+            return cls._graph
+
+    @classmethod
+    def reset(cls):
+        """Discard shared graph; it is reloaded from database on next call to get_graph.
+        """
+        with cls._graph_lock:
+            if cls._graph is not None:
+                fact_model.remove_commit_listener(cls._graph.apply_changes)
+            cls._graph = None
+
+    @classmethod
+    def load(cls):
+        """Create graph from persisted relationship types and relationships.
+
+        :rtype: :py:class:`FactGraph`
+        :return: newly loaded graph
+
+        """
+        graph = cls()
+        for name, relationship_type_id in fact_model.RelationshipType.select_name_id_pairs():
+            graph.add_relationship_type(name, relationship_type_id)
+        for record in fact_model.Relationship.select_records():
+            graph.add_relationship(record)
+        logger.info("Loaded fact graph: {0}".format(graph.stats()))
+        return graph
+
+    def add_relationship_type(self, relationship_type_name, relationship_type_id):
+        """Add relationship type name; synonyms share relationship_type_id.
+
+        :type relationship_type_name: unicode
+        :arg relationship_type_name: name of relationship type, e.g. 'is a'
+
+        :type relationship_type_id: int
+        :arg relationship_type_id: persisted id of relationship type
+
+        """
+        with self._lock:
+            self._relationship_type_ids[relationship_type_name] = \
+                self._intern_relationship_type(relationship_type_id)
+
+    def add_relationship(self, record):
+        """Add relationship to graph or update existing relationship.
+
+        :type record: :py:class:`fact_model.RelationshipRecord`
+        :arg record: data of persisted relationship
+
+        """
+        with self._lock:
+            rel_type = self._intern_relationship_type(record.relationship_type_id)
+            subj = self._intern_concept(record.subject_name)
+            obj = self._intern_concept(record.object_name)
+            previous = self._edges.get((rel_type, subj, obj))
+            if previous is not None and previous[0] is not None:
+                self._discard(self._subjects_by_object_count, (rel_type, obj, previous[0]), subj)
+            self._edges[(rel_type, subj, obj)] = (record.count, record.relationship_id,
+                                                  record.fact_id)
+            self._objects_by_subject[(rel_type, subj)].add(obj)
+            self._subjects_by_object[(rel_type, obj)].add(subj)
+            if record.count is not None:
+                self._subjects_by_object_count[(rel_type, obj, record.count)].add(subj)
+            self._objects_by_type[rel_type].add(obj)
+            self._edges_by_type[rel_type].add((subj, obj))
+
+    def remove_relationship(self, record):
+        """Remove relationship from graph if present.
+
+        :type record: :py:class:`fact_model.RelationshipRecord`
+        :arg record: data of deleted relationship
+
+        """
+        with self._lock:
+            rel_type = self._relationship_type_ids_by_persisted_id.get(record.relationship_type_id)
+            subj = self._concept_ids.get(record.subject_name)
+            obj = self._concept_ids.get(record.object_name)
+            edge = self._edges.pop((rel_type, subj, obj), None)
+            if edge is None:
+                return
+            count = edge[0]
+            self._discard(self._objects_by_subject, (rel_type, subj), obj)
+            self._discard(self._subjects_by_object, (rel_type, obj), subj)
+            if count is not None:
+                self._discard(self._subjects_by_object_count, (rel_type, obj, count), subj)
+            if (rel_type, obj) not in self._subjects_by_object:
+                self._discard(self._objects_by_type, rel_type, obj)
+            self._discard(self._edges_by_type, rel_type, (subj, obj))
+
+    def apply_changes(self, changes):
+        """Apply committed changes to graph.
+
+        :type changes: :py:class:`fact_model.CommittedChanges`
+        :arg changes: relationship types and relationships saved or deleted by commit
+
+        """
+        with self._lock:
+            for name, relationship_type_id in changes.saved_relationship_types:
+                self.add_relationship_type(name, relationship_type_id)
+            for record in changes.deleted_relationships:
+                self.remove_relationship(record)
+            for record in changes.saved_relationships:
+                self.add_relationship(record)
+
+    def concept_name(self, interned_id):
+        return self._concept_names[interned_id]
+
+    def concept_names(self, subjects):
+        """Get names of concepts in posting list.
+
+        :rtype: [unicode, ...]
+        :return: names of concepts
+
+        :type subjects: :py:class:`bitmap.Bitmap`
+        :arg subjects: interned ids of concepts, e.g. returned by which_animal_subjects
+
+        """
+        with self._lock:
+            return [self._concept_names[subj] for subj in subjects]
+
+    def concept_types(self, concept_name):
+        """Find names of concepts that are objects of 'is' relationships with specified concept.
+
+        :rtype: [unicode, ...]
+        :return: names of concept types of concept
+
+        :type concept_name: unicode
+        :arg concept_name: name of concept
+
+        """
+        with self._lock:
+            is_type = self._relationship_type_ids.get('is')
+            subj = self._concept_ids.get(concept_name)
+            objs = self._objects_by_subject.get((is_type, subj), ())
+            return [self._concept_names[obj] for obj in objs]
+
+    def select_by_values(self, relationship_type_name=None, relationship_number=None,
+                         subject_name=None, object_name=None):
+        """Select relationships with specified relationship_type, count, subject, and object.
+
+        Equivalent of :py:meth:`fact_model.Relationship.select_by_values`.
+
+        :rtype: [py:class:`GraphRelationship`]
+        :return: matching relationships; empty list if none are found
+
+        :type relationship_type_name: unicode
+        :arg relationship_type_name: name of relationship_type
+
+        :type relationship_number: int
+        :arg relationship_number: optional value of relationship 'count' attribute
+
+        :type subject_name: unicode
+        :arg subject_name: optional name of subject concept
+
+        :type object_name: unicode
+        :arg object_name: optional name of object concept
+
+        """
+        with self._lock:
+            rel_type = self._relationship_type_ids.get(relationship_type_name)
+            if rel_type is None:
+                return []
+            subj = obj = None
+            if subject_name:
+                subj = self._concept_ids.get(subject_name)
+                if subj is None:
+                    return []
+            if object_name:
+                obj = self._concept_ids.get(object_name)
+                if obj is None:
+                    return []
+
+            if subj is not None and obj is not None:
+                keys = [(subj, obj)] if (rel_type, subj, obj) in self._edges else []
+            elif subj is not None:
+                keys = [(subj, o) for o in self._objects_by_subject.get((rel_type, subj), ())]
+            elif obj is not None:
+                keys = [(s, obj) for s in self._subjects_by_object.get((rel_type, obj), ())]
+            else:
+                keys = list(self._edges_by_type.get(rel_type, ()))
+
+            matches = []
+            concepts = {}
+            for s, o in keys:
+                count, relationship_id, fact_id = self._edges[(rel_type, s, o)]
+                if relationship_number and count != relationship_number:
+                    continue
+                for c in (s, o):
+                    if c not in concepts:
+                        concepts[c] = GraphConcept(self, c)
+                matches.append(GraphRelationship(
+                        relationship_id=relationship_id,
+                        relationship_type_id=self._persisted_relationship_type_ids[rel_type],
+                        subject=concepts[s],
+                        object=concepts[o],
+                        count=count,
+                        fact_id=fact_id))
+            return matches
+
+    def type_subjects(self, concept_type):
+        """Find concepts that are, directly or transitively, of concept_type.
+
+        ORs the posting lists of 'is' relationships with concept_type and with all concept
+        types that are of concept_type; meta types such as 'species' are not inherited.
+
+        :rtype: :py:class:`bitmap.Bitmap`
+        :return: interned ids of concepts of concept_type
+
+        :type concept_type: unicode
+        :arg concept_type: name of concept type, e.g. 'animals' or 'reptiles'
+
+        """
+        with self._lock:
+            is_type = self._relationship_type_ids.get('is')
+            concept_types = set()
+            obj = self._concept_ids.get(concept_type)
+            if obj is not None:
+                concept_types.add(obj)
+            if concept_type not in ConceptHierarchy.meta_types:
+                concept_types.update(self._concepts_of_type(
+                        self._objects_by_type.get(is_type, ()), concept_type))
+            return Bitmap.union(self._subjects_by_object[(is_type, obj)]
+                                for obj in concept_types
+                                if (is_type, obj) in self._subjects_by_object)
+
+    def which_animal_subjects(self, parsed_query, subject_type='animals',
+                              object_is_species=False):
+        """Select concepts of subject_type that match relationship of 'which animals' query.
+
+        Equivalent of :py:meth:`query_compiler.QueryCompiler.compile_which_animal_query`: the
+        posting lists of matching objects are ORed, then ANDed with the concept type, or, if
+        the relationship is negated, the concept type is ANDNOTed with them.
+
+        :rtype: :py:class:`bitmap.Bitmap`
+        :return: interned ids of matching concepts; see concept_names
+
+        :type parsed_query: :py:class:`ParsedSentence`
+        :arg parsed_query: parsed 'which animals' query
+
+        :type subject_type: unicode
+        :arg subject_type: concept type of animals to select, e.g. 'animals' or 'reptiles'
+
+        :type object_is_species: bool
+        :arg object_is_species: True if parsed object is a species, e.g. 'reptiles'
+
+        """
+        relationship_number = parsed_query.relationship_number
+        relationship_number = int(relationship_number) if relationship_number else None
+
+        with self._lock:
+            rel_type = self._relationship_type_ids.get(parsed_query.relationship_type_name)
+            objects = set()
+            obj = self._concept_ids.get(parsed_query.object_name)
+            if obj is not None:
+                objects.add(obj)
+            if object_is_species:
+                objects.update(self._concepts_of_type(
+                        self._objects_by_type.get(rel_type, ()), parsed_query.object_name))
+
+            if relationship_number is None:
+                postings, keys = self._subjects_by_object, [(rel_type, o) for o in objects]
+            else:
+                postings = self._subjects_by_object_count
+                keys = [(rel_type, o, relationship_number) for o in objects]
+            matches = Bitmap.union(postings[key] for key in keys if key in postings)
+
+            subjects = self.type_subjects(subject_type)
+            if parsed_query.relationship_negation:
+                return subjects - matches
+            return subjects & matches
+
+    def stats(self):
+        """Summarize size of graph.
+
+        :rtype: dict
+        :return: dict with keys 'concepts', 'relationship_types' and 'relationships'
+
+        """
+        with self._lock:
+            return {'concepts': len(self._concept_names),
+                    'relationship_types': len(self._persisted_relationship_type_ids),
+                    'relationships': len(self._edges)}
+
+
+    # private methods
+
+    @staticmethod
+    def _discard(index, key, value):
+        """Discard value from set in index, removing key if set is empty.
+        """
+        values = index.get(key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del index[key]
+
+    def _concepts_of_type(self, interned_ids, concept_type):
+        """Interned ids among interned_ids of concepts that are of concept_type.
+        """
+        hierarchy = ConceptHierarchy.get_hierarchy()
+        return [c for c in interned_ids if hierarchy.is_a(self._concept_names[c], concept_type)]
+
+    def _intern_concept(self, concept_name):
+        concept_id = self._concept_ids.get(concept_name)
+        if concept_id is None:
+            concept_id = self._concept_ids[concept_name] = len(self._concept_names)
+            self._concept_names.append(concept_name)
+        return concept_id
+
+    def _intern_relationship_type(self, relationship_type_id):
+        rel_type = self._relationship_type_ids_by_persisted_id.get(relationship_type_id)
+        if rel_type is None:
+            rel_type = self._relationship_type_ids_by_persisted_id[relationship_type_id] = \
+                len(self._persisted_relationship_type_ids)
+            self._persisted_relationship_type_ids.append(relationship_type_id)
+        return rel_type
@@ -14,17 +14,29 @@ from __future__ import unicode_literals
 
 import json
 import logging
+import multiprocessing.pool
+import os
 import re
-import requests
-import urllib
+import sqlite3
+import sys
+import threading
+import time
 import uuid 
 
+import sqlalchemy.exc as sa_exc
+
+from answer_cache import AnswerCache
+from concept_hierarchy import ConceptHierarchy
 from config import Config
 import exc
+from fact_graph import FactGraph
 import fact_model
 from fact_query import FactQuery
+from future import Future
 from parsed_sentence import ParsedSentence
 from plurals import Plurals
+from wit_cache import WitCache
+from wit_client import WitClient
 
 
 logger = logging.getLogger('animalia.FactManager')
@@ -36,6 +48,35 @@ class FactManager(object):
     # Pattern for stripping characters from user-specified fact sentences.
     _non_alnum_exp = re.compile(r'[^\w\s]', flags=re.UNICODE)
 
+    # Persistent cache of wit.ai responses; see _get_wit_cache
+    _wit_cache = None
+
+    # Cache of answers to queries and generation of knowledge base they were computed from;
+    # generation is incremented whenever facts are added or deleted, see _bump_kb_generation
+    _answer_cache = None
+    _kb_generation = 0
+    _kb_generation_lock = threading.Lock()
+
+    # Generation of knowledge base in database that caches of this process are current with,
+    # and when it was last selected; when another process or host changes facts, this process
+    # discards its caches, see sync_kb_generation
+    _synced_kb_generation = None
+    _kb_generation_checked_at = 0
+
+    # Ids of persisted concepts by name, loaded once per process and kept current with committed
+    # changes, so that saving facts selects only concepts that have never been seen; ids of
+    # relationship types are looked up with RelationshipType.id_for_name. See _get_concept_ids
+    _concept_ids = None
+    _concept_ids_lock = threading.Lock()
+
+    # Thread pools of fact_from_sentence_async and query_facts_async: one for wit.ai requests,
+    # which mostly wait on the network, and a smaller one for database work, which bounds the
+    # database connections used however many calls are in flight. See _get_async_pools
+    _wit_pool = None
+    _db_pool = None
+    _async_pools_pid = None
+    _async_pools_lock = threading.Lock()
+
     @classmethod
     def add_concept(cls, concept_name, concept_type):
         """Add Concept for name and type and 'is' relationship between the two.
@@ -50,19 +91,44 @@ class FactManager(object):
         :arg concept_type: name of concept_type, e.g. 'species'
         
         """
-        # Normalize names of both concept and concept_type before updating database.
-        concept_name = Plurals.get_plural(concept_name.lower())
-        concept_type = Plurals.get_plural(concept_type.lower())
+        cls.add_concepts([(concept_name, concept_type)])
 
-        concept = cls._ensure_concept(concept_name)
-        type_concept = cls._ensure_concept(concept_type)
-        is_relationship = cls._ensure_relationship(concept,
-                                                   type_concept,
-                                                   relationship_type_name='is',
-                                                   error_on_duplicate=False)
+    @classmethod
+    def add_concepts(cls, concepts):
+        """Add Concepts for names and types and 'is' relationships in a single transaction.
 
-        cls._merge_to_db_session(is_relationship)
-        fact_model.db.session.commit()
+        :type concepts: [(unicode, unicode), ...]
+        :arg concepts: (concept_name, concept_type) pairs, e.g. [('mammals', 'species')]
+
+        """
+        # Normalize names of all concepts and concept_types before updating database.
+        concepts = [(concept_name.lower(), concept_type.lower())
+                    for concept_name, concept_type in concepts]
+        plurals = Plurals.get_plurals(name for concept in concepts for name in concept)
+        for concept_name, concept_type in concepts:
+            concept_name = plurals[concept_name]
+            concept_type = plurals[concept_type]
+
+            concept = cls._ensure_concept(concept_name)
+            type_concept = cls._ensure_concept(concept_type)
+            is_relationship = cls._ensure_relationship(concept,
+                                                       type_concept,
+                                                       relationship_type_name='is',
+                                                       error_on_duplicate=False)
+            cls._merge_to_db_session(is_relationship)
+        cls._commit_kb_changes()
+
+    @classmethod
+    def answer_cache_stats(cls):
+        """Summarize usage of answer cache.
+
+        :rtype: dict
+        :return: dict with keys 'entries', 'generation', 'hits', 'misses' and 'hit_rate';
+          None if answer cache is disabled by configuration
+
+        """
+        answer_cache = cls._get_answer_cache()
+        return answer_cache.stats() if answer_cache else None
 
     @classmethod
     def delete_fact_by_id(cls, fact_id):
@@ -83,7 +149,7 @@ class FactManager(object):
                 cls._delete_from_db_session(relationship)
             cls._delete_from_db_session(fact)
             deleted_fact_id = fact_id
-            fact_model.db.session.commit()
+            cls._commit_kb_changes()
         return deleted_fact_id
 
     @classmethod
@@ -99,23 +165,89 @@ class FactManager(object):
         :arg fact_sentence: fact sentence in format understandable by configured wit.ai instance
 
         """
-        logger.debug("Processing sentence '{0}'".format(fact_sentence))
-        fact_sentence = cls._normalize_sentence(fact_sentence)
-        if not fact_sentence:
-            raise exc.SentenceParseError("Empty fact sentence provided")
+        fact_sentence = cls._normalize_fact_sentence(fact_sentence)
         incoming_fact = fact_model.IncomingFact.select_by_text(fact_sentence)
         if not incoming_fact:
             wit_response = cls._query_wit(fact_sentence)
-            try:
-                parsed_sentence = ParsedSentence.from_wit_response(wit_response)
-                parsed_sentence.validate_fact()
-            except ValueError as ex:
-                raise exc.InvalidFactDataError("Invalid fact: {0}; wit_response={1}".format(
-                        ex, wit_response))
-            incoming_fact = cls._save_parsed_fact(parsed_sentence)
-            fact_model.db.session.commit()
+            incoming_fact = cls._save_wit_fact(wit_response)
         return incoming_fact
 
+    @classmethod
+    def fact_from_sentence_async(cls, fact_sentence):
+        """Asynchronous variant of fact_from_sentence.
+
+        Returns at once. The existing fact is selected and the new fact saved by threads of the
+        database pool, and wit.ai is queried by a thread of the wit pool; see _get_async_pools.
+
+        :rtype: :py:class:`~future.Future`
+        :return: future whose result is IncomingFact, detached from db session, or whose
+          exception is error raised by fact_from_sentence
+
+        :type fact_sentence: unicode
+        :arg fact_sentence: fact sentence in format understandable by configured wit.ai instance
+
+        """
+        future = Future()
+        wit_pool, db_pool = cls._get_async_pools()
+
+        def query_wit(incoming_fact):
+            if incoming_fact:
+                future.set_result(incoming_fact)
+            else:
+                cls._submit(future, wit_pool, cls._query_wit, fact_sentence, then=save_fact)
+
+        def save_fact(wit_response):
+            cls._submit(future, db_pool, cls._save_wit_fact, wit_response)
+
+        try:
+            fact_sentence = cls._normalize_fact_sentence(fact_sentence)
+        except exc.IncomingDataError:
+            future.set_exception(sys.exc_info())
+            return future
+        cls._submit(future, db_pool, fact_model.IncomingFact.select_by_text, fact_sentence,
+                    then=query_wit)
+        return future
+
+    @classmethod
+    def facts_from_sentences(cls, fact_sentences):
+        """Create IncomingFacts from multiple sentences in a single transaction.
+
+        Sentences are parsed by wit.ai concurrently, with at most
+        Config.fact_batch_wit_concurrency requests in flight. Facts are then saved in order,
+        each in its own savepoint, so that a sentence that cannot be saved does not prevent
+        the others from being saved. All facts are committed together.
+
+        :rtype: [(:py:class:`~fact_model.IncomingFact`, Exception), ...]
+        :return: (IncomingFact, None) or (None, error) for each sentence, in order of sentences;
+          error is :py:class:`~exc.IncomingDataError` or :py:class:`~exc.ExternalApiError`
+
+        :type fact_sentences: [unicode, ...]
+        :arg fact_sentences: fact sentences in format understandable by configured wit.ai instance
+
+        """
+        logger.debug("Processing batch of {0} sentences".format(len(fact_sentences)))
+        normalized_sentences = [cls._normalize_sentence(s) for s in fact_sentences]
+        existing_facts = fact_model.IncomingFact.select_by_texts(
+            [s for s in normalized_sentences if s])
+
+        # Parse each distinct new sentence once
+        new_sentences = []
+        for sentence in normalized_sentences:
+            if sentence and sentence not in existing_facts and sentence not in new_sentences:
+                new_sentences.append(sentence)
+        parsed_sentences = dict(zip(new_sentences, cls._parse_fact_sentences(new_sentences)))
+
+        parsed_facts = []
+        for sentence in normalized_sentences:
+            if not sentence:
+                parsed_facts.append(
+                    (sentence, None, exc.SentenceParseError("Empty fact sentence provided")))
+            elif sentence in parsed_sentences:
+                parsed_facts.append((sentence,) + parsed_sentences[sentence])
+            else:
+                parsed_facts.append((sentence, None, None))
+        return cls._save_parsed_facts(parsed_facts, existing_facts)
+
     @classmethod
     def get_fact_by_id(cls, fact_id):
         """Retrieve specified IncomingFact by id.
@@ -129,6 +261,25 @@ class FactManager(object):
         """
         return fact_model.IncomingFact.select_by_id(fact_id)
 
+    @classmethod
+    def parse_fact_sentence(cls, fact_sentence):
+        """Normalize fact sentence and use wit to parse it, without updating database.
+
+        Safe to call from multiple threads; see save_parsed_facts for persisting the results.
+
+        :rtype: (unicode, :py:class:`ParsedSentence`, Exception)
+        :return: (normalized sentence, parsed sentence, None) or (normalized sentence, None,
+          error) if sentence cannot be parsed
+
+        :type fact_sentence: unicode
+        :arg fact_sentence: fact sentence in format understandable by configured wit.ai instance
+
+        """
+        fact_sentence = cls._normalize_sentence(fact_sentence)
+        if not fact_sentence:
+            return fact_sentence, None, exc.SentenceParseError("Empty fact sentence provided")
+        return (fact_sentence,) + cls._parse_fact_sentence(fact_sentence)
+
     @classmethod
     def query_facts(cls, query_sentence):
         """Use wit to parse incoming sentence; use recorded facts to answer query if possible.
@@ -141,21 +292,216 @@ class FactManager(object):
         :type query_sentence: unicode
         :arg query_sentence: query sentence in format understandable by configured wit.ai instance
 
+        Answers are cached until facts are added or deleted; cached answers are returned
+        without consulting wit.ai or the facts database.
+
+        """
+        query_sentence, kb_generation, is_cached, answer = cls._get_cached_answer(query_sentence)
+        if not is_cached:
+            wit_response = cls._query_wit(query_sentence + '?')
+            answer = cls._answer_query(query_sentence, kb_generation, wit_response)
+        return answer
+
+    @classmethod
+    def query_facts_async(cls, query_sentence):
+        """Asynchronous variant of query_facts.
+
+        Returns at once. Cached answers are returned as completed futures; otherwise wit.ai is
+        queried by a thread of the wit pool, and the query is answered by a thread of the
+        database pool; see _get_async_pools.
+
+        :rtype: :py:class:`~future.Future`
+        :return: future whose result is answer, or whose exception is error raised by
+          query_facts
+
+        :type query_sentence: unicode
+        :arg query_sentence: query sentence in format understandable by configured wit.ai instance
+
+        """
+        future = Future()
+        wit_pool, db_pool = cls._get_async_pools()
+
+        def answer_query(wit_response):
+            cls._submit(future, db_pool, cls._answer_query, query_sentence, kb_generation,
+                        wit_response)
+
+        try:
+            query_sentence, kb_generation, is_cached, answer = cls._get_cached_answer(
+                query_sentence)
+        except exc.IncomingDataError:
+            future.set_exception(sys.exc_info())
+            return future
+        if is_cached:
+            future.set_result(answer)
+        else:
+            cls._submit(future, wit_pool, cls._query_wit, query_sentence + '?',
+                        then=answer_query)
+        return future
+
+    @classmethod
+    def save_parsed_facts(cls, parsed_facts):
+        """Save IncomingFacts for sentences returned by parse_fact_sentence in single transaction.
+
+        Facts are saved in order, each in its own savepoint, so that a fact that cannot be
+        saved does not prevent the others from being saved. Sentences that are already
+        persisted are not saved again. All facts are committed together.
+
+        :rtype: [(:py:class:`~fact_model.IncomingFact`, Exception), ...]
+        :return: (IncomingFact, None) or (None, error) for each parsed fact, in order
+
+        :type parsed_facts: [(unicode, :py:class:`ParsedSentence`, Exception), ...]
+        :arg parsed_facts: results of parse_fact_sentence
+
+        """
+        existing_facts = fact_model.IncomingFact.select_by_texts(
+            [sentence for sentence, parsed_sentence, error in parsed_facts if not error])
+        return cls._save_parsed_facts(parsed_facts, existing_facts)
+
+    @classmethod
+    def sync_kb_generation(cls):
+        """Discard caches of this process if another process or host has changed facts.
+
+        Cached answers, concept ids, relationship type ids, concept hierarchy and in-process
+        query backends are kept current with changes committed by this process only; they are
+        reloaded on next use after changes that incremented the knowledge base generation in
+        the database since. The generation is selected at most once every
+        Config.kb_generation_check_interval seconds.
+
+        :rtype: bool
+        :return: True if caches were discarded
+
+        """
+        now = time.time()
+        with cls._kb_generation_lock:
+            if now - cls._kb_generation_checked_at < Config.kb_generation_check_interval:
+                return False
+            cls._kb_generation_checked_at = now
+        return cls._check_kb_generation()
+
+    @classmethod
+    def warm_caches(cls):
+        """Load in-process caches used to save facts and answer queries, instead of on first use.
+
+        Loads concept hierarchy, ids of concepts and relationship types, plurals lexicon and
+        FactGraph or AttributeMatrix if configured as query backend.
+
+        """
+        cls._check_kb_generation()
+        ConceptHierarchy.get_hierarchy()
+        cls._get_concept_ids()
+        fact_model.RelationshipType.id_for_name('is')
+        if Config.fact_query_backend == 'graph':
+            FactGraph.get_graph()
+        elif Config.fact_query_backend == 'matrix':
+            from attribute_matrix import AttributeMatrix
+            AttributeMatrix.get_matrix()
+        if Plurals.lexicon is None:
+            Plurals.load_lexicon()
+        # Do not keep transaction open across requests
+        fact_model.db.session.remove()
+
+    @classmethod
+    def wit_cache_stats(cls):
+        """Summarize usage of persistent wit cache.
+
+        :rtype: dict
+        :return: dict with keys 'entries', 'hits', 'misses' and 'hit_rate'; None if wit cache
+          is disabled by configuration
+
+        """
+        wit_cache = cls._get_wit_cache()
+        return wit_cache.stats() if wit_cache else None
+
+
+    # private methods
+
+    @classmethod
+    def _answer_query(cls, query_sentence, kb_generation, wit_response):
+        """Answer query parsed by wit.ai from recorded facts, and cache answer.
+
+        :rtype: unicode
+        :return: answer; None if there is no known answer
+        :raise: :py:class:`~exc.InvalidQueryDataError` if query is invalid
+
+        :type query_sentence: unicode
+        :arg query_sentence: normalized query sentence
+
+        :type kb_generation: int
+        :arg kb_generation: knowledge base generation when answer was looked up in cache
+
+        :type wit_response: dict
+        :arg wit_response: wit.ai response for query sentence
+
         """
-        query_sentence = cls._normalize_sentence(query_sentence)
-        if not query_sentence:
-            raise exc.InvalidQueryDataError("Empty query sentence provided")
-        query_sentence += '?'
-        wit_response = cls._query_wit(query_sentence)
         try:
             parsed_sentence = ParsedSentence.from_wit_response(wit_response)
-            return FactQuery(parsed_query=parsed_sentence).find_answer()
+            answer = FactQuery(parsed_query=parsed_sentence).find_answer()
         except ValueError as ex:
             raise exc.InvalidQueryDataError("Invalid query: {0}; wit_response={1}".format(
                     ex, wit_response))
 
+        answer_cache = cls._get_answer_cache()
+        if answer_cache:
+            answer_cache.set(query_sentence, kb_generation, answer)
+        return answer
 
-    # private methods
+    @classmethod
+    def _apply_committed_changes(cls, changes):
+        """Update ids of concepts with committed changes.
+
+        :type changes: :py:class:`~fact_model.CommittedChanges`
+        :arg changes: changes recorded by fact_model at commit
+
+        """
+        with cls._concept_ids_lock:
+            if cls._concept_ids is None:
+                return
+            cls._concept_ids.update(changes.saved_concepts)
+            for concept_name, concept_id in changes.deleted_concepts:
+                if cls._concept_ids.get(concept_name) == concept_id:
+                    del cls._concept_ids[concept_name]
+
+    @classmethod
+    def _bump_kb_generation(cls):
+        """Increment knowledge base generation of this process, invalidating cached answers.
+        """
+        with cls._kb_generation_lock:
+            cls._kb_generation += 1
+
+    @classmethod
+    def _check_kb_generation(cls):
+        """Discard caches of this process unless they are current with generation in database.
+
+        :rtype: bool
+        :return: True if caches were discarded
+
+        """
+        generation = fact_model.KbGeneration.select_generation()
+        with cls._kb_generation_lock:
+            if generation == cls._synced_kb_generation:
+                return False
+            cls._synced_kb_generation = generation
+            cls._kb_generation += 1
+        logger.info("Knowledge base generation {0} differs from caches; discarding caches".format(
+                generation))
+        cls._reset_caches()
+        return True
+
+    @classmethod
+    def _commit_kb_changes(cls):
+        """Commit changes to facts with knowledge base generation incremented in same transaction.
+
+        Other processes discard their caches when they see the new generation; caches of this
+        process are kept current with its own changes.
+
+        """
+        generation = fact_model.KbGeneration.increment()
+        fact_model.db.session.commit()
+        cls._bump_kb_generation()
+        with cls._kb_generation_lock:
+            # Caches are current with own changes, but not with changes by others since last sync
+            if cls._synced_kb_generation == generation - 1:
+                cls._synced_kb_generation = generation
 
     @classmethod
     def _delete_from_db_session(cls, model):
@@ -177,6 +523,9 @@ class FactManager(object):
         :arg concept_name: name of concept
 
         """
+        concept_id = cls._get_concept_ids().get(concept_name)
+        if concept_id is not None:
+            return fact_model.Concept.reference(concept_id, concept_name)
         concept = fact_model.Concept.select_by_name(concept_name)
         if not concept:
             concept = fact_model.Concept(concept_name=concept_name)
@@ -205,16 +554,11 @@ class FactManager(object):
         # Ensure concept for type, e.g. 'animal'
         type_concept = cls._ensure_concept(concept_type)
 
-        # Verify no loop; if 'animal' has type 'food', 'food' cannot have type 'animal'
-        if concept_name in type_concept.concept_types:
-            conflicting_fact_id = None
-            for concept_type_rel in type_concept.concept_type_relationships:
-                if concept_type_rel.object.concept_name == concept_name:
-                    conflicting_fact_id = concept_type_rel.fact_id
-                    break
-            msg = "Cannot add relationship '{0} is {1}'; existing relationship '{1} is {0}'".format(
-                concept_name, concept_type)
-            raise exc.ConflictingFactError(msg, conflicting_fact_id=conflicting_fact_id)
+        # Verify no loop; if 'animal' is, directly or transitively, 'food', 'food' cannot be
+        # 'animal'. The check is a single lookup in the closure of 'is' relationships.
+        if fact_model.ConceptAncestor.is_ancestor(subject_concept.concept_id,
+                                                  type_concept.concept_id):
+            raise cls._loop_error(subject_concept, type_concept)
 
         # Ensure 'is' relationship for subject and type, e.g. 'otter is animal'
         is_relationship = cls._ensure_relationship(subject_concept,
@@ -255,8 +599,11 @@ class FactManager(object):
         
         """
         # Find or create relevant RelationshipType
-        relationship_type = fact_model.RelationshipType.select_by_name(relationship_type_name)
-        if not relationship_type:
+        relationship_type_id = fact_model.RelationshipType.id_for_name(relationship_type_name)
+        if relationship_type_id is not None:
+            relationship_type = fact_model.RelationshipType.reference(relationship_type_name,
+                                                                      relationship_type_id)
+        else:
             relationship_type = fact_model.RelationshipType(
                 relationship_type_name=relationship_type_name)
 
@@ -310,6 +657,137 @@ class FactManager(object):
                                                    fact_id=new_fact_id)
         return relationship
 
+    @classmethod
+    def _get_answer_cache(cls):
+        """Create AnswerCache from Config on first use.
+
+        :rtype: :py:class:`~answer_cache.AnswerCache`
+        :return: shared AnswerCache; None if cache is disabled by configuration
+
+        """
+        if not cls._answer_cache and Config.answer_cache_max_entries:
+            cls._answer_cache = AnswerCache(max_entries=Config.answer_cache_max_entries)
+        return cls._answer_cache
+
+    @classmethod
+    def _get_async_pools(cls):
+        """Create thread pools of asynchronous methods on first use in each process.
+
+        The wit pool has Config.async_wit_concurrency threads and the database pool
+        Config.async_db_pool_size threads, each with its own db session. Threads do not
+        survive fork, so forked processes create their own pools.
+
+        :rtype: (:py:class:`multiprocessing.pool.ThreadPool`,
+          :py:class:`multiprocessing.pool.ThreadPool`)
+        :return: wit pool and database pool
+
+        """
+        with cls._async_pools_lock:
+            if cls._async_pools_pid != os.getpid():
+                cls._wit_pool = multiprocessing.pool.ThreadPool(
+                    processes=Config.async_wit_concurrency)
+                cls._db_pool = multiprocessing.pool.ThreadPool(
+                    processes=Config.async_db_pool_size)
+                cls._async_pools_pid = os.getpid()
+            return cls._wit_pool, cls._db_pool
+
+    @classmethod
+    def _get_cached_answer(cls, query_sentence):
+        """Normalize query sentence and look up its answer in answer cache.
+
+        :rtype: (unicode, int, bool, unicode)
+        :return: normalized sentence, current knowledge base generation, whether answer is
+          cached and cached answer
+        :raise: :py:class:`~exc.InvalidQueryDataError` if sentence is empty
+
+        :type query_sentence: unicode
+        :arg query_sentence: user-provided query sentence
+
+        """
+        query_sentence = cls._normalize_sentence(query_sentence)
+        if not query_sentence:
+            raise exc.InvalidQueryDataError("Empty query sentence provided")
+
+        answer_cache = cls._get_answer_cache()
+        kb_generation = cls._kb_generation
+        is_cached, answer = False, None
+        if answer_cache:
+            is_cached, answer = answer_cache.get(query_sentence, kb_generation)
+            if is_cached:
+                logger.debug("Cached answer for '{0}': {1}".format(query_sentence, answer))
+        return query_sentence, kb_generation, is_cached, answer
+
+    @classmethod
+    def _get_concept_ids(cls):
+        """Load ids of persisted concepts on first use.
+
+        Concepts added by other processes or not yet committed are not in the cache; they are
+        selected from the database as before.
+
+        :rtype: {unicode: int}
+        :return: concept ids by concept name
+
+        """
+        with cls._concept_ids_lock:
+            if cls._concept_ids is None:
+                fact_model.add_commit_listener(cls._apply_committed_changes)
+                cls._concept_ids = dict(fact_model.Concept.select_name_id_pairs())
+            return cls._concept_ids
+
+    @classmethod
+    def _get_wit_cache(cls):
+        """Create WitCache from Config on first use.
+
+        :rtype: :py:class:`~wit_cache.WitCache`
+        :return: shared WitCache; None if cache is disabled by configuration
+
+        """
+        if not cls._wit_cache and Config.wit_cache_path:
+            cls._wit_cache = WitCache(Config.wit_cache_path,
+                                      Config.wit_query_uri,
+                                      Config.wit_api_version,
+                                      max_entries=Config.wit_cache_max_entries,
+                                      ttl_seconds=Config.wit_cache_ttl_seconds)
+        return cls._wit_cache
+
+    @classmethod
+    def _loop_error(cls, subject_concept, type_concept):
+        """Create error for 'is' relationship that would make a loop of 'is' relationships.
+
+        :rtype: :py:class:`~exc.ConflictingFactError`
+        :return: error referencing fact of the 'is' relationship of type_concept through which
+          it is subject_concept
+
+        :type subject_concept: :py:class:`~fact_model.Concept`
+        :arg subject_concept: subject of new 'is' relationship, e.g. 'food'
+
+        :type type_concept: :py:class:`~fact_model.Concept`
+        :arg type_concept: object of new 'is' relationship, which is subject_concept, e.g. 'animal'
+
+        """
+        concept_name = subject_concept.concept_name
+        concept_type = type_concept.concept_name
+        # 'is' relationships of type_concept and those of their objects that are subject_concept
+        # are selected with one query each, however many concept types type_concept has
+        concept_type_rels = fact_model.Relationship.select_by_subject_id(
+            type_concept.concept_id, fact_model.RelationshipType.id_for_name('is'))
+        for concept_type_rel in concept_type_rels:
+            if concept_type_rel.object.concept_name == concept_name:
+                msg = ("Cannot add relationship '{0} is {1}'; "
+                       "existing relationship '{1} is {0}'").format(concept_name, concept_type)
+                return exc.ConflictingFactError(msg, conflicting_fact_id=concept_type_rel.fact_id)
+        descendant_ids = fact_model.ConceptAncestor.select_descendant_ids(
+            subject_concept.concept_id, [rel.object_id for rel in concept_type_rels])
+        for concept_type_rel in concept_type_rels:
+            if concept_type_rel.object_id in descendant_ids:
+                msg = ("Cannot add relationship '{0} is {1}'; existing relationship "
+                       "'{1} is {2}' makes {1} a kind of {0}").format(
+                    concept_name, concept_type, concept_type_rel.object.concept_name)
+                return exc.ConflictingFactError(msg, conflicting_fact_id=concept_type_rel.fact_id)
+        msg = "Cannot add relationship '{0} is {1}'; {1} is a kind of {0}".format(
+            concept_name, concept_type)
+        return exc.ConflictingFactError(msg)
+
     @classmethod
     def _merge_to_db_session(cls, model):
         """Merge provided model object to database session.
@@ -323,6 +801,21 @@ class FactManager(object):
         """
         return fact_model.db.session.merge(model)
 
+    @classmethod
+    def _normalize_fact_sentence(cls, fact_sentence):
+        """Normalize fact sentence with _normalize_sentence.
+
+        :rtype: unicode
+        :return: normalized sentence
+        :raise: :py:class:`~exc.SentenceParseError` if sentence is empty
+
+        """
+        logger.debug("Processing sentence '{0}'".format(fact_sentence))
+        fact_sentence = cls._normalize_sentence(fact_sentence)
+        if not fact_sentence:
+            raise exc.SentenceParseError("Empty fact sentence provided")
+        return fact_sentence
+
     @classmethod
     def _normalize_sentence(cls, sentence):
         """Normalize provided sentence for comparison, parsing and persistence.
@@ -341,10 +834,58 @@ class FactManager(object):
             sentence = sentence.lower()
         return sentence
 
+    @classmethod
+    def _parse_fact_sentence(cls, fact_sentence):
+        """Use wit to parse normalized fact sentence.
+
+        :rtype: (:py:class:`ParsedSentence`, Exception)
+        :return: (parsed sentence, None) or (None, error) if sentence cannot be parsed
+
+        :type fact_sentence: unicode
+        :arg fact_sentence: normalized fact sentence
+
+        """
+        try:
+            wit_response = cls._query_wit(fact_sentence)
+        except exc.ExternalApiError as ex:
+            return None, ex
+        try:
+            parsed_sentence = ParsedSentence.from_wit_response(wit_response)
+            parsed_sentence.validate_fact()
+        except ValueError as ex:
+            return None, exc.InvalidFactDataError("Invalid fact: {0}; wit_response={1}".format(
+                    ex, wit_response))
+        return parsed_sentence, None
+
+    @classmethod
+    def _parse_fact_sentences(cls, fact_sentences):
+        """Parse normalized fact sentences with bounded number of concurrent wit requests.
+
+        :rtype: [(:py:class:`ParsedSentence`, Exception), ...]
+        :return: result of _parse_fact_sentence for each sentence, in order of sentences
+
+        :type fact_sentences: [unicode, ...]
+        :arg fact_sentences: normalized fact sentences
+
+        """
+        concurrency = min(Config.fact_batch_wit_concurrency, len(fact_sentences))
+        if concurrency <= 1:
+            return [cls._parse_fact_sentence(s) for s in fact_sentences]
+        pool = multiprocessing.pool.ThreadPool(processes=concurrency)
+        try:
+            return pool.map(cls._parse_fact_sentence, fact_sentences)
+        finally:
+            pool.close()
+            pool.join()
+
     @classmethod
     def _query_wit(cls, sentence):
         """Wrapper around wit.ai text_query API.
 
+        Responses are served from the wit cache when possible. Otherwise the sentence is sent
+        to wit.ai by the shared WitClient, and successful responses with a recognized intent
+        are added to the cache.
+
         :rtype: dict 
         :return: wit.ai response
         :raises: :py:class:`exc.ExternalApiError`
@@ -353,18 +894,38 @@ class FactManager(object):
         :arg sentence: input for wit.text_query
         
         """
-        url = '{0}?v={1}&q={2}'.format(
-            Config.wit_query_uri, Config.wit_api_version, urllib.quote_plus(sentence))
-        headers = {'Accept': 'application/json',
-                   'Authorization': 'Bearer {0}'.format(Config.wit_access_token)}
-        try:
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise exc.ExternalApiError("Failed response from wit.ai: {0}".format(response))
-        except requests.exceptions.RequestException as ex:
-            raise exc.ExternalApiError("Error communicating with wit.ai: {0}".format(ex))
+        wit_cache = cls._get_wit_cache()
+        if wit_cache:
+            try:
+                cached_response = wit_cache.get(sentence)
+                if cached_response is not None:
+                    return cached_response
+            except sqlite3.Error as ex:
+                logger.warn("Failed to read wit cache: {0}".format(ex))
+
+        response_data = WitClient.shared().query(sentence)
+
+        if wit_cache:
+            try:
+                wit_cache.set(sentence, response_data)
+            except sqlite3.Error as ex:
+                logger.warn("Failed to update wit cache: {0}".format(ex))
+        return response_data
+
+    @classmethod
+    def _reset_caches(cls):
+        """Discard in-process caches loaded from database; they are reloaded on next use.
+        """
+        ConceptHierarchy.reset()
+        FactGraph.reset()
+        if Config.fact_query_backend == 'matrix':
+            from attribute_matrix import AttributeMatrix
+            AttributeMatrix.reset()
+        fact_model.RelationshipType.reset_ids_by_name()
+        with cls._concept_ids_lock:
+            if cls._concept_ids is not None:
+                fact_model.remove_commit_listener(cls._apply_committed_changes)
+            cls._concept_ids = None
 
     @classmethod
     def _save_parsed_fact(cls, parsed_sentence):
@@ -418,3 +979,111 @@ class FactManager(object):
             
         return incoming_fact
 
+    @classmethod
+    def _save_parsed_facts(cls, parsed_facts, existing_facts):
+        """Save parsed facts that are not yet persisted, each in its own savepoint, and commit.
+
+        A fact that cannot be saved, whether its data is invalid or the database rejects it,
+        rolls back its own savepoint only.
+
+        :rtype: [(:py:class:`~fact_model.IncomingFact`, Exception), ...]
+        :return: (IncomingFact, None) or (None, error) for each parsed fact, in order
+
+        :type parsed_facts: [(unicode, :py:class:`ParsedSentence`, Exception), ...]
+        :arg parsed_facts: (normalized sentence, parsed sentence, error) triples; parsed
+          sentence may be None for sentences in existing_facts
+
+        :type existing_facts: {unicode: :py:class:`~fact_model.IncomingFact`}
+        :arg existing_facts: persisted facts by normalized sentence; updated with saved facts
+
+        """
+        results = []
+        failed = {}
+        num_saved = 0
+        for sentence, parsed_sentence, error in parsed_facts:
+            if not error and sentence in failed:
+                error = failed[sentence]
+            elif not error and sentence not in existing_facts:
+                savepoint = fact_model.db.session.begin_nested()
+                try:
+                    existing_facts[sentence] = cls._save_parsed_fact(parsed_sentence)
+                    savepoint.commit()
+                    num_saved += 1
+                except (exc.IncomingDataError, sa_exc.SQLAlchemyError) as ex:
+                    # e.g. IntegrityError from concurrent insert of same concept or relationship
+                    savepoint.rollback()
+                    error = failed[sentence] = ex
+            results.append((None, error) if error else (existing_facts[sentence], None))
+        if num_saved:
+            cls._commit_kb_changes()
+        else:
+            fact_model.db.session.commit()
+        return results
+
+    @classmethod
+    def _save_wit_fact(cls, wit_response):
+        """Save and commit fact parsed from wit.ai response.
+
+        :rtype: :py:class:`~fact_model.IncomingFact`
+        :return: saved IncomingFact, or existing fact with same data
+        :raise: :py:class:`~exc.IncomingDataError` if fact is invalid or cannot be saved
+
+        :type wit_response: dict
+        :arg wit_response: wit.ai response for normalized fact sentence
+
+        """
+        try:
+            parsed_sentence = ParsedSentence.from_wit_response(wit_response)
+            parsed_sentence.validate_fact()
+        except ValueError as ex:
+            raise exc.InvalidFactDataError("Invalid fact: {0}; wit_response={1}".format(
+                    ex, wit_response))
+        incoming_fact = cls._save_parsed_fact(parsed_sentence)
+        cls._commit_kb_changes()
+        return incoming_fact
+
+    @classmethod
+    def _submit(cls, future, pool, fn, *args, **kwargs):
+        """Call function in thread of async pool, completing future with its result or error.
+
+        Results of calls in database pool are detached from the db session of the thread,
+        which is removed after each call, so that they can be used by other threads.
+
+        :type future: :py:class:`~future.Future`
+        :arg future: future to complete with result or exception of fn
+
+        :type pool: :py:class:`multiprocessing.pool.ThreadPool`
+        :arg pool: wit or database pool, see _get_async_pools
+
+        :type fn: fn(*args)
+        :arg fn: function to call
+
+        :type then: fn(result)
+        :arg then: optional keyword argument; function called in same thread with result of
+          fn instead of completing future, e.g. to submit next step of call
+
+        """
+        then = kwargs.pop('then', None)
+        is_db_pool = pool is cls._db_pool
+
+        def run():
+            result, exc_info = None, None
+            try:
+                result = fn(*args)
+                if is_db_pool and isinstance(result, fact_model.db.Model):
+                    # Load attributes expired by commit before detaching
+                    fact_model.db.session.refresh(result)
+                    fact_model.db.session.expunge(result)
+            except Exception:
+                exc_info = sys.exc_info()
+            finally:
+                if is_db_pool:
+                    fact_model.db.session.remove()
+            if exc_info:
+                future.set_exception(exc_info)
+            elif then:
+                then(result)
+            else:
+                future.set_result(result)
+
+        pool.apply_async(run)
@@ -6,67 +6,306 @@
 
 from __future__ import unicode_literals
 
+import binascii
+import collections
 import datetime
+import itertools
+import logging
+import threading
 import uuid
 
+import flask
 from flask_sqlalchemy import SQLAlchemy
 import sqlalchemy as sa
+import sqlalchemy.event as sa_event
 import sqlalchemy.ext.associationproxy as sa_assoc_proxy
 import sqlalchemy.orm as sa_orm
 import sqlalchemy.types as sa_types
 
-from animalia import app
 from config import Config
 
-__all__ = ('Concept',
+__all__ = ('CommittedChanges',
+           'Concept',
+           'ConceptAncestor',
            'IncomingFact',
+           'KbGeneration',
            'Relationship',
+           'RelationshipRecord',
            'RelationshipType',
+           'RelationshipTypeId',
+           'add_commit_listener',
+           'init_app',
            )
 
-app.config['SQLALCHEMY_DATABASE_URI'] = Config.db_connection
-db = SQLAlchemy(app)
+logger = logging.getLogger('animalia.FactModel')
 
-class UUIDType(sa_types.TypeDecorator):
+
+class _SQLAlchemy(SQLAlchemy):
+    """SQLAlchemy that binds to a bare app on first use outside of any app context.
+
+    Command line tools such as train.py use the model without the web app of
+    animalia.create_app; see init_app.
     """
+    def get_app(self, reference_app=None):
+        if reference_app is None and self.app is None and not flask.current_app:
+            logger.debug("Binding database to bare app")
+            init_app(flask.Flask('animalia'))
+        return super(_SQLAlchemy, self).get_app(reference_app=reference_app)
+
+db = _SQLAlchemy()
+
+
+def init_app(app):
+    """Bind database of Config.db_connection to Flask app.
+
+    The first app bound is also used outside of app contexts, so that there is one engine per
+    process whether the model is used by web requests or directly.
+
+    :type app: :py:class:`flask.Flask`
+    :arg app: app to bind
+
+    """
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', Config.db_connection)
+    db.init_app(app)
+    if db.app is None:
+        db.app = app
+
+class UUIDType(sa_types.TypeDecorator):
+    """Store UUIDs as CHAR(36) strings or, if storage is 'binary', as BINARY(16).
+
+    Bound values may be UUIDs or UUID strings; loaded values are always UUIDs. Loaded UUIDs
+    are built directly from their integer value and interned, so ids that appear in many
+    rows, e.g. the fact_id shared by relationships of a fact, are not allocated for every row.
+
     http://docs.sqlalchemy.org/en/latest/core/custom_types.html#backend-agnostic-guid-type
     """
     impl = sa_types.CHAR
 
+    # Loaded UUIDs by stored value; cleared when it grows beyond Config.uuid_intern_max_entries
+    _interned_uuids = {}
+
+    def __init__(self, storage=None):
+        """
+        :type storage: unicode
+        :arg storage: 'char' or 'binary'; defaults to Config.uuid_storage
+        """
+        super(UUIDType, self).__init__()
+        self.storage = storage or Config.uuid_storage
+        if self.storage not in ('char', 'binary'):
+            raise ValueError("Invalid UUID storage: {0}".format(self.storage))
+
+    def load_dialect_impl(self, dialect):
+        if self.storage == 'binary':
+            return dialect.type_descriptor(sa_types.BINARY(16))
+        return dialect.type_descriptor(sa_types.CHAR(36))
+
     def process_bind_param(self, value, dialect):
         if value:
-            value = str(value)
+            if self.storage == 'binary':
+                # Much faster than UUID.bytes and uuid.UUID(value).bytes
+                if isinstance(value, uuid.UUID):
+                    value = binascii.unhexlify('%032x' % value.int)
+                else:
+                    try:
+                        value = binascii.unhexlify(value.replace('-', ''))
+                    except TypeError:
+                        raise ValueError("Invalid UUID: {0}".format(value))
+            else:
+                value = str(value)
         return value
 
     def process_result_value(self, value, dialect):
         if value:
-            value = uuid.UUID(hex=value)
+            interned_uuids = self._interned_uuids
+            loaded_uuid = interned_uuids.get(value)
+            if loaded_uuid is None:
+                if self.storage == 'binary':
+                    loaded_uuid = self._uuid_from_int(int(binascii.hexlify(value), 16))
+                else:
+                    loaded_uuid = self._uuid_from_int(int(value.replace('-', ''), 16))
+                if len(interned_uuids) >= Config.uuid_intern_max_entries:
+                    interned_uuids.clear()
+                interned_uuids[value] = loaded_uuid
+            value = loaded_uuid
         return value
 
     @staticmethod
     def new_uuid():
         return str(uuid.uuid4())
 
+    @staticmethod
+    def _uuid_from_int(value):
+        """Create UUID without the argument parsing and validation done by uuid.UUID.
+        """
+        loaded_uuid = object.__new__(uuid.UUID)
+        loaded_uuid.__dict__['int'] = value
+        return loaded_uuid
+
+
+def _next_relationship_type_id(context):
+    """Assign id to new RelationshipType that is not a synonym of an existing one.
+
+    Relationship type ids are shared by synonyms, so relationship_types cannot generate them;
+    they are allocated from the auto-increment key of RelationshipTypeId instead, which never
+    hands out the same id to concurrent transactions.
+    """
+    result = context.connection.execute(RelationshipTypeId.__table__.insert())
+    return result.inserted_primary_key[0]
+
+def _chunks(values, size=500):
+    """Split values into lists small enough for IN clauses.
+    """
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def _persistent_reference(model_class, primary_key, **values):
+    """Get instance of model_class with primary_key from db session, or attach new instance
+    created from values as persistent, without selecting it from the database.
+    """
+    key = sa_orm.util.identity_key(model_class, primary_key)
+    model = db.session.identity_map.get(key)
+    if model is None:
+        model = model_class(**values)
+        sa_orm.make_transient_to_detached(model)
+        db.session.add(model)
+    return model
+
 
 class Concept(db.Model):
     __tablename__ = 'concepts'
-    concept_id = sa.Column(UUIDType(), primary_key=True, default=UUIDType.new_uuid)
+    # Concepts and relationship types have integer keys, which make for small indexes and
+    # cheap joins; ids of facts and relationships, which are exposed by the API, are UUIDs
+    concept_id = sa.Column(sa.Integer, primary_key=True, autoincrement=True)
     concept_name = sa.Column(sa.String(255), nullable=False, unique=True)
 
+    @classmethod
+    def reference(cls, concept_id, concept_name):
+        """Get persistent Concept with known id and name without selecting it.
+
+        :rtype: :py:class:`Concept`
+        :return: Concept in db session; unloaded attributes are loaded on first access
+
+        :type concept_id: int
+        :arg concept_id: id of persisted concept
+
+        :type concept_name: unicode
+        :arg concept_name: name of persisted concept
+
+        """
+        return _persistent_reference(cls, concept_id, concept_id=concept_id,
+                                     concept_name=concept_name)
+
     @classmethod
     def select_by_name(cls, name):
         return db.session.query(cls).filter_by(concept_name=name).first()
 
+    @classmethod
+    def select_name_id_pairs(cls):
+        """Select name and id of all Concepts without loading ORM objects.
+
+        :rtype: [(unicode, int), ...]
+        :return: list of (concept_name, concept_id) tuples
+
+        """
+        return db.session.query(cls.concept_name, cls.concept_id).all()
+
+
+class RelationshipTypeId(db.Model):
+    __tablename__ = 'relationship_type_ids'
+    # Sequence of ids allocated to relationship types; see _next_relationship_type_id
+    relationship_type_id = sa.Column(sa.Integer, primary_key=True, autoincrement=True)
+
 
 class RelationshipType(db.Model):
     __tablename__ = 'relationship_types'
     relationship_type_name = sa.Column(sa.String(45), primary_key=True)
-    relationship_type_id = sa.Column(UUIDType(), default=UUIDType.new_uuid, nullable=False)
+    relationship_type_id = sa.Column(sa.Integer, default=_next_relationship_type_id,
+                                     nullable=False)
+
+    # Ids of committed relationship types by name, including all synonyms; loaded on first use
+    # and refreshed when relationship types are committed, see id_for_name
+    _ids_by_name = None
+    _ids_by_name_lock = threading.Lock()
+
+    @classmethod
+    def id_for_name(cls, name):
+        """Resolve relationship type name or any of its synonyms to relationship type id.
+
+        Ids of committed relationship types are looked up in memory, so queries can filter
+        relationships on relationship_type_id instead of joining relationship_types. Names
+        that are not known yet are selected from the database.
+
+        :rtype: int
+        :return: id of relationship type; None if there is no relationship type with name
+
+        :type name: unicode
+        :arg name: name of relationship type, e.g. 'is', 'are' or 'is a'
+
+        """
+        with cls._ids_by_name_lock:
+            if cls._ids_by_name is None:
+                add_commit_listener(cls._refresh_ids_by_name)
+                cls._ids_by_name = dict(cls.select_name_id_pairs())
+            relationship_type_id = cls._ids_by_name.get(name)
+        if relationship_type_id is None and name:
+            relationship_type_id = db.session.query(cls.relationship_type_id).\
+                filter_by(relationship_type_name=name).scalar()
+        return relationship_type_id
+
+    @classmethod
+    def reference(cls, relationship_type_name, relationship_type_id):
+        """Get persistent RelationshipType with known name and id without selecting it.
+
+        :rtype: :py:class:`RelationshipType`
+        :return: RelationshipType in db session
+
+        :type relationship_type_name: unicode
+        :arg relationship_type_name: name of persisted relationship type
+
+        :type relationship_type_id: int
+        :arg relationship_type_id: id of persisted relationship type
+
+        """
+        return _persistent_reference(cls, relationship_type_name,
+                                     relationship_type_name=relationship_type_name,
+                                     relationship_type_id=relationship_type_id)
+
+    @classmethod
+    def reset_ids_by_name(cls):
+        """Discard ids by name; they are reloaded on next call to id_for_name.
+        """
+        with cls._ids_by_name_lock:
+            if cls._ids_by_name is not None:
+                remove_commit_listener(cls._refresh_ids_by_name)
+            cls._ids_by_name = None
 
     @classmethod
     def select_by_name(cls, name):
         return db.session.query(cls).filter_by(relationship_type_name=name).first()
 
+    @classmethod
+    def select_name_id_pairs(cls):
+        """Select name and id of all RelationshipTypes without loading ORM objects.
+
+        :rtype: [(unicode, int), ...]
+        :return: list of (relationship_type_name, relationship_type_id) tuples
+
+        """
+        return db.session.query(cls.relationship_type_name, cls.relationship_type_id).all()
+
+    @classmethod
+    def _refresh_ids_by_name(cls, changes):
+        """Add committed relationship types to ids by name; see add_commit_listener.
+
+        Does nothing if ids by name were reset after this listener was called, so that they are
+        reloaded on next use instead.
+        """
+        with cls._ids_by_name_lock:
+            if cls._ids_by_name is None:
+                return
+            cls._ids_by_name.update(changes.saved_relationship_types)
+
 
 class Relationship(db.Model):
     __tablename__ = 'relationships'
@@ -74,12 +313,21 @@ class Relationship(db.Model):
         sa.ForeignKeyConstraint(['relationship_type_id'], 
                                 [RelationshipType.relationship_type_id]),
         sa.ForeignKeyConstraint(['subject_id'], [Concept.concept_id]),
-        sa.ForeignKeyConstraint(['object_id'], [Concept.concept_id])
+        sa.ForeignKeyConstraint(['object_id'], [Concept.concept_id]),
+        # Indexes match sql/fact_schema.sql. Relationships are looked up by relationship type
+        # and subject, e.g. 'What do bears eat?', or by relationship type and object and
+        # optional count, e.g. 'Which animals have four legs?'; the latter index covers the
+        # subjects selected, so queries for which animals need not read relationship rows.
+        sa.Index('relationship_foreign_keys_UNIQUE',
+                 'subject_id', 'relationship_type_id', 'object_id', unique=True),
+        sa.Index('ix_relationship_type_object',
+                 'relationship_type_id', 'object_id', 'count', 'subject_id'),
+        sa.Index('ix_relationship_fact_id', 'fact_id')
         )
     relationship_id = sa.Column(UUIDType(), primary_key=True, default=UUIDType.new_uuid)
-    relationship_type_id = sa.Column(UUIDType(), nullable=False)
-    subject_id = sa.Column(UUIDType(), nullable=False)
-    object_id = sa.Column(UUIDType(), nullable=False)
+    relationship_type_id = sa.Column(sa.Integer, nullable=False)
+    subject_id = sa.Column(sa.Integer, nullable=False)
+    object_id = sa.Column(sa.Integer, nullable=False)
     count = sa.Column(sa.Integer, default=None)
     fact_id = sa.Column(UUIDType(), nullable=True)
 
@@ -103,9 +351,9 @@ class Relationship(db.Model):
         :rtype: py:class:`~fact_model.Relationship`
         :return: matching relationship; None if not found
 
-        :type subject_id: uuid
-        :type object_id: uuid
-        :type relationship_type_id: uuid
+        :type subject_id: int
+        :type object_id: int
+        :type relationship_type_id: int
 
         """
         filter_clause = sa.and_(
@@ -113,6 +361,20 @@ class Relationship(db.Model):
             cls.relationship_type_id == relationship_type_id)
         return db.session.query(cls).filter(filter_clause).first()
 
+    @classmethod
+    def select_by_subject_id(cls, subject_id, relationship_type_id):
+        """Select all Relationships of subject with specified relationship type.
+
+        :rtype: [py:class:`~fact_model.Relationship`]
+        :return: matching relationships, with subjects and objects loaded
+
+        :type subject_id: int
+        :type relationship_type_id: int
+
+        """
+        return db.session.query(cls).\
+            filter_by(subject_id=subject_id, relationship_type_id=relationship_type_id).all()
+
     @classmethod
     def select_by_values(cls, relationship_type_name=None, relationship_number=None,
                          subject_name=None, object_name=None):
@@ -134,9 +396,10 @@ class Relationship(db.Model):
         :arg object_name: optional name of object concept
 
         """
-        query = db.session.query(cls).\
-            join(RelationshipType).\
-            filter(RelationshipType.relationship_type_name==relationship_type_name)
+        relationship_type_id = RelationshipType.id_for_name(relationship_type_name)
+        if relationship_type_id is None:
+            return []
+        query = db.session.query(cls).filter(cls.relationship_type_id==relationship_type_id)
         if relationship_number:
             query = query.filter(Relationship.count==relationship_number)
         if subject_name: 
@@ -151,11 +414,37 @@ class Relationship(db.Model):
                 filter(object_concept.concept_name==object_name)
         return query.all()
 
+    @classmethod
+    def select_records(cls, relationship_type_id=None):
+        """Select Relationships as RelationshipRecords without loading ORM objects.
+
+        :rtype: [py:class:`~fact_model.RelationshipRecord`]
+        :return: records for all relationships or for relationships of specified type
+
+        :type relationship_type_id: int
+        :arg relationship_type_id: optional id of relationship type to select
+
+        """
+        subject_concept = sa_orm.aliased(Concept)
+        object_concept = sa_orm.aliased(Concept)
+        query = db.session.query(cls.relationship_id,
+                                 cls.relationship_type_id,
+                                 subject_concept.concept_name,
+                                 object_concept.concept_name,
+                                 cls.count,
+                                 cls.fact_id).\
+            join(subject_concept, cls.subject_id==subject_concept.concept_id).\
+            join(object_concept, cls.object_id==object_concept.concept_id)
+        if relationship_type_id:
+            query = query.filter(cls.relationship_type_id==relationship_type_id)
+        return [RelationshipRecord(*row) for row in query]
+
 Relationship.subject = sa_orm.relationship(
     Concept, primaryjoin=Concept.concept_id==Relationship.subject_id, lazy=False)
 Relationship.object = sa_orm.relationship(
     Concept, primaryjoin=Concept.concept_id==Relationship.object_id, lazy=False)
-Relationship.relationship_types = sa_orm.relationship(RelationshipType, uselist=True, lazy=False) 
+# Not loaded with relationships: joining relationship_types yields one row per synonym
+Relationship.relationship_types = sa_orm.relationship(RelationshipType, uselist=True, lazy=True)
 Relationship.relationship_type_names = sa_assoc_proxy.association_proxy(
     'relationship_types', 'relationship_type_name')
 
@@ -170,6 +459,205 @@ Concept.concept_type_relationships = sa_orm.relationship(
 Concept.concept_types = sa_assoc_proxy.association_proxy(
     'concept_type_relationships', 'object.concept_name')
 
+class ConceptAncestor(db.Model):
+    __tablename__ = 'concept_ancestors'
+    __table_args__ = (
+        sa.ForeignKeyConstraint(['ancestor_id'], [Concept.concept_id]),
+        sa.ForeignKeyConstraint(['descendant_id'], [Concept.concept_id]),
+        # Primary key serves 'is X a kind of Y' and the descendants of a concept type, e.g.
+        # all reptiles; this index serves the ancestors of a concept
+        sa.Index('ix_concept_ancestor_descendant', 'descendant_id', 'ancestor_id', 'depth'),
+        )
+    # Closure of 'is' relationships: descendant is ancestor, directly or through other
+    # concepts, and depth is the number of 'is' relationships on the shortest such path. Rows
+    # are maintained on flush of 'is' relationships; see _refresh_concept_ancestors.
+    ancestor_id = sa.Column(sa.Integer, primary_key=True, autoincrement=False)
+    descendant_id = sa.Column(sa.Integer, primary_key=True, autoincrement=False)
+    depth = sa.Column(sa.Integer, nullable=False)
+
+    # Concept types that are not inherited through 'is' relationships: 'mammal is species'
+    # does not make otter a species
+    meta_types = frozenset(['species'])
+
+    @classmethod
+    def is_ancestor(cls, ancestor_id, descendant_id):
+        """Determine if concept is, directly or transitively, a kind of other concept.
+
+        :rtype: bool
+        :return: True if descendant has ancestor among its ancestors, False otherwise or if
+          either concept is not persisted
+
+        :type ancestor_id: int
+        :arg ancestor_id: id of concept type, e.g. id of 'mammal'
+
+        :type descendant_id: int
+        :arg descendant_id: id of concept, e.g. id of 'otter'
+
+        """
+        if not ancestor_id or not descendant_id:
+            return False
+        query = db.session.query(cls.depth).\
+            filter_by(ancestor_id=ancestor_id, descendant_id=descendant_id)
+        return query.first() is not None
+
+    @classmethod
+    def select_name_pairs(cls):
+        """Select all rows of concept_ancestors as names of concepts.
+
+        :rtype: [(unicode, unicode), ...]
+        :return: (ancestor name, descendant name) pairs, e.g. ('mammal', 'otter')
+
+        """
+        ancestor = sa_orm.aliased(Concept)
+        descendant = sa_orm.aliased(Concept)
+        return db.session.query(ancestor.concept_name, descendant.concept_name).\
+            join(cls, cls.ancestor_id==ancestor.concept_id).\
+            join(descendant, cls.descendant_id==descendant.concept_id).all()
+
+    @classmethod
+    def select_descendant_ids(cls, ancestor_id, concept_ids):
+        """Select concepts that are, directly or transitively, a kind of other concept.
+
+        :rtype: set
+        :return: ids of concepts in concept_ids that have ancestor among their ancestors
+
+        :type ancestor_id: int
+        :arg ancestor_id: id of concept type, e.g. id of 'mammal'
+
+        :type concept_ids: [int, ...]
+        :arg concept_ids: ids of concepts, e.g. ids of 'otter' and 'salmon'
+
+        """
+        descendant_ids = set()
+        for chunk in _chunks(concept_ids):
+            query = db.session.query(cls.descendant_id).\
+                filter(cls.ancestor_id == ancestor_id).filter(cls.descendant_id.in_(chunk))
+            descendant_ids.update(descendant_id for (descendant_id,) in query)
+        return descendant_ids
+
+    @classmethod
+    def rebuild(cls, connection, is_type_id):
+        """Recompute concept_ancestors from all 'is' relationships, e.g. to fill the table
+        created by sql/migrate_concept_ancestors.sql.
+
+        :type connection: :py:class:`sqlalchemy.engine.Connection`
+        :arg connection: connection of transaction in which to rebuild concept_ancestors
+
+        :type is_type_id: int
+        :arg is_type_id: relationship_type_id of 'is'
+
+        """
+        relationships = Relationship.__table__
+        subject_ids = set(row[0] for row in connection.execute(
+                sa.select([relationships.c.subject_id]).where(
+                    relationships.c.relationship_type_id == is_type_id)))
+        connection.execute(cls.__table__.delete())
+        cls.refresh(connection, subject_ids, is_type_id)
+
+    @classmethod
+    def refresh(cls, connection, concept_ids, is_type_id):
+        """Recompute ancestors of concepts and of all concepts that are, directly or
+        transitively, any of them, and write differences to concept_ancestors.
+
+        Only the concepts below the changed 'is' relationships are read and written, so adding
+        a concept to a deep hierarchy costs a handful of indexed queries.
+
+        :rtype: [(int, int, bool), ...]
+        :return: (ancestor_id, descendant_id, deleted) for each pair added to or deleted from
+          concept_ancestors; pairs whose depth changed are not included
+
+        :type connection: :py:class:`sqlalchemy.engine.Connection`
+        :arg connection: connection of transaction in which 'is' relationships changed
+
+        :type concept_ids: set
+        :arg concept_ids: ids of subjects of saved or deleted 'is' relationships
+
+        :type is_type_id: int
+        :arg is_type_id: relationship_type_id of 'is'
+
+        """
+        relationships = Relationship.__table__
+        is_relationship = relationships.c.relationship_type_id == is_type_id
+
+        # Affected concepts, top down: concepts and, level by level, their descendants
+        affected = list(concept_ids)
+        pending = set(concept_ids)
+        while pending:
+            children = set()
+            for ids in _chunks(pending):
+                children.update(row[0] for row in connection.execute(
+                        sa.select([relationships.c.subject_id]).where(
+                            sa.and_(is_relationship, relationships.c.object_id.in_(ids)))))
+            pending = children.difference(affected)
+            affected.extend(pending)
+
+        parents = collections.defaultdict(set)
+        for ids in _chunks(affected):
+            for subject_id, object_id in connection.execute(
+                    sa.select([relationships.c.subject_id, relationships.c.object_id]).where(
+                        sa.and_(is_relationship, relationships.c.subject_id.in_(ids)))):
+                parents[subject_id].add(object_id)
+
+        # Persisted ancestors of affected concepts and of the unaffected concepts they are
+        ancestors = collections.defaultdict(dict)
+        unaffected_parents = set(itertools.chain(*parents.values())).difference(affected)
+        for ids in _chunks(set(affected) | unaffected_parents):
+            for ancestor_id, descendant_id, depth in connection.execute(
+                    sa.select([cls.ancestor_id, cls.descendant_id, cls.depth]).where(
+                        cls.descendant_id.in_(ids))):
+                ancestors[descendant_id][ancestor_id] = depth
+        persisted = dict((concept_id, ancestors.pop(concept_id, {})) for concept_id in affected)
+
+        concepts = Concept.__table__
+        meta_type_ids = set(row[0] for row in connection.execute(
+                sa.select([concepts.c.concept_id]).where(
+                    concepts.c.concept_name.in_(cls.meta_types))))
+
+        # Iterate until ancestors settle, which also handles loops of 'is' relationships
+        changed = True
+        while changed:
+            changed = False
+            for concept_id in affected:
+                computed = {}
+                for parent_id in parents.get(concept_id, ()):
+                    inherited = [(ancestor_id, depth)
+                                 for ancestor_id, depth in ancestors[parent_id].iteritems()
+                                 if ancestor_id not in meta_type_ids]
+                    for ancestor_id, depth in [(parent_id, 0)] + inherited:
+                        if (ancestor_id != concept_id and
+                                depth + 1 < computed.get(ancestor_id, depth + 2)):
+                            computed[ancestor_id] = depth + 1
+                if computed != ancestors[concept_id]:
+                    ancestors[concept_id] = computed
+                    changed = True
+
+        deleted, inserted, updated = [], [], []
+        for concept_id in affected:
+            before, after = persisted[concept_id], ancestors[concept_id]
+            for ancestor_id in set(before).difference(after):
+                deleted.append({'a_id': ancestor_id, 'd_id': concept_id})
+            for ancestor_id, depth in after.iteritems():
+                if ancestor_id not in before:
+                    inserted.append({'ancestor_id': ancestor_id, 'descendant_id': concept_id,
+                                     'depth': depth})
+                elif before[ancestor_id] != depth:
+                    updated.append({'a_id': ancestor_id, 'd_id': concept_id, 'new_depth': depth})
+
+        table = cls.__table__
+        pair = sa.and_(table.c.ancestor_id == sa.bindparam('a_id'),
+                       table.c.descendant_id == sa.bindparam('d_id'))
+        if deleted:
+            connection.execute(table.delete().where(pair), deleted)
+        if updated:
+            connection.execute(
+                table.update().where(pair).values(depth=sa.bindparam('new_depth')), updated)
+        if inserted:
+            connection.execute(table.insert(), inserted)
+        logger.debug("Refreshed ancestors of {0} concepts: {1} added, {2} removed".format(
+                len(affected), len(inserted), len(deleted)))
+        return ([(row['a_id'], row['d_id'], True) for row in deleted] +
+                [(row['ancestor_id'], row['descendant_id'], False) for row in inserted])
+
 class IncomingFact(db.Model):
     __tablename__ = 'incoming_facts'
     fact_id = sa.Column(UUIDType(), primary_key=True, default=UUIDType.new_uuid)
@@ -185,3 +673,260 @@ class IncomingFact(db.Model):
     @classmethod
     def select_by_text(cls, text):
         return db.session.query(cls).filter_by(fact_text=text).first()
+
+    @classmethod
+    def select_by_texts(cls, texts):
+        """Select IncomingFacts with any of specified texts.
+
+        :rtype: dict
+        :return: dict of fact_text to IncomingFact for texts of existing facts
+
+        :type texts: [unicode, ...]
+        :arg texts: fact texts to select
+
+        """
+        if not texts:
+            return {}
+        query = db.session.query(cls).filter(cls.fact_text.in_(set(texts)))
+        return dict((fact.fact_text, fact) for fact in query)
+
+
+class KbGeneration(db.Model):
+    __tablename__ = 'kb_generation'
+    # Single row counting committed changes to facts, so that processes on any host can tell
+    # whether caches they loaded from the database are current; see increment
+    kb_generation_id = sa.Column(sa.Integer, primary_key=True, autoincrement=False)
+    generation = sa.Column(sa.Integer, nullable=False, default=0)
+
+    _row_id = 1
+
+    @classmethod
+    def increment(cls):
+        """Increment generation in transaction of db session, to be committed with changes.
+
+        The row stays locked until the transaction ends, so concurrent transactions changing
+        facts get distinct generations.
+
+        :rtype: int
+        :return: incremented generation
+
+        """
+        table = cls.__table__
+        result = db.session.execute(
+            table.update().where(table.c.kb_generation_id == cls._row_id).
+            values(generation=table.c.generation + 1))
+        if not result.rowcount:
+            db.session.execute(table.insert().values(kb_generation_id=cls._row_id, generation=1))
+        return cls.select_generation()
+
+    @classmethod
+    def select_generation(cls):
+        """
+        :rtype: int
+        :return: committed generation, or generation incremented by current transaction; 0 if
+          facts have never been changed
+
+        """
+        return db.session.query(cls.generation).\
+            filter_by(kb_generation_id=cls._row_id).scalar() or 0
+
+
+
+# Notification of committed changes
+#
+# Listeners registered with add_commit_listener are called after each commit that saved or
+# deleted Concepts or Relationships or saved RelationshipTypes, along with the rows of
+# concept_ancestors that it added or deleted. Changes are captured as plain records at flush
+# time, so listeners never see uncommitted or rolled back data and never trigger lazy loads. Releasing a savepoint does not notify listeners; its changes are reported with the
+# enclosing transaction, and rolling back a savepoint discards only changes flushed within it.
+
+RelationshipRecord = collections.namedtuple(
+    'RelationshipRecord',
+    ['relationship_id', 'relationship_type_id', 'subject_name', 'object_name', 'count', 'fact_id'])
+
+AncestorRecord = collections.namedtuple(
+    'AncestorRecord', ['ancestor_name', 'descendant_name', 'deleted'])
+
+CommittedChanges = collections.namedtuple(
+    'CommittedChanges',
+    ['saved_relationships', 'deleted_relationships', 'saved_relationship_types',
+     'saved_concepts', 'deleted_concepts', 'changed_ancestors'])
+
+_commit_listeners = []
+
+def add_commit_listener(listener):
+    """Register function to be called with :py:class:`CommittedChanges` after commit.
+
+    :type listener: fn(:py:class:`CommittedChanges`)
+    :arg listener: function to call with changes to Concepts, Relationships and RelationshipTypes
+
+    """
+    if listener not in _commit_listeners:
+        _commit_listeners.append(listener)
+
+def remove_commit_listener(listener):
+    """Unregister function registered with add_commit_listener.
+    """
+    if listener in _commit_listeners:
+        _commit_listeners.remove(listener)
+
+def _as_uuid(value):
+    """Coerce value assigned by UUIDType.new_uuid or loaded by UUIDType to UUID.
+    """
+    if value and not isinstance(value, uuid.UUID):
+        value = uuid.UUID(hex=value)
+    return value
+
+def _concept_name(session, concept, concept_id):
+    """Get name of concept related to flushed Relationship, which may have been created with
+    concept_id only.
+    """
+    if concept is not None:
+        return concept.concept_name
+    return session.connection().scalar(
+        sa.select([Concept.__table__.c.concept_name]).where(
+            Concept.__table__.c.concept_id == concept_id))
+
+def _relationship_record(session, relationship):
+    """Snapshot Relationship as RelationshipRecord.
+    """
+    return RelationshipRecord(relationship_id=_as_uuid(relationship.relationship_id),
+                              relationship_type_id=relationship.relationship_type_id,
+                              subject_name=_concept_name(session, relationship.subject,
+                                                         relationship.subject_id),
+                              object_name=_concept_name(session, relationship.object,
+                                                        relationship.object_id),
+                              count=relationship.count,
+                              fact_id=_as_uuid(relationship.fact_id))
+
+def _flushed_changes(session):
+    """CommittedChanges of current transaction, to which flushed changes are added.
+    """
+    return session.info.setdefault(
+        'committed_changes', CommittedChanges([], [], [], [], [], []))
+
+@sa_event.listens_for(sa_orm.Session, 'after_flush')
+def _record_flushed_changes(session, flush_context):
+    if not _commit_listeners:
+        return
+    changes = _flushed_changes(session)
+    for model in session.new:
+        if isinstance(model, Relationship):
+            changes.saved_relationships.append(_relationship_record(session, model))
+        elif isinstance(model, RelationshipType):
+            changes.saved_relationship_types.append(
+                (model.relationship_type_name, model.relationship_type_id))
+        elif isinstance(model, Concept):
+            changes.saved_concepts.append((model.concept_name, model.concept_id))
+    for model in session.dirty:
+        if isinstance(model, Relationship) and session.is_modified(model):
+            changes.saved_relationships.append(_relationship_record(session, model))
+    for model in session.deleted:
+        if isinstance(model, Relationship):
+            changes.deleted_relationships.append(_relationship_record(session, model))
+        elif isinstance(model, Concept):
+            changes.deleted_concepts.append((model.concept_name, model.concept_id))
+
+@sa_event.listens_for(sa_orm.Session, 'after_transaction_create')
+def _mark_savepoint(session, transaction):
+    if transaction.nested:
+        changes = session.info.get('committed_changes')
+        marks = session.info.setdefault('savepoint_marks', {})
+        marks[transaction] = [len(records) for records in changes] if changes else None
+
+@sa_event.listens_for(sa_orm.Session, 'after_transaction_end')
+def _unmark_savepoint(session, transaction):
+    if transaction.nested:
+        session.info.get('savepoint_marks', {}).pop(transaction, None)
+
+@sa_event.listens_for(sa_orm.Session, 'after_commit')
+def _notify_commit_listeners(session):
+    if session.transaction is not None and session.transaction.nested:
+        return
+    changes = session.info.pop('committed_changes', None)
+    if changes:
+        for listener in list(_commit_listeners):
+            try:
+                listener(changes)
+            except Exception as ex:
+                logger.exception("Commit listener {0} failed: {1}".format(listener, ex))
+
+@sa_event.listens_for(sa_orm.Session, 'after_rollback')
+def _discard_flushed_changes(session):
+    if session.transaction is not None and session.transaction.nested:
+        marks = session.info.get('savepoint_marks', {}).get(session.transaction)
+        changes = session.info.get('committed_changes')
+        if marks is None:
+            session.info.pop('committed_changes', None)
+        elif changes:
+            for records, mark in zip(changes, marks):
+                del records[mark:]
+    else:
+        session.info.pop('committed_changes', None)
+
+
+# Maintenance of concept_ancestors
+#
+# ConceptAncestor rows are refreshed in the transaction that flushes 'is' relationships, so the
+# closure is always consistent with the relationships visible to the same transaction, and
+# rolling back a transaction or savepoint rolls back its closure rows as well.
+
+def _is_type_id(session):
+    """Id of 'is' relationship type, from ids of committed relationship types if loaded.
+
+    Does not load ids by name, which would cache relationship types flushed by the current
+    transaction before it commits; see RelationshipType.id_for_name.
+    """
+    ids_by_name = RelationshipType._ids_by_name
+    if ids_by_name and 'is' in ids_by_name:
+        return ids_by_name['is']
+    relationship_types = RelationshipType.__table__
+    return session.connection().scalar(
+        sa.select([relationship_types.c.relationship_type_id]).where(
+            relationship_types.c.relationship_type_name == 'is'))
+
+def _changed_is_subject_ids(session, is_type_id):
+    """Ids of subjects of flushed Relationships that are or were 'is' relationships.
+    """
+    subject_ids = set()
+    for model in itertools.chain(session.new, session.deleted):
+        if isinstance(model, Relationship) and model.relationship_type_id == is_type_id:
+            subject_ids.add(model.subject_id)
+    for model in session.dirty:
+        if isinstance(model, Relationship):
+            state = sa.inspect(model)
+            histories = [state.attrs[key].history
+                         for key in ('relationship_type_id', 'subject_id', 'object_id')]
+            if (any(history.has_changes() for history in histories) and
+                    is_type_id in histories[0].sum()):
+                subject_ids.update(histories[1].sum())
+    return subject_ids
+
+@sa_event.listens_for(sa_orm.Session, 'after_flush')
+def _refresh_concept_ancestors(session, flush_context):
+    if not any(isinstance(model, Relationship)
+               for model in itertools.chain(session.new, session.dirty, session.deleted)):
+        return
+    is_type_id = _is_type_id(session)
+    if is_type_id is None:
+        return
+    subject_ids = _changed_is_subject_ids(session, is_type_id)
+    if subject_ids:
+        changed = ConceptAncestor.refresh(session.connection(), subject_ids, is_type_id)
+        if changed and _commit_listeners:
+            _record_changed_ancestors(session, changed)
+
+def _record_changed_ancestors(session, changed):
+    """Record rows added to and deleted from concept_ancestors as AncestorRecords.
+    """
+    concepts = Concept.__table__
+    # Concepts deleted by flush are no longer in concepts table
+    names = dict((model.concept_id, model.concept_name) for model in session.deleted
+                 if isinstance(model, Concept))
+    concept_ids = set(itertools.chain(*[(a_id, d_id) for a_id, d_id, _ in changed]))
+    for ids in _chunks(concept_ids.difference(names)):
+        names.update(session.connection().execute(
+                sa.select([concepts.c.concept_id, concepts.c.concept_name]).where(
+                    concepts.c.concept_id.in_(ids))).fetchall())
+    _flushed_changes(session).changed_ancestors.extend(
+        AncestorRecord(names[a_id], names[d_id], deleted) for a_id, d_id, deleted in changed)
@@ -7,22 +7,55 @@
 from __future__ import unicode_literals
 
 import logging
+import threading
 
+from concept_hierarchy import ConceptHierarchy
+from config import Config
+from fact_graph import FactGraph
 import fact_model
+from query_compiler import QueryCompiler
 
 logger = logging.getLogger('animalia.FactQuery')
 
 
+class QueryMemo(object):
+    """Results of concept type checks and relationship lookups made while answering one query.
+
+    Answer functions repeat lookups, e.g. _animal_how_many_query and _which_animal_query both
+    check whether the subject is a species. Results are kept only until the query is answered,
+    so they cannot become stale.
+    """
+    def __init__(self):
+        self.values = {}
+        self.lookups = 0
+        self.saved = 0
+
+    def get(self, key, fn):
+        """Get memoized result of key, calling fn to compute it the first time.
+        """
+        self.lookups += 1
+        if key in self.values:
+            self.saved += 1
+        else:
+            self.values[key] = fn()
+        return self.values[key]
+
+
 class FactQuery(object):
     """Encapsulation of logic to answer query based on facts database.
     """
 
+    # Memo of query being answered by find_answer in current thread
+    _memo = threading.local()
+
     def __init__(self, parsed_query=None):
         """
         :type parsed_query: :py:class:`ParsedSentence`
         :arg parsed_query: object containing parsed query components
         """
         self.parsed_query = parsed_query
+        # Number of lookups answered from memo by last call to find_answer
+        self.saved_lookups = 0
 
     def find_answer(self):
         """Query persisted fact data to answer question presented in parsed sentence.
@@ -37,7 +70,14 @@ class FactQuery(object):
         fn = self._find_answer_function()
         if not fn:
             raise ValueError("No answer function found")
-        return fn()
+
+        memo = FactQuery._memo.current = QueryMemo()
+        try:
+            return fn()
+        finally:
+            FactQuery._memo.current = None
+            self.saved_lookups = memo.saved
+            logger.debug("Memo saved {0} of {1} lookups".format(memo.saved, memo.lookups))
 
 
     # private methods
@@ -59,13 +99,16 @@ class FactQuery(object):
         :arg concept_name: name of concept
 
         """
-        matches = cls._select_matching_relationships(
-            'is', subject_name=concept_name, object_name='species')
-        return bool(matches)
+        hierarchy = ConceptHierarchy.get_hierarchy()
+        return cls._memoized(('is_species', concept_name),
+                             lambda: hierarchy.is_a(concept_name, 'species'))
 
     @classmethod
     def _filter_relationships_by_concept_type(cls, matches, concept_type, relationship_attr=None):
         """Filter relationships by concept_type on attr_name.
+
+        Concept types are matched transitively, e.g. otter is of concept_type 'vertebrates'
+        if otter is mammal and mammal is vertebrate.
         
         :rtype: [:py:class:`fact_model.Relationship`, ...]
         :return: list of relationships filtered by concept_type on attr_name
@@ -80,12 +123,43 @@ class FactQuery(object):
         :arg relationship_attr: 'subject' or 'object'
         
         """
+        hierarchy = ConceptHierarchy.get_hierarchy()
         filtered_matches = []
         for m in matches:
-            if concept_type in set([ct for ct in (getattr(m, relationship_attr)).concept_types]):
+            if hierarchy.is_a(getattr(m, relationship_attr).concept_name, concept_type):
                 filtered_matches.append(m)
         return filtered_matches
 
+    def _compiled_which_animal_query(self):
+        """Answer 'which animals' query with single SQL statement.
+
+        Equivalent of selecting and filtering relationships in _which_animal_query.
+
+        :rtype: [unicode, ...]
+        :return: list of animals that meet specified criteria
+
+        """
+        statement = QueryCompiler.compile_which_animal_query(
+            self.parsed_query, **self._which_animal_query_types())
+        match_names = QueryCompiler.execute(statement)
+        logger.debug("Matching subjects: {0}".format(match_names))
+        return match_names
+
+    def _compiled_how_many_animal_query(self):
+        """Count animals matching 'how many animals' query with single SQL COUNT statement.
+
+        Equivalent of len() of the names selected by _compiled_which_animal_query.
+
+        :rtype: int
+        :return: number of animals that meet specified criteria
+
+        """
+        statement = QueryCompiler.compile_how_many_animal_query(
+            self.parsed_query, **self._which_animal_query_types())
+        count = QueryCompiler.execute_scalar(statement)
+        logger.debug("Matching subject count: {0}".format(count))
+        return count
+
     def _find_answer_function(self):
         """Find function that will answer question represented by current parsed_sentence.
 
@@ -105,6 +179,54 @@ class FactQuery(object):
         fn_name = '_{0}_query'.format(intent_base)
         return getattr(self, fn_name, None)
 
+    def _graph_which_animal_subjects(self):
+        """Evaluate 'which animals' query on posting lists of fact graph.
+
+        Equivalent of selecting and filtering relationships in _which_animal_query.
+
+        :rtype: (:py:class:`fact_graph.FactGraph`, :py:class:`bitmap.Bitmap`)
+        :return: graph and interned ids of animals that meet specified criteria
+
+        """
+        graph = FactGraph.get_graph()
+        subjects = graph.which_animal_subjects(self.parsed_query,
+                                               **self._which_animal_query_types())
+        return graph, subjects
+
+    def _matrix_which_animal_mask(self):
+        """Evaluate 'which animals' query as vectorized operations on attribute matrix.
+
+        Equivalent of selecting and filtering relationships in _which_animal_query.
+
+        :rtype: (:py:class:`attribute_matrix.AttributeMatrix`, :py:class:`numpy.ndarray`)
+        :return: matrix and boolean mask of animals that meet specified criteria
+
+        """
+        # Imported on first use, so that NumPy is only loaded by the 'matrix' backend
+        from attribute_matrix import AttributeMatrix
+        matrix = AttributeMatrix.get_matrix()
+        mask = matrix.which_animal_mask(self.parsed_query, **self._which_animal_query_types())
+        return matrix, mask
+
+    @classmethod
+    def _memoized(cls, key, fn):
+        """Get result of lookup from memo of query being answered, if any.
+
+        :rtype: object
+        :return: memoized result of key, or result of fn outside find_answer
+
+        :type key: tuple
+        :arg key: hashable description of lookup
+
+        :type fn: fn()
+        :arg fn: function making lookup
+
+        """
+        memo = getattr(cls._memo, 'current', None)
+        if memo is None:
+            return fn()
+        return memo.get(key, fn)
+
     @classmethod
     def _select_by_concept_type(cls, concept_type):
         """Select all concepts that have 'is' relationship to one of specified concept_types.
@@ -119,10 +241,22 @@ class FactQuery(object):
         matches = cls._select_matching_relationships('is', object_name=concept_type)
         return [m.subject for m in matches]
 
+    @classmethod
+    def _relationship_source(cls):
+        """Find source of relationships according to Config.fact_query_backend.
+
+        :rtype: :py:class:`fact_model.Relationship` or :py:class:`fact_graph.FactGraph`
+        :return: object with select_by_values method
+
+        """
+        if Config.fact_query_backend == 'graph':
+            return FactGraph.get_graph()
+        return fact_model.Relationship
+
     @classmethod
     def _select_matching_relationships(cls, relationship_type_name, relationship_number=None,
                                        subject_name=None, object_name=None):
-        """Wrapper around fact_model.Relationship.select_by_values.
+        """Wrapper around select_by_values of configured relationship source.
 
         :rtype: [:py:class:`fact_model.Relationship`]
         :return: matching Relationships
@@ -147,11 +281,15 @@ class FactQuery(object):
         if relationship_number:
             relationship_number = int(relationship_number)
 
-        matches = fact_model.Relationship.select_by_values(
-            relationship_type_name=relationship_type_name,
-            relationship_number=relationship_number,
-            subject_name=subject_name,
-            object_name=object_name)
+        # Callers may extend matches, so each gets its own list
+        matches = list(cls._memoized(
+                ('relationships', relationship_type_name, relationship_number, subject_name,
+                 object_name),
+                lambda: cls._relationship_source().select_by_values(
+                    relationship_type_name=relationship_type_name,
+                    relationship_number=relationship_number,
+                    subject_name=subject_name,
+                    object_name=object_name)))
 
         logger.debug(
             "Found {0} '{1}' relationships where subject={2}, object={3}, count={4}".format(
@@ -161,6 +299,21 @@ class FactQuery(object):
         return matches
 
 
+    def _which_animal_query_types(self):
+        """Find concept types of subject and object of 'which animals' query.
+
+        :rtype: dict
+        :return: dict with keys 'subject_type', which is subject name if it is a species and
+          'animals' otherwise, and 'object_is_species'
+
+        """
+        subject_type = 'animals'
+        if self._concept_is_species(self.parsed_query.subject_name):
+            subject_type = self.parsed_query.subject_name
+        return {'subject_type': subject_type,
+                'object_is_species': self._concept_is_species(self.parsed_query.object_name)}
+
+
     # per-intent methods
 
     def _animal_attribute_query(self, relationship_type_name=None, 
@@ -297,8 +450,17 @@ class FactQuery(object):
         if (self.parsed_query.subject_name == 'animals' or
             self._concept_is_species(self.parsed_query.subject_name)):
             # First scenario: How many animals have legs?
-            matches = self._which_animal_query()
-            answer = len(matches)
+            if Config.fact_query_backend == 'sql':
+                answer = self._compiled_how_many_animal_query()
+            elif Config.fact_query_backend == 'matrix':
+                matrix, mask = self._matrix_which_animal_mask()
+                answer = int(mask.sum())
+            elif Config.fact_query_backend == 'graph':
+                graph, subjects = self._graph_which_animal_subjects()
+                answer = len(subjects)
+            else:
+                matches = self._which_animal_query()
+                answer = len(matches)
         else:
             # Second scenario: How many legs does the otter have?
             matches = self._select_matching_relationships(
@@ -399,6 +561,15 @@ class FactQuery(object):
                 and self.parsed_query.relationship_type_name):
             raise ValueError("which_animal_query requires subject, object and relationship")
 
+        if Config.fact_query_backend == 'sql':
+            return self._compiled_which_animal_query()
+        if Config.fact_query_backend == 'matrix':
+            matrix, mask = self._matrix_which_animal_mask()
+            return matrix.concept_names(mask)
+        if Config.fact_query_backend == 'graph':
+            graph, subjects = self._graph_which_animal_subjects()
+            return graph.concept_names(subjects)
+
         # Start off querying on specified object
         logger.debug("Find animals with relationship '{0}' to '{1}'".format(
                 self.parsed_query.relationship_type_name,
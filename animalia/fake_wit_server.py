@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""FakeWitServer is a local stand-in for the wit.ai message API.
+
+Serves recorded wit.ai responses over HTTP so that animalia can be exercised and load-tested
+without network access. Responses are looked up by sentence, ignoring case, punctuation and
+whitespace; sentences without a recorded response get a response with no confident outcome,
+like wit.ai gives for sentences it does not understand. Every request can be delayed by a
+latency sampled from a configurable distribution, and a configurable fraction of requests can
+be failed with an HTTP error status or by dropping the connection.
+
+Point Config.wit_query_uri at query_uri of a running server to use it.
+
+"""
+
+from __future__ import unicode_literals
+
+import BaseHTTPServer
+import SocketServer
+import json
+import logging
+import random
+import re
+import threading
+import time
+import urlparse
+
+
+logger = logging.getLogger('animalia.FakeWitServer')
+
+
+class LatencyDistribution(object):
+    """Distribution of simulated wit.ai response latencies, in seconds.
+
+    Specified as 'name:param:...' with times in milliseconds:
+      constant:MS           always MS
+      uniform:LOW:HIGH      uniformly distributed between LOW and HIGH
+      normal:MEAN:STDDEV    normally distributed, never negative
+      exponential:MEAN      exponentially distributed with mean MEAN
+      lognormal:MEDIAN:SIGMA  log-normally distributed; long tail for large SIGMA
+
+    """
+    _num_params = {'constant': 1, 'uniform': 2, 'normal': 2, 'exponential': 1, 'lognormal': 2}
+
+    def __init__(self, name, params, rand=None):
+        """
+        :type name: unicode
+        :arg name: name of distribution, e.g. 'uniform'
+
+        :type params: [float, ...]
+        :arg params: parameters of distribution; all but lognormal SIGMA in milliseconds
+
+        :type rand: :py:class:`random.Random`
+        :arg rand: optional source of random numbers
+
+        """
+        if self._num_params.get(name) != len(params):
+            raise ValueError("Invalid latency distribution: {0} {1}".format(name, params))
+        self.name = name
+        self.params = [float(p) for p in params]
+        self.rand = rand or random.Random()
+
+    @classmethod
+    def from_spec(cls, spec, rand=None):
+        """Create distribution from specification like 'uniform:20:80'.
+
+        :rtype: :py:class:`LatencyDistribution`
+        :raise: ValueError if spec is not valid
+
+        """
+        parts = spec.split(':')
+        return cls(parts[0], [float(p) for p in parts[1:]], rand=rand)
+
+    def sample(self):
+        """Sample latency from distribution.
+
+        :rtype: float
+        :return: latency in seconds; never negative
+
+        """
+        if self.name == 'constant':
+            latency_ms = self.params[0]
+        elif self.name == 'uniform':
+            latency_ms = self.rand.uniform(*self.params)
+        elif self.name == 'normal':
+            latency_ms = self.rand.normalvariate(*self.params)
+        elif self.name == 'exponential':
+            latency_ms = self.rand.expovariate(1 / self.params[0]) if self.params[0] else 0.0
+        else:
+            median_ms, sigma = self.params
+            latency_ms = median_ms * self.rand.lognormvariate(0, sigma)
+        return max(latency_ms, 0.0) / 1000
+
+
+class FakeWitServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    __doc__ = __doc__
+
+    daemon_threads = True
+
+    # Pattern for reducing sentences to lookup keys
+    _non_alnum_exp = re.compile(r'[^\w]+', flags=re.UNICODE)
+
+    def __init__(self, host='localhost', port=0, latency=None, error_rate=0.0,
+                 error_statuses=(500,), drop_rate=0.0, seed=None):
+        """
+        :type host: unicode
+        :arg host: interface to listen on
+
+        :type port: int
+        :arg port: port to listen on; 0 picks a free port
+
+        :type latency: :py:class:`LatencyDistribution`
+        :arg latency: optional distribution of latency added to every response
+
+        :type error_rate: float
+        :arg error_rate: fraction of requests answered with one of error_statuses
+
+        :type error_statuses: [int, ...]
+        :arg error_statuses: HTTP statuses of injected errors, chosen at random
+
+        :type drop_rate: float
+        :arg drop_rate: fraction of requests whose connection is closed without a response
+
+        :type seed: int
+        :arg seed: optional seed for reproducible latencies and errors
+
+        """
+        BaseHTTPServer.HTTPServer.__init__(self, (host, port), _FakeWitRequestHandler)
+        self.rand = random.Random(seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.drop_rate = drop_rate
+        self._responses = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = dict.fromkeys(['requests', 'recorded', 'unknown', 'errors', 'dropped'], 0)
+
+    @property
+    def query_uri(self):
+        """URI of fake message API, for Config.wit_query_uri.
+        """
+        host, port = self.server_address[:2]
+        return 'http://{0}:{1}/message'.format(host, port)
+
+    def add_response(self, response_data, sentence=None):
+        """Add recorded response to be served for sentence.
+
+        :type response_data: dict
+        :arg response_data: wit.ai response data
+
+        :type sentence: unicode
+        :arg sentence: optional sentence; defaults to '_text' of response_data
+
+        """
+        sentence = sentence or response_data['_text']
+        with self._lock:
+            self._responses[self._response_key(sentence)] = response_data
+
+    def add_responses(self, responses):
+        """Add recorded responses to be served for their '_text' sentences.
+
+        :rtype: int
+        :return: number of responses added
+
+        :type responses: iterable of dict
+        :arg responses: wit.ai response data, e.g. values of module like test/wit_responses.py;
+          values that are not wit.ai responses are ignored
+
+        """
+        num_added = 0
+        for response_data in responses:
+            if isinstance(response_data, dict) and '_text' in response_data:
+                self.add_response(response_data)
+                num_added += 1
+        return num_added
+
+    def response_for(self, sentence):
+        """Look up response data to serve for sentence.
+
+        :rtype: dict
+        :return: recorded response, or response with no confident outcome if none is recorded
+
+        """
+        with self._lock:
+            response_data = self._responses.get(self._response_key(sentence))
+            self._stats['recorded' if response_data else 'unknown'] += 1
+        if response_data is None:
+            response_data = {'_text': sentence,
+                             'outcomes': [{'_text': sentence,
+                                           'confidence': 0.0,
+                                           'entities': {},
+                                           'intent': 'UNKNOWN'}]}
+        return response_data
+
+    def start(self):
+        """Serve requests from background thread.
+
+        :rtype: :py:class:`FakeWitServer`
+        :return: this server
+
+        """
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={'poll_interval': 0.1},
+                                        name='FakeWitServer')
+        self._thread.daemon = True
+        self._thread.start()
+        logger.debug("Serving {0} recorded responses at {1}".format(
+                len(self._responses), self.query_uri))
+        return self
+
+    def stop(self):
+        """Stop serving requests and close listening socket.
+        """
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        """Summarize requests served.
+
+        :rtype: dict
+        :return: dict with keys 'requests', 'recorded', 'unknown', 'errors' and 'dropped'
+
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+    # private methods
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _injected_failure(self):
+        """Choose failure to inject into request, if any.
+
+        :rtype: unicode or int
+        :return: 'drop', HTTP error status, or None if request should succeed
+
+        """
+        with self._lock:
+            roll = self.rand.random()
+            if roll < self.drop_rate:
+                return 'drop'
+            if roll < self.drop_rate + self.error_rate:
+                return self.rand.choice(self.error_statuses)
+        return None
+
+    def _response_key(self, sentence):
+        return self._non_alnum_exp.sub(' ', sentence.lower()).strip()
+
+    def _sample_latency(self):
+        if not self.latency:
+            return 0.0
+        with self._lock:
+            return self.latency.sample()
+
+
+class _FakeWitRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Handle wit.ai message API requests: GET /message?v=VERSION&q=SENTENCE
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server._count('requests')
+        url = urlparse.urlparse(self.path)
+        if url.path != '/message':
+            return self._send_json(404, {'error': 'Unknown path', 'code': 'not-found'})
+        query = urlparse.parse_qs(url.query)
+        if not query.get('q'):
+            return self._send_json(400, {'error': 'Missing q', 'code': 'bad-request'})
+        sentence = query['q'][0].decode('utf-8')
+
+        time.sleep(server._sample_latency())
+        failure = server._injected_failure()
+        if failure == 'drop':
+            server._count('dropped')
+            self.close_connection = 1
+            return
+        if failure:
+            server._count('errors')
+            return self._send_json(failure, {'error': 'Injected error', 'code': 'injected'})
+        self._send_json(200, server.response_for(sentence))
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status, data):
+        body = json.dumps(data)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
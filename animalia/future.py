@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Future is the result of an asynchronous call, available once the call completes.
+
+Minimal equivalent of concurrent.futures.Future, which Python 2.7 lacks: the thread that makes
+the call sets its result or exception, and callers wait for it with result() or are notified by
+callbacks added with add_done_callback.
+
+"""
+
+from __future__ import unicode_literals
+
+import logging
+import threading
+
+
+logger = logging.getLogger('animalia.Future')
+
+
+class Future(object):
+    __doc__ = __doc__
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._result = None
+        # (type, value, traceback) of exception raised by call
+        self._exc_info = None
+
+    def add_done_callback(self, fn):
+        """Call fn with future once it is done; at once if it is done already.
+
+        :type fn: fn(:py:class:`Future`)
+        :arg fn: function called by thread that completes future
+
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        self._call(fn)
+
+    def done(self):
+        """
+        :rtype: bool
+        :return: True if result or exception is set
+        """
+        return self._done.is_set()
+
+    def exception(self):
+        """Wait for call to complete.
+
+        :rtype: Exception
+        :return: exception raised by call; None if call succeeded
+
+        """
+        self._done.wait()
+        return self._exc_info[1] if self._exc_info else None
+
+    def result(self):
+        """Wait for call to complete.
+
+        :return: result of call
+        :raise: exception raised by call, with its original traceback
+
+        """
+        self._done.wait()
+        if self._exc_info:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def set_exception(self, exc_info):
+        """Complete future with exception.
+
+        :type exc_info: (type, Exception, traceback)
+        :arg exc_info: exception raised by call, as returned by sys.exc_info
+
+        """
+        self._set(None, exc_info)
+
+    def set_result(self, result):
+        """Complete future with result of call.
+        """
+        self._set(result, None)
+
+
+    # private methods
+
+    def _call(self, fn):
+        try:
+            fn(self)
+        except Exception:
+            logger.exception("Future callback failed")
+
+    def _set(self, result, exc_info):
+        with self._lock:
+            if self._done.is_set():
+                raise RuntimeError("Future is already done")
+            self._result = result
+            self._exc_info = exc_info
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            self._call(fn)
@@ -120,10 +120,22 @@ class ParsedSentence(object):
         alt_subject_name = None
         alt_subject_type = None
 
-        # Iterate over entities; each entity is key (entity_type) referencing list of data
-        # from with entity value can be extracted.
-        for entity_type, entity_data in outcome['entities'].iteritems(): 
-            val, is_suggested = cls._get_entity_value(entity_type, entity_data)
+        # Each entity is key (entity_type) referencing list of data from with entity value can
+        # be extracted.
+        entity_values = [(entity_type,) + cls._get_entity_value(entity_type, entity_data)
+                         for entity_type, entity_data in outcome['entities'].iteritems()]
+
+        # Normalize types and values of all concept entities at once
+        concept_nouns = []
+        for entity_type, val, is_suggested in entity_values:
+            if entity_type not in (cls.RELATIONSHIP_KEY, cls.RELATIONSHIP_COUNT_KEY,
+                                   cls.RELATIONSHIP_NEGATION_KEY):
+                concept_nouns.append(entity_type)
+                if val:
+                    concept_nouns.append(val)
+        plurals = Plurals.get_plurals(concept_nouns)
+
+        for entity_type, val, is_suggested in entity_values:
             logger.debug("Parsed value '{0}' for entity '{1}'{2}".format(
                     val, entity_type, ' (suggested)' if is_suggested else ''))
             if val:
@@ -144,22 +156,22 @@ class ParsedSentence(object):
                 if instance.subject_type:
                     raise ValueError("Parsed multiple subject entities: {0}, {1}".format(
                             instance.subject_type, entity_type))
-                instance.subject_type = Plurals.get_plural(entity_type)
-                instance.subject_name = Plurals.get_plural(val)
+                instance.subject_type = plurals[entity_type]
+                instance.subject_name = plurals.get(val)
 
             elif entity_type in cls.ALT_SUBJECT_ENTITY_TYPES:
                 if alt_subject_type:
                     raise ValueError("Parsed multiple alt subject entities: {0}, {1}".format(
                             alt_subject_type, entity_type))
-                alt_subject_type = Plurals.get_plural(entity_type)
-                alt_subject_name = Plurals.get_plural(val)
+                alt_subject_type = plurals[entity_type]
+                alt_subject_name = plurals.get(val)
 
             else:
                 if instance.object_type:
                     raise ValueError("Parsed multiple object entities: {0}, {1}".format(
                             instance.object_type, entity_type))
-                instance.object_type = Plurals.get_plural(entity_type)
-                instance.object_name = Plurals.get_plural(val)
+                instance.object_type = plurals[entity_type]
+                instance.object_name = plurals.get(val)
 
         # If alt_subject data was found, determine whether it is subject, object or just confusing.
         if alt_subject_type:
@@ -2,18 +2,45 @@
 # -*- coding: utf-8 -*-
 
 """Utility class for generating plural versions of nouns.
+
+Plurals of known nouns come from a precompiled lexicon, Config.plurals_lexicon_path, that is
+loaded once per process; see build_plurals_lexicon.py. Plurals of other nouns are generated
+with inflect and kept in a cache of at most Config.plurals_cache_max_entries nouns, from
+which least recently used nouns are evicted. Lexicon and cache are shared by all threads.
+
 """
 
 from __future__ import unicode_literals
 
+import collections
+import io
+import logging
+import sys
+import threading
+
 import inflect
 
+from config import Config
+
+
+logger = logging.getLogger('animalia.Plurals')
+
 
 class Plurals(object):
     __doc__ = __doc__
 
     inflect_engine = None
-    cached_plurals = {}
+
+    # Singular and plural nouns of lexicon -> plural; None until lexicon is loaded
+    lexicon = None
+    # Singular and plural nouns -> plural, least recently used first
+    cached_plurals = collections.OrderedDict()
+
+    lexicon_hits = 0
+    cache_hits = 0
+    misses = 0
+
+    _lock = threading.RLock()
 
     @classmethod
     def get_plural(cls, noun):
@@ -26,8 +53,52 @@ class Plurals(object):
         :arg noun: singular or plural noun
 
         """
-        plural = cls.cached_plurals.get(noun)
-        if not plural:
+        with cls._lock:
+            if cls.lexicon is None:
+                cls.load_lexicon()
+            return cls._lookup(noun) or cls._inflect_and_cache(noun)
+
+    @classmethod
+    def get_plurals(cls, nouns):
+        """Find or generate plural versions of many nouns at once.
+
+        Equivalent of get_plural for each distinct noun, but looks up all nouns in lexicon and
+        cache under one lock and inflects only those found in neither.
+
+        :rtype: dict
+        :return: plural version of each specified noun, by noun
+
+        :type nouns: iterable of unicode
+        :arg nouns: singular or plural nouns, possibly repeated
+
+        """
+        plurals = {}
+        missing = []
+        with cls._lock:
+            if cls.lexicon is None:
+                cls.load_lexicon()
+            for noun in set(nouns):
+                plural = cls._lookup(noun)
+                if plural:
+                    plurals[noun] = plural
+                else:
+                    missing.append(noun)
+            for noun in missing:
+                plurals[noun] = cls._inflect_and_cache(noun)
+        return plurals
+
+    @classmethod
+    def inflect_noun(cls, noun):
+        """Generate singular and plural versions of noun with inflect, bypassing lexicon and cache.
+
+        :rtype: (unicode, unicode)
+        :return: singular and plural versions of specified noun
+
+        :type noun: unicode
+        :arg noun: singular or plural noun
+
+        """
+        with cls._lock:
             cls._ensure_inflect_engine()
             # Inflect.plural_noun does stupid things if provided word is already plural.
             # So, convert words to singular first. Inflect.singular_noun returns False
@@ -35,12 +106,91 @@ class Plurals(object):
             singular = cls.inflect_engine.singular_noun(noun)
             if not singular:
                 singular = noun
-            plural = cls.inflect_engine.plural_noun(singular)
-            if not cls.cached_plurals.get(singular):
-                cls.cached_plurals[singular] = plural
-        if not cls.cached_plurals.get(plural):
-            cls.cached_plurals[plural] = plural
-        return plural
+            return singular, cls.inflect_engine.plural_noun(singular)
+
+    @classmethod
+    def load_lexicon(cls, path=None):
+        """Load lexicon of singular and plural nouns, replacing any loaded lexicon.
+
+        :rtype: dict
+        :return: loaded lexicon; empty if no lexicon is configured or file cannot be read
+
+        :type path: unicode
+        :arg path: optional path of lexicon file; defaults to Config.plurals_lexicon_path
+
+        """
+        path = path or Config.plurals_lexicon_path
+        lexicon = {}
+        try:
+            for singular, plural in cls.read_lexicon(path):
+                lexicon[singular] = plural
+                lexicon[plural] = plural
+        except IOError as ex:
+            logger.warn("Cannot load plurals lexicon {0}: {1}".format(path, ex))
+        with cls._lock:
+            cls.lexicon = lexicon
+        logger.debug("Loaded {0} nouns from plurals lexicon {1}".format(len(lexicon), path))
+        return lexicon
+
+    @classmethod
+    def read_lexicon(cls, path):
+        """Read singular and plural nouns from lexicon file.
+
+        Lexicon files have one noun per line: singular and plural separated by a tab, since
+        nouns may contain spaces, e.g. 'body part'. Blank lines and lines starting with '#' are
+        ignored.
+
+        :rtype: [(unicode, unicode), ...]
+        :return: singular and plural versions of nouns; empty if path is None
+
+        :type path: unicode
+        :arg path: path of lexicon file
+
+        """
+        nouns = []
+        if path:
+            with io.open(path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.rstrip('\r\n')
+                    if line and not line.startswith('#'):
+                        singular, plural = line.split('\t')
+                        nouns.append((singular, plural))
+        return nouns
+
+    @classmethod
+    def reset(cls):
+        """Discard lexicon, cached plurals and counts; lexicon is reloaded on next use.
+        """
+        with cls._lock:
+            cls.lexicon = None
+            cls.cached_plurals = collections.OrderedDict()
+            cls.lexicon_hits = cls.cache_hits = cls.misses = 0
+
+    @classmethod
+    def stats(cls):
+        """Summarize lexicon and cache usage.
+
+        :rtype: dict
+        :return: dict with keys 'lexicon_entries', 'cache_entries', 'lexicon_hits',
+          'cache_hits', 'misses', 'hit_rate' and 'memory_bytes', which is approximate memory
+          used by lexicon and cache, including their nouns
+
+        """
+        with cls._lock:
+            lexicon = cls.lexicon or {}
+            lookups = cls.lexicon_hits + cls.cache_hits + cls.misses
+            return {'lexicon_entries': len(lexicon),
+                    'cache_entries': len(cls.cached_plurals),
+                    'lexicon_hits': cls.lexicon_hits,
+                    'cache_hits': cls.cache_hits,
+                    'misses': cls.misses,
+                    'hit_rate': (float(cls.lexicon_hits + cls.cache_hits) / lookups
+                                 if lookups else 0.0),
+                    'memory_bytes': (cls._memory_bytes(lexicon) +
+                                     cls._memory_bytes(cls.cached_plurals))}
+
+
+    # private methods
 
     @classmethod
     def _ensure_inflect_engine(cls):
@@ -48,3 +198,42 @@ class Plurals(object):
         """
         if not cls.inflect_engine:
             cls.inflect_engine = inflect.engine()
+
+    @classmethod
+    def _inflect_and_cache(cls, noun):
+        """Generate plural of noun that is in neither lexicon nor cache, and cache it.
+
+        Must be called with cls._lock held.
+        """
+        cls.misses += 1
+        singular, plural = cls.inflect_noun(noun)
+        for word in (singular, plural):
+            cls.cached_plurals.pop(word, None)
+            cls.cached_plurals[word] = plural
+        while len(cls.cached_plurals) > max(Config.plurals_cache_max_entries, 2):
+            cls.cached_plurals.popitem(last=False)
+        return plural
+
+    @classmethod
+    def _lookup(cls, noun):
+        """Find plural of noun in lexicon or cache; None if noun is in neither.
+
+        Must be called with cls._lock held.
+        """
+        plural = cls.lexicon.get(noun)
+        if plural:
+            cls.lexicon_hits += 1
+            return plural
+        plural = cls.cached_plurals.pop(noun, None)
+        if plural:
+            cls.cache_hits += 1
+            cls.cached_plurals[noun] = plural
+        return plural
+
+    @staticmethod
+    def _memory_bytes(plurals):
+        """Approximate memory used by dict of nouns, counting plurals shared by nouns once.
+        """
+        words = set(plurals)
+        words.update(plurals.itervalues())
+        return sys.getsizeof(plurals) + sum(sys.getsizeof(word) for word in words)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""PreforkServer serves a WSGI app with several worker processes that share one socket.
+
+The master process binds and listens on the socket, then forks workers that each create their
+own app by calling an app factory, e.g. animalia.create_app, and accept connections from the
+shared socket, one at a time or, with several threads, concurrently in a bounded pool of
+request threads. Workers share no mutable state: each warms its own caches, e.g.
+FactGraph and AnswerCache, on first use, and discards them when another worker changes facts;
+see FactManager.sync_kb_generation.
+
+The master replaces workers that die, and workers exit if the master dies. The master handles
+signals:
+  SIGHUP           graceful reload: start new workers, then stop old ones once they finish
+                   the requests they are serving; new workers import app code afresh
+  SIGTERM, SIGINT  graceful shutdown: stop workers once they finish their requests, then exit
+
+"""
+
+from __future__ import unicode_literals
+
+import errno
+import logging
+import multiprocessing
+import multiprocessing.pool
+import os
+import Queue
+import signal
+import socket
+import time
+
+import werkzeug.serving
+
+
+logger = logging.getLogger('animalia.PreforkServer')
+
+
+class PreforkServer(object):
+    __doc__ = __doc__
+
+    # Seconds between checks of worker processes and of stop requests
+    poll_interval = 0.5
+
+    def __init__(self, app_factory, host='localhost', port=8080, workers=None, backlog=128,
+                 threads=1):
+        """
+        :type app_factory: fn() -> WSGI app
+        :arg app_factory: function called by every worker to create its app
+
+        :type host: unicode
+        :arg host: bind address, e.g. '0.0.0.0' for all interfaces
+
+        :type port: int
+        :arg port: port to listen on; 0 for any free port, see server_address
+
+        :type workers: int
+        :arg workers: number of worker processes; defaults to number of cores
+
+        :type backlog: int
+        :arg backlog: maximum number of connections queued until a worker accepts them
+
+        :type threads: int
+        :arg threads: number of requests each worker serves concurrently, in threads
+
+        """
+        self.app_factory = app_factory
+        self.workers = workers or multiprocessing.cpu_count()
+        self.threads = max(threads, 1)
+
+        self.socket = socket.socket(werkzeug.serving.select_ip_version(host, port),
+                                    socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, port))
+        self.socket.listen(backlog)
+        # Workers that lose the race to accept a connection must not block in accept
+        self.socket.setblocking(0)
+        self.server_address = self.socket.getsockname()
+
+        # pid -> number of reloads when worker was started
+        self._worker_pids = {}
+        self._reloads = 0
+        self._reload_requested = False
+        self._stop_requested = False
+
+    def run(self):
+        """Start workers and supervise them until SIGTERM or SIGINT; must run in main thread.
+        """
+        logger.info("Serving on {0}:{1} with {2} workers of {3} threads".format(
+                self.server_address[0], self.server_address[1], self.workers, self.threads))
+        previous_handlers = dict(
+            (signum, signal.signal(signum, handler)) for signum, handler in (
+                (signal.SIGHUP, self._request_reload),
+                (signal.SIGTERM, self._request_stop),
+                (signal.SIGINT, self._request_stop)))
+        try:
+            self._start_workers()
+            while not self._stop_requested:
+                if self._reload_requested:
+                    self._reload()
+                self._reap_workers()
+                self._start_workers()
+                time.sleep(self.poll_interval)
+        finally:
+            for signum, handler in previous_handlers.iteritems():
+                signal.signal(signum, handler)
+            self._stop_workers(self._worker_pids.keys())
+            self.socket.close()
+        logger.info("Stopped")
+
+    def worker_pids(self):
+        """
+        :rtype: [int, ...]
+        :return: pids of running workers
+        """
+        return sorted(self._worker_pids)
+
+
+    # private methods
+
+    def _reap_workers(self, block=False):
+        """Forget workers that have exited.
+
+        :rtype: [int, ...]
+        :return: pids of exited workers
+
+        """
+        exited = []
+        while self._worker_pids:
+            try:
+                pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+            except OSError as ex:
+                if ex.errno == errno.EINTR:
+                    continue
+                if ex.errno != errno.ECHILD:
+                    raise
+                break
+            if not pid:
+                break
+            if self._worker_pids.pop(pid, None) is not None:
+                exited.append(pid)
+                if not self._stop_requested:
+                    logger.info("Worker {0} exited with status {1}".format(pid, status))
+            if block:
+                break
+        return exited
+
+    def _reload(self):
+        """Replace all workers, starting new ones before stopping old ones.
+        """
+        self._reload_requested = False
+        self._reloads += 1
+        old_pids = self._worker_pids.keys()
+        logger.info("Reloading {0} workers".format(len(old_pids)))
+        self._start_workers()
+        self._stop_workers(old_pids)
+
+    def _request_reload(self, signum, frame):
+        self._reload_requested = True
+
+    def _request_stop(self, signum, frame):
+        self._stop_requested = True
+
+    def _run_worker(self, master_pid):
+        """Serve requests in worker process until SIGTERM or until master exits; never returns.
+        """
+        status = 0
+        try:
+            stop = []
+            signal.signal(signal.SIGTERM, lambda signum, frame: stop.append(signum))
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            app = self.app_factory()
+            server = _WorkerServer(self.socket, app, threads=self.threads)
+            logger.debug("Worker {0} started".format(os.getpid()))
+            # Orphaned workers are adopted by another process
+            while not stop and os.getppid() == master_pid:
+                server.handle_request()
+            server.close()
+        except Exception:
+            logger.exception("Worker {0} failed".format(os.getpid()))
+            status = 1
+        finally:
+            os._exit(status)
+
+    def _start_workers(self):
+        """Fork workers until configured number of workers is running.
+        """
+        master_pid = os.getpid()
+        while not self._stop_requested and len(
+            [r for r in self._worker_pids.itervalues() if r == self._reloads]) < self.workers:
+            pid = os.fork()
+            if pid == 0:
+                self._run_worker(master_pid)
+            self._worker_pids[pid] = self._reloads
+
+    def _stop_workers(self, pids):
+        """Ask workers to stop after their current request and wait for them to exit.
+        """
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError as ex:
+                if ex.errno != errno.ESRCH:
+                    raise
+        pids = set(pids)
+        while pids & set(self._worker_pids):
+            pids.difference_update(self._reap_workers(block=True))
+
+
+class _WorkerServer(werkzeug.serving.BaseWSGIServer):
+    """WSGI server of worker, accepting connections from socket of PreforkServer.
+
+    With more than one thread, each connection is served by a thread of a pool, and no
+    connection is accepted while all threads are busy, so that other workers accept it.
+
+    """
+    multiprocess = True
+
+    # Seconds to wait for connection before checking for stop request
+    timeout = PreforkServer.poll_interval
+
+    def __init__(self, listening_socket, app, threads=1):
+        host, port = listening_socket.getsockname()[:2]
+        super(_WorkerServer, self).__init__(host, port, app, fd=listening_socket.fileno())
+        self.multithread = threads > 1
+        self._pool = None
+        # One item per idle thread of pool
+        self._idle_threads = Queue.Queue()
+        if self.multithread:
+            self._pool = multiprocessing.pool.ThreadPool(processes=threads)
+            for i in range(threads):
+                self._idle_threads.put(None)
+        # Whether last accepted connection was passed to thread of pool
+        self._dispatched = False
+
+    def close(self):
+        """Wait for threads to finish serving their requests.
+        """
+        if self._pool:
+            self._pool.close()
+            self._pool.join()
+
+    def get_request(self):
+        request, client_address = self.socket.accept()
+        # Connections must block even though listening socket does not
+        request.setblocking(1)
+        return request, client_address
+
+    def handle_request(self):
+        """Serve one connection, in idle thread if server has threads; wait at most timeout.
+        """
+        if not self._pool:
+            return super(_WorkerServer, self).handle_request()
+        try:
+            self._idle_threads.get(timeout=self.timeout)
+        except Queue.Empty:
+            return
+        self._dispatched = False
+        try:
+            super(_WorkerServer, self).handle_request()
+        finally:
+            if not self._dispatched:
+                self._idle_threads.put(None)
+
+    def process_request(self, request, client_address):
+        if not self._pool:
+            return super(_WorkerServer, self).process_request(request, client_address)
+        self._dispatched = True
+        self._pool.apply_async(self._process_request_thread, (request, client_address))
+
+
+    # private methods
+
+    def _process_request_thread(self, request, client_address):
+        """Serve connection in thread of pool, as SocketServer.ThreadingMixIn does.
+        """
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._idle_threads.put(None)
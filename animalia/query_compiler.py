@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""QueryCompiler translates parsed queries into single SQL statements.
+
+FactQuery answers most questions by selecting relationships and filtering them in Python,
+which takes several round trips to the database and loads every candidate relationship. For
+questions whose answer is a set of concept names, QueryCompiler instead builds one statement
+that selects the names directly, using IN and NOT IN subqueries for the relationship and
+concept type conditions. Relationship subqueries select the subjects of relationships with a
+given relationship type and object, which the database reads from index
+ix_relationship_type_object alone. Concept type subqueries select the descendants of the
+concept type from concept_ancestors, so concepts that are of the type through other concepts,
+e.g. 'otter is mammal' and 'mammal is animal', match as well.
+
+How-many questions are compiled into the same conditions under COUNT(DISTINCT concept_id), so
+the database returns the number of matching animals rather than their names.
+
+"""
+
+from __future__ import unicode_literals
+
+import sqlalchemy as sa
+
+import fact_model
+
+
+class QueryCompiler(object):
+    __doc__ = __doc__
+
+    @classmethod
+    def compile_which_animal_query(cls, parsed_query, subject_type='animals',
+                                   object_is_species=False):
+        """Compile 'which animals' query into statement selecting names of matching animals.
+
+        Selects concepts of subject_type that have a relationship of the parsed type with the
+        parsed object, or, if object_is_species, with any concept of that species. If the
+        relationship is negated, selects concepts of subject_type that have no such
+        relationship.
+
+        :rtype: :py:class:`sqlalchemy.sql.expression.Select`
+        :return: statement selecting column 'concept_name'
+
+        :type parsed_query: :py:class:`ParsedSentence`
+        :arg parsed_query: parsed 'which animals' query
+
+        :type subject_type: unicode
+        :arg subject_type: concept type of animals to select, e.g. 'animals' or 'reptiles'
+
+        :type object_is_species: bool
+        :arg object_is_species: True if parsed object is a species, e.g. 'reptiles'
+
+        """
+        animals = fact_model.Concept.__table__.alias('animals')
+        return sa.select([animals.c.concept_name]).where(
+            cls._which_animal_clause(animals, parsed_query, subject_type, object_is_species))
+
+    @classmethod
+    def compile_how_many_animal_query(cls, parsed_query, subject_type='animals',
+                                      object_is_species=False):
+        """Compile 'how many animals' query into statement counting matching animals.
+
+        Counts the concepts that compile_which_animal_query would select, without selecting
+        their names.
+
+        :rtype: :py:class:`sqlalchemy.sql.expression.Select`
+        :return: statement selecting column 'animal_count'
+
+        :type parsed_query: :py:class:`ParsedSentence`
+        :arg parsed_query: parsed 'how many animals' query
+
+        :type subject_type: unicode
+        :arg subject_type: concept type of animals to count, e.g. 'animals' or 'reptiles'
+
+        :type object_is_species: bool
+        :arg object_is_species: True if parsed object is a species, e.g. 'reptiles'
+
+        """
+        animals = fact_model.Concept.__table__.alias('animals')
+        animal_count = sa.func.count(sa.distinct(animals.c.concept_id)).label('animal_count')
+        return sa.select([animal_count]).where(
+            cls._which_animal_clause(animals, parsed_query, subject_type, object_is_species))
+
+    @classmethod
+    def execute(cls, statement):
+        """Execute compiled statement in current db session.
+
+        :rtype: [unicode, ...]
+        :return: values of first column of selected rows
+
+        :type statement: :py:class:`sqlalchemy.sql.expression.Select`
+        :arg statement: statement returned by one of the compile methods
+
+        """
+        return [row[0] for row in fact_model.db.session.execute(statement)]
+
+    @classmethod
+    def execute_scalar(cls, statement):
+        """Execute compiled statement that selects single value in current db session.
+
+        :rtype: int
+        :return: value of first column of first row, e.g. count
+
+        :type statement: :py:class:`sqlalchemy.sql.expression.Select`
+        :arg statement: statement returned by compile_how_many_animal_query
+
+        """
+        return fact_model.db.session.execute(statement).scalar()
+
+
+    # private methods
+
+    @classmethod
+    def _concept_id(cls, concept_name):
+        """Build scalar subquery selecting id of named concept.
+
+        :rtype: :py:class:`sqlalchemy.sql.expression.ScalarSelect`
+
+        """
+        concepts = fact_model.Concept.__table__.alias()
+        return sa.select([concepts.c.concept_id]).\
+            where(concepts.c.concept_name == concept_name).\
+            as_scalar()
+
+    @classmethod
+    def _has_relationship(cls, subject_id_column, relationship_type_name, object_name,
+                          relationship_number=None, object_is_species=False):
+        """Build IN clause for relationship between subject and object.
+
+        :rtype: :py:class:`sqlalchemy.sql.expression.BinaryExpression`
+        :return: clause that is true if subject has matching relationship
+
+        :type subject_id_column: :py:class:`sqlalchemy.schema.Column`
+        :arg subject_id_column: concept_id column of subject in enclosing statement
+
+        :type relationship_type_name: unicode
+        :arg relationship_type_name: name of relationship type
+
+        :type object_name: unicode
+        :arg object_name: name of object concept
+
+        :type relationship_number: int
+        :arg relationship_number: optional value of relationship 'count' attribute
+
+        :type object_is_species: bool
+        :arg object_is_species: if True, also match objects that are of species object_name
+
+        """
+        relationships = fact_model.Relationship.__table__.alias()
+        relationship_type_id = fact_model.RelationshipType.id_for_name(relationship_type_name)
+
+        object_clause = relationships.c.object_id == cls._concept_id(object_name)
+        if object_is_species:
+            object_clause = sa.or_(object_clause,
+                                   cls._is_a(relationships.c.object_id, object_name))
+
+        clauses = [
+            relationships.c.relationship_type_id == relationship_type_id,
+            object_clause]
+        if relationship_number:
+            clauses.append(relationships.c.count == int(relationship_number))
+        return subject_id_column.in_(
+            sa.select([relationships.c.subject_id]).where(sa.and_(*clauses)))
+
+    @classmethod
+    def _is_a(cls, concept_id_column, concept_type):
+        """Build IN clause for concept being, directly or transitively, of concept_type.
+
+        :rtype: :py:class:`sqlalchemy.sql.expression.BinaryExpression`
+        :return: clause that is true if concept_type is among ancestors of concept
+
+        :type concept_id_column: :py:class:`sqlalchemy.schema.Column`
+        :arg concept_id_column: concept_id column of concept in enclosing statement
+
+        :type concept_type: unicode
+        :arg concept_type: name of concept type
+
+        """
+        concept_ancestors = fact_model.ConceptAncestor.__table__.alias()
+        return concept_id_column.in_(
+            sa.select([concept_ancestors.c.descendant_id]).where(
+                concept_ancestors.c.ancestor_id == cls._concept_id(concept_type)))
+
+    @classmethod
+    def _which_animal_clause(cls, animals, parsed_query, subject_type, object_is_species):
+        """Build clause matching animals of subject_type that meet criteria of parsed query.
+
+        :rtype: :py:class:`sqlalchemy.sql.expression.BooleanClauseList`
+        :return: concept type clause and relationship clause, negated if query is negated
+
+        :type animals: :py:class:`sqlalchemy.sql.expression.Alias`
+        :arg animals: alias of concepts table in enclosing statement
+
+        """
+        matching_relationship = cls._has_relationship(
+            animals.c.concept_id,
+            parsed_query.relationship_type_name,
+            parsed_query.object_name,
+            relationship_number=parsed_query.relationship_number,
+            object_is_species=object_is_species)
+        if parsed_query.relationship_negation:
+            matching_relationship = sa.not_(matching_relationship)
+        return sa.and_(cls._is_a(animals.c.concept_id, subject_type), matching_relationship)
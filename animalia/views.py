@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Routes of Flask animalia application, registered on app by animalia.create_app.
+
+Implements API described in README.md.
+
+"""
+
+from __future__ import unicode_literals
+
+import logging
+import json
+import uuid
+
+import flask
+from flask.ext.api import status
+
+from config import Config
+from fact_manager import FactManager
+from exc import IncomingDataError, ExternalApiError
+
+blueprint = flask.Blueprint('animalia', __name__)
+
+# Logger of app created by animalia.create_app
+logger = logging.getLogger('animalia')
+
+@blueprint.before_app_request
+def sync_kb_generation():
+    """Discard cached facts if another process or host has changed them.
+    """
+    FactManager.sync_kb_generation()
+
+@blueprint.route("/")
+def main():
+    return flask.render_template('index.html')
+
+@blueprint.route('/animals/facts/<fact_id>', methods=['DELETE'])
+def delete_fact(fact_id):
+    """Delete fact with specified id.
+
+    Success response: 200 OK
+    Response body: {'id': <UUID>}
+
+    If no such fact exists, response is 404 Not Found.
+
+    When a fact is deleted then the information it represents about animals is no longer 
+    available to the service and the service must stop answering questions with information 
+    from the fact.
+    
+    """
+    response_data = None
+    response_code = status.HTTP_200_OK
+    try:
+        fact_id = uuid.UUID(hex=fact_id)
+    except ValueError:
+        response_data = {'message': 'Specified fact_id is not valid UUID'}
+        response_code = status.HTTP_400_BAD_REQUEST 
+        fact_id = None
+    if fact_id:
+        deleted_fact_id = FactManager.delete_fact_by_id(fact_id)
+        if not deleted_fact_id:
+            response_data = ''
+            response_code = status.HTTP_404_NOT_FOUND
+        else:
+            response_data = {'id': str(deleted_fact_id)}
+    return json.dumps(response_data), response_code
+
+@blueprint.route('/animals/facts/<fact_id>', methods=['GET'])
+def get_fact(fact_id):
+    """Retrieve fact with specified id.
+
+    Success response: 200 OK
+    Response body: {'fact': <sentence>}
+    
+    If no such fact exists, response is 404 Not Found.
+
+    """
+    response_data = None
+    response_code = status.HTTP_200_OK
+    try:
+        fact_id = uuid.UUID(hex=fact_id)
+    except ValueError:
+        response_data = {'message': 'Specified fact_id is not valid UUID'}
+        response_code = status.HTTP_400_BAD_REQUEST 
+        fact_id = None
+    if fact_id:
+        fact = FactManager.get_fact_by_id(fact_id)
+        if not fact:
+            response_data = ''
+            response_code = status.HTTP_404_NOT_FOUND
+        else:
+            response_data = {'fact': fact.fact_text}
+    return json.dumps(response_data), response_code
+    
+@blueprint.route('/animals/facts', methods=['POST'])
+def post_fact():
+    """Add fact represented by sentence.
+    
+    Request body: {'fact': <sentence>}
+    Sentence should be phrased like 'otters live in rivers'
+
+    Success response: 200 OK
+    Response body: {'id': <UUID>}
+
+    Error response: 400 Bad Request
+    Response body: {'message': <error message>}
+
+    Submitting an already existing fact returns the identifier of the original fact.
+
+    """
+    response_data = None
+    response_code = status.HTTP_200_OK
+    req_data = flask.request.json
+    fact_sentence = req_data.get('fact')
+    if not fact_sentence:
+        response_data = {'message': 'Fact sentence is required'}
+        response_code = status.HTTP_400_BAD_REQUEST
+    else:
+        try:
+            fact = FactManager.fact_from_sentence(fact_sentence)
+            response_data = {'id': str(fact.fact_id)}
+        except (IncomingDataError, ExternalApiError) as ex:
+            logger.exception(ex)
+            response_data = {'message': 'Failed to parse your fact',
+                             'details': '{0}'.format(ex)}
+            response_code = status.HTTP_400_BAD_REQUEST
+    return json.dumps(response_data), response_code
+
+@blueprint.route('/animals/facts/batch', methods=['POST'])
+def post_facts():
+    """Add facts represented by list of sentences.
+
+    Request body: {'facts': [<sentence>, ...]}
+
+    Success response: 200 OK
+    Response body: {'results': [<result>, ...]}
+    One result per sentence, in order of sentences: {'id': <UUID>} if fact was added or already
+    exists, {'message': <error message>, 'details': <error details>} otherwise.
+
+    Error response: 400 Bad Request
+    Response body: {'message': <error message>}
+
+    Facts are added in a single transaction; a sentence that cannot be added does not prevent
+    the other sentences from being added.
+
+    """
+    response_data = None
+    response_code = status.HTTP_200_OK
+    req_data = flask.request.json or {}
+    fact_sentences = req_data.get('facts')
+    if not fact_sentences or not isinstance(fact_sentences, list):
+        response_data = {'message': 'List of fact sentences is required'}
+        response_code = status.HTTP_400_BAD_REQUEST
+    elif not all(isinstance(fact_sentence, basestring) for fact_sentence in fact_sentences):
+        response_data = {'message': 'Fact sentences must be strings'}
+        response_code = status.HTTP_400_BAD_REQUEST
+    elif len(fact_sentences) > Config.fact_batch_max_sentences:
+        response_data = {'message': 'At most {0} fact sentences may be submitted'.format(
+                Config.fact_batch_max_sentences)}
+        response_code = status.HTTP_400_BAD_REQUEST
+    else:
+        results = []
+        for fact, ex in FactManager.facts_from_sentences(fact_sentences):
+            if fact:
+                results.append({'id': str(fact.fact_id)})
+            else:
+                logger.warn(ex)
+                results.append({'message': 'Failed to parse your fact',
+                                'details': '{0}'.format(ex)})
+        response_data = {'results': results}
+    return json.dumps(response_data), response_code
+
+@blueprint.route('/animals', methods=['GET'])
+def query_facts():
+    """Respond to question about semantic relationships of animals.
+
+    A query is submitted as a sentence in specific form that follows one of the following patterns:
+      "Where do otters live?"
+      "How many legs does the otter have"?
+      "Which animals have 4 legs?"
+      "How many animals are mammals?"
+
+    Query sentence is specified as query string arg named 'q'.
+
+    Success response: 200 OK
+    Response body: {'fact': <answer>}
+
+    If no response is found, response is 404 Not Found.
+    Response body: {'message': <error>}
+    { "message": "I can't answer your question." }
+
+    If request is malformed, response is 400 Bad Request.
+
+    """
+    response_data = None
+    response_code = status.HTTP_200_OK
+    question = flask.request.args.get('q')
+    if not question:
+        response_data = {'message': 'No question specified'}
+        response_code = status.HTTP_400_BAD_REQUEST 
+    else:
+        try:
+            answer = FactManager.query_facts(question)
+            if answer:
+                response_data = {'fact': answer}
+            else:
+                response_data = {'message': "I can't answer your question."}
+                response_code = status.HTTP_404_NOT_FOUND
+        except (IncomingDataError, ExternalApiError) as ex:
+            logger.exception(ex)
+            response_data = {'message': 'Failed to parse your question',
+                             'details': '{0}'.format(ex)}
+            response_code = status.HTTP_400_BAD_REQUEST
+    return json.dumps(response_data), response_code
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""WitCache is a persistent cache of wit.ai responses.
+
+Responses are stored in a local sqlite database so that they survive application restarts.
+Entries are keyed by wit.ai query URI, API version and normalized sentence. Entries expire
+after a configurable time to live, and least recently used entries are evicted once the cache
+grows beyond its configured size. Responses in which wit.ai recognized no intent are not cached.
+
+"""
+
+from __future__ import unicode_literals
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+logger = logging.getLogger('animalia.WitCache')
+
+
+class WitCache(object):
+    __doc__ = __doc__
+
+    _create_table_sql = """
+        CREATE TABLE IF NOT EXISTS wit_responses (
+          cache_key TEXT NOT NULL PRIMARY KEY,
+          response TEXT NOT NULL,
+          created_utc REAL NOT NULL,
+          accessed_utc REAL NOT NULL)"""
+    _create_index_sql = """
+        CREATE INDEX IF NOT EXISTS ix_wit_responses_accessed_utc
+        ON wit_responses (accessed_utc)"""
+
+    # Intent of outcome of sentence that wit.ai could not parse
+    _unknown_intent = 'UNKNOWN'
+
+    def __init__(self, path, query_uri, api_version, max_entries=None, ttl_seconds=None):
+        """
+        :type path: unicode
+        :arg path: path of sqlite database file; created if it does not exist
+
+        :type query_uri: unicode
+        :arg query_uri: wit.ai message API uri; part of the key of every cached response
+
+        :type api_version: unicode
+        :arg api_version: wit.ai API version; part of the key of every cached response
+
+        :type max_entries: int
+        :arg max_entries: optional maximum number of cached responses
+
+        :type ttl_seconds: int
+        :arg ttl_seconds: optional number of seconds after which a cached response expires
+
+        """
+        self.path = path
+        self.query_uri = query_uri
+        self.api_version = api_version
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+        self._num_entries = 0
+
+    def get(self, sentence):
+        """Look up cached wit.ai response for sentence.
+
+        :rtype: dict
+        :return: cached wit.ai response; None if sentence is not cached or entry has expired
+
+        :type sentence: unicode
+        :arg sentence: sentence submitted to wit.ai
+
+        """
+        cache_key = self._cache_key(sentence)
+        now = time.time()
+        with self._lock:
+            connection = self._ensure_connection()
+            row = connection.execute(
+                "SELECT response, created_utc FROM wit_responses WHERE cache_key = ?",
+                (cache_key,)).fetchone()
+            if row and self._is_expired(row[1], now):
+                logger.debug("Expired cached wit response for '{0}'".format(sentence))
+                connection.execute("DELETE FROM wit_responses WHERE cache_key = ?", (cache_key,))
+                self._num_entries -= 1
+                row = None
+            if not row:
+                self.misses += 1
+                return None
+            connection.execute("UPDATE wit_responses SET accessed_utc = ? WHERE cache_key = ?",
+                               (now, cache_key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, sentence, response_data):
+        """Store wit.ai response for sentence, evicting least recently used entries if necessary.
+
+        Responses without outcomes or with intent 'UNKNOWN' are not stored, so that sentences
+        wit.ai could not parse are submitted again.
+
+        :rtype: bool
+        :return: True if response was stored
+
+        :type sentence: unicode
+        :arg sentence: sentence submitted to wit.ai
+
+        :type response_data: dict
+        :arg response_data: wit.ai response
+
+        """
+        if not self._is_cacheable(response_data):
+            logger.debug("Not caching wit response without intent for '{0}'".format(sentence))
+            return False
+        cache_key = self._cache_key(sentence)
+        now = time.time()
+        with self._lock:
+            connection = self._ensure_connection()
+            is_new = not connection.execute(
+                "SELECT 1 FROM wit_responses WHERE cache_key = ?", (cache_key,)).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO wit_responses "
+                "(cache_key, response, created_utc, accessed_utc) VALUES (?, ?, ?, ?)",
+                (cache_key, json.dumps(response_data), now, now))
+            if is_new:
+                self._num_entries += 1
+            if self.max_entries and self._num_entries > self.max_entries:
+                self._evict(connection, now)
+        return True
+
+    def clear(self):
+        """Remove all cached responses and reset hit and miss counts.
+        """
+        with self._lock:
+            self._ensure_connection().execute("DELETE FROM wit_responses")
+            self._num_entries = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Summarize cache usage.
+
+        :rtype: dict
+        :return: dict with keys 'entries', 'hits', 'misses' and 'hit_rate'
+
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': self._num_entries,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'hit_rate': float(self.hits) / lookups if lookups else 0.0}
+
+
+    # private methods
+
+    def _cache_key(self, sentence):
+        """Build cache key from query URI, API version and sentence with case and whitespace
+        normalized.
+        """
+        return '{0}?v={1}&q={2}'.format(self.query_uri, self.api_version,
+                                        ' '.join(sentence.lower().split()))
+
+    def _ensure_connection(self):
+        """Open sqlite connection if necessary. Caller must hold self._lock.
+
+        A connection is never shared with a forked child process; the child opens its own.
+
+        """
+        if self._connection is None or self._connection_pid != os.getpid():
+            logger.debug("Opening wit cache {0}".format(self.path))
+            self._connection = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False)
+            self._connection_pid = os.getpid()
+            self._connection.execute(self._create_table_sql)
+            self._connection.execute(self._create_index_sql)
+            self._num_entries = self._connection.execute(
+                "SELECT COUNT(*) FROM wit_responses").fetchone()[0]
+        return self._connection
+
+    def _evict(self, connection, now):
+        """Remove expired entries, then least recently used entries beyond max_entries.
+
+        Caller must hold self._lock.
+
+        """
+        if self.ttl_seconds:
+            connection.execute("DELETE FROM wit_responses WHERE created_utc < ?",
+                               (now - self.ttl_seconds,))
+        connection.execute(
+            "DELETE FROM wit_responses WHERE cache_key IN ("
+            "SELECT cache_key FROM wit_responses ORDER BY accessed_utc DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,))
+        self._num_entries = connection.execute(
+            "SELECT COUNT(*) FROM wit_responses").fetchone()[0]
+        logger.debug("Evicted wit cache entries; {0} remain".format(self._num_entries))
+
+    def _is_cacheable(self, response_data):
+        outcomes = response_data.get('outcomes')
+        return bool(outcomes) and all(
+            outcome.get('intent') not in (None, self._unknown_intent) for outcome in outcomes)
+
+    def _is_expired(self, created_utc, now):
+        return bool(self.ttl_seconds) and now - created_utc > self.ttl_seconds
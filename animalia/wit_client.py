@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""WitClient submits sentences to wit.ai over pooled keep-alive connections.
+
+A single shared client per process reuses TCP connections and TLS sessions to wit.ai
+across requests and threads. Connect and read timeouts and pool size come from Config.
+
+"""
+
+from __future__ import unicode_literals
+
+import logging
+import os
+import threading
+
+import requests
+import requests.adapters
+
+from config import Config
+import exc
+
+
+logger = logging.getLogger('animalia.WitClient')
+
+
+class WitClient(object):
+    __doc__ = __doc__
+
+    # Shared client and id of process that created it; see shared()
+    _shared_client = None
+    _shared_client_pid = None
+    _shared_client_lock = threading.Lock()
+
+    def __init__(self, query_uri, access_token, api_version, pool_size=10,
+                 connect_timeout=None, read_timeout=None):
+        """
+        :type query_uri: unicode
+        :arg query_uri: wit.ai message API uri
+
+        :type access_token: unicode
+        :arg access_token: wit.ai access token
+
+        :type api_version: unicode
+        :arg api_version: wit.ai API version
+
+        :type pool_size: int
+        :arg pool_size: maximum number of kept-alive connections to wit.ai
+
+        :type connect_timeout: float
+        :arg connect_timeout: optional seconds to wait for connection to wit.ai
+
+        :type read_timeout: float
+        :arg read_timeout: optional seconds to wait for wit.ai response data
+
+        """
+        self.query_uri = query_uri
+        self.api_version = api_version
+        self.timeout = (connect_timeout, read_timeout)
+        self.num_requests = 0
+        self.num_failures = 0
+        self.num_reused_connections = 0
+        self._stats_lock = threading.Lock()
+
+        # Per thread flag set when request of thread opens new connection; see get
+        self._opened_connection = threading.local()
+        self._adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        poolmanager = self._adapter.poolmanager
+        poolmanager.pool_classes_by_scheme = dict(
+            (scheme, self._connection_opening_pool_class(pool_class))
+            for scheme, pool_class in poolmanager.pool_classes_by_scheme.items())
+        self.session = requests.Session()
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+        self.session.headers.update({'Accept': 'application/json',
+                                     'Authorization': 'Bearer {0}'.format(access_token)})
+
+    @classmethod
+    def shared(cls):
+        """Get client shared by all callers in current process, creating it if necessary.
+
+        Pooled connections are never shared with a forked child process; the child creates
+        its own client.
+
+        :rtype: :py:class:`WitClient`
+        :return: shared client configured from Config
+
+        """
+        with cls._shared_client_lock:
+            if cls._shared_client is None or cls._shared_client_pid != os.getpid():
+                cls._shared_client = cls(Config.wit_query_uri,
+                                         Config.wit_access_token,
+                                         Config.wit_api_version,
+                                         pool_size=Config.wit_pool_size,
+                                         connect_timeout=Config.wit_connect_timeout,
+                                         read_timeout=Config.wit_read_timeout)
+                cls._shared_client_pid = os.getpid()
+            return cls._shared_client
+
+    def get(self, sentence):
+        """Submit sentence to wit.ai message API.
+
+        :rtype: :py:class:`requests.Response`
+        :return: wit.ai response
+        :raise: :py:class:`requests.exceptions.RequestException` on communication failure
+
+        :type sentence: unicode
+        :arg sentence: sentence to be parsed by wit.ai
+
+        """
+        with self._stats_lock:
+            self.num_requests += 1
+        self._opened_connection.value = False
+        try:
+            response = self.session.get(self.query_uri,
+                                        params={'v': self.api_version, 'q': sentence},
+                                        timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            with self._stats_lock:
+                self.num_failures += 1
+            raise
+        if not self._opened_connection.value:
+            with self._stats_lock:
+                self.num_reused_connections += 1
+        return response
+
+    def query(self, sentence):
+        """Submit sentence to wit.ai and return parsed response data.
+
+        :rtype: dict
+        :return: wit.ai response data
+        :raise: :py:class:`exc.ExternalApiError` if request fails or response is not successful
+
+        :type sentence: unicode
+        :arg sentence: sentence to be parsed by wit.ai
+
+        """
+        try:
+            response = self.get(sentence)
+        except requests.exceptions.RequestException as ex:
+            raise exc.ExternalApiError("Error communicating with wit.ai: {0}".format(ex))
+        if response.status_code != 200:
+            with self._stats_lock:
+                self.num_failures += 1
+            raise exc.ExternalApiError("Failed response from wit.ai: {0}".format(response))
+        return response.json()
+
+    def stats(self):
+        """Summarize requests and connection reuse.
+
+        :rtype: dict
+        :return: dict with keys 'requests', 'failures', 'connections' and 'reused_connections',
+          the number of completed requests that ran on an already open connection
+
+        """
+        num_connections = 0
+        for key in self._adapter.poolmanager.pools.keys():
+            pool = self._adapter.poolmanager.pools.get(key)
+            if pool:
+                num_connections += pool.num_connections
+        with self._stats_lock:
+            return {'requests': self.num_requests,
+                    'failures': self.num_failures,
+                    'connections': num_connections,
+                    'reused_connections': self.num_reused_connections}
+
+    # private methods
+
+    def _connection_opening_pool_class(self, pool_class):
+        """Subclass connection pool class to flag requests of current thread opening connections.
+
+        :rtype: type
+        :return: subclass of pool_class setting self._opened_connection.value for new connection
+
+        :type pool_class: type
+        :arg pool_class: urllib3 connection pool class
+
+        """
+        opened_connection = self._opened_connection
+
+        class ConnectionOpeningPool(pool_class):
+            def _new_conn(self):
+                opened_connection.value = True
+                return super(ConnectionOpeningPool, self)._new_conn()
+
+        return ConnectionOpeningPool
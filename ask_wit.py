@@ -23,12 +23,9 @@ from __future__ import unicode_literals
 import argparse
 import logging
 import sys
-import urllib
-
-import requests
 
 # local 
-from animalia.config import Config
+from animalia.wit_client import WitClient
 
 
 def parse_args():
@@ -41,11 +38,7 @@ def parse_args():
     return parser.parse_args()
 
 def query_wit(query):
-    url = 'https://api.wit.ai/message?v=20141022&q={0}'.format(
-        urllib.quote_plus(query))
-    headers = {'Accept': 'application/json',
-               'Authorization': 'Bearer {0}'.format(Config.wit_access_token)}
-    response = requests.get(url, headers=headers)
+    response = WitClient.shared().get(query)
     print('Response status: {0}'.format(response.status_code))
     response_data = response.json()
     print('Response data: {0}'.format(response_data))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark startup time of animalia entry points.
+
+Imports each entry point in fresh Python processes: the web app built by animalia.create_app,
+the train.py trainer, the ask_wit.py query tool and animalia.config alone. Prints the median
+import time of each and which heavy dependencies it loaded, e.g.
+
+  ./benchmark_startup.py --runs 10
+  ./benchmark_startup.py --path ../animalia-old
+
+--path runs the benchmark against another checkout, e.g. one from before animalia.create_app,
+to compare startup times.
+
+"""
+
+from __future__ import unicode_literals
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Entry point -> statement that loads it
+entry_points = [
+    ('web app', "import animalia; getattr(animalia, 'create_app', lambda: animalia.app)()"),
+    ('train.py', "import train"),
+    ('ask_wit.py', "import ask_wit"),
+    ('animalia.config', "import animalia.config"),
+    ]
+
+# Dependencies reported as loaded or not
+heavy_modules = ['flask', 'flask_sqlalchemy', 'sqlalchemy', 'flask_api', 'requests', 'inflect',
+                 'numpy']
+
+# Run in child process: time statement and report loaded modules
+child_script = '''
+import json, sys, time, warnings
+warnings.simplefilter('ignore')
+start = time.time()
+exec(sys.argv[1])
+elapsed = time.time() - start
+print(json.dumps({'seconds': elapsed, 'modules': sorted(sys.modules)}))
+'''
+
+
+def time_entry_point(statement, path, runs):
+    """
+    :rtype: (float, set([unicode, ...]))
+    :return: median seconds to run statement in fresh process, and modules it loaded
+    """
+    env = dict(os.environ, PYTHONPATH=path)
+    timings = []
+    modules = set()
+    for i in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', child_script, statement],
+                                         cwd=path, env=env)
+        result = json.loads(output.splitlines()[-1])
+        timings.append(result['seconds'])
+        modules = set(result['modules'])
+    timings.sort()
+    return timings[len(timings) // 2], modules
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark startup time of animalia entry points',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-r', '--runs', type=int, default=5,
+                        help='number of fresh processes per entry point')
+    parser.add_argument('-p', '--path', default=os.path.dirname(os.path.abspath(__file__)),
+                        help='root of animalia checkout to benchmark')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    print('{0:<18} {1:>10}  {2}'.format('entry point', 'median ms', 'heavy modules loaded'))
+    for name, statement in entry_points:
+        seconds, modules = time_entry_point(statement, args.path, args.runs)
+        loaded = [m for m in heavy_modules if m in modules]
+        print('{0:<18} {1:>10.0f}  {2}'.format(name, seconds * 1000, ', '.join(loaded) or '-'))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Build precompiled lexicon of singular and plural nouns loaded by animalia.plurals.Plurals.
+
+Collects the nouns of training data csv files, i.e. concepts, types, places, body parts, foods
+and parent species, and of optional word lists with one noun per line, generates their
+plurals with inflect and writes them to the lexicon, e.g.
+
+  ./build_plurals_lexicon.py training_data/animalia_data.csv --words more_animals.txt
+
+Nouns already in the lexicon are kept, so the lexicon only grows.
+
+"""
+
+from __future__ import unicode_literals
+
+import argparse
+import csv
+import io
+import logging
+
+from animalia.config import Config
+from animalia.plurals import Plurals
+
+ch = logging.StreamHandler()
+ch.setFormatter(logging.Formatter(fmt='%(name)s [%(levelname)s] %(message)s'))
+logging.root.addHandler(ch)
+logger = logging.getLogger('build_plurals_lexicon')
+logger.setLevel(logging.INFO)
+
+# Columns of training data csv that hold nouns, as single nouns or colon-separated lists
+noun_columns = ['concept', 'type', 'lives', 'has body part', 'eats', 'parent species']
+
+
+def nouns_from_csv(infile):
+    """
+    :rtype: set([unicode, ...])
+    :return: lowercase nouns in noun_columns of training data csv
+    """
+    nouns = set()
+    with open(infile, 'r') as f:
+        for rec in csv.DictReader(f):
+            for column in noun_columns:
+                for noun in (rec.get(column) or '').decode('utf-8').split(':'):
+                    if noun.strip():
+                        nouns.add(noun.strip().lower())
+    return nouns
+
+def nouns_from_word_list(infile):
+    """
+    :rtype: set([unicode, ...])
+    :return: lowercase nouns of word list with one noun per line
+    """
+    with io.open(infile, encoding='utf-8') as f:
+        return set(line.strip().lower() for line in f
+                   if line.strip() and not line.startswith('#'))
+
+def build_lexicon(nouns, lexicon_path):
+    """Add plurals of nouns to lexicon and write it to lexicon_path.
+
+    :rtype: int
+    :return: number of nouns in lexicon
+    """
+    plurals = {}
+    try:
+        plurals.update(Plurals.read_lexicon(lexicon_path))
+    except IOError:
+        logger.info("Creating new lexicon {0}".format(lexicon_path))
+    for noun in nouns:
+        singular, plural = Plurals.inflect_noun(noun)
+        plurals[singular] = plural
+
+    with io.open(lexicon_path, 'w', encoding='utf-8') as f:
+        f.write('# Singular and plural nouns; generated by build_plurals_lexicon.py\n')
+        for singular in sorted(plurals):
+            f.write('{0}\t{1}\n'.format(singular, plurals[singular]))
+    return len(plurals)
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Build precompiled lexicon of plural nouns',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('infiles', nargs='*', default=['training_data/animalia_data.csv'],
+                        help='csv files of training data')
+    parser.add_argument('-w', '--words', action='append', default=[],
+                        help='file of additional nouns, one per line')
+    parser.add_argument('-o', '--outfile', default=Config.plurals_lexicon_path,
+                        help='lexicon file to update')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    nouns = set()
+    for infile in args.infiles:
+        nouns.update(nouns_from_csv(infile))
+    for infile in args.words:
+        nouns.update(nouns_from_word_list(infile))
+    count = build_lexicon(nouns, args.outfile)
+    logger.info("Wrote {0} nouns to {1}".format(count, args.outfile))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Run local stand-in for the wit.ai message API that serves recorded responses.
+
+Responses can be loaded from test/wit_responses.py, from json files containing a list of
+wit.ai responses, and from the parsed facts stored in the animalia database. To direct
+animalia at the server, start run.py, train.py or the query logic tests with the printed uri
+in environment variable ANIMALIA_WIT_QUERY_URI, e.g.
+
+  ./fake_wit.py --test-data --db --latency lognormal:120:0.5 --error-rate 0.01 &
+  ANIMALIA_WIT_QUERY_URI=http://localhost:8081/message ./run.py
+
+"""
+
+from __future__ import unicode_literals
+
+import argparse
+import json
+import logging
+import time
+
+from animalia.fake_wit_server import FakeWitServer, LatencyDistribution
+
+ch = logging.StreamHandler()
+ch.setFormatter(logging.Formatter(fmt='%(name)s [%(levelname)s] %(message)s'))
+logging.root.addHandler(ch)
+logger = logging.getLogger('fake_wit')
+logger.setLevel(logging.INFO)
+
+
+def responses_from_db():
+    """Get wit.ai responses stored with facts in animalia database.
+    """
+    from animalia import fact_model
+    return [json.loads(fact.parsed_fact) for fact in fact_model.IncomingFact.query]
+
+def responses_from_file(path):
+    """Get wit.ai responses from json file containing list of responses.
+    """
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def responses_from_test_data():
+    """Get wit.ai responses captured in test/wit_responses.py.
+    """
+    from test import wit_responses
+    return vars(wit_responses).values()
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Local stand-in for wit.ai message API',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-p', '--port', type=int, default=8081,
+                        help='localhost port for fake wit.ai server')
+    parser.add_argument('-f', '--responses-file', action='append', default=[],
+                        help='json file with list of recorded responses; may be repeated')
+    parser.add_argument('--test-data', action='store_true',
+                        help='serve responses from test/wit_responses.py')
+    parser.add_argument('--db', action='store_true',
+                        help='serve responses stored with facts in animalia database')
+    parser.add_argument('-l', '--latency', type=LatencyDistribution.from_spec,
+                        help='latency distribution, e.g. constant:50, uniform:20:80, '
+                        'normal:100:20, exponential:100 or lognormal:100:0.5 (milliseconds)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of requests failed with HTTP error')
+    parser.add_argument('--error-status', type=int, action='append', default=[],
+                        help='HTTP status of injected errors; may be repeated (default: 500)')
+    parser.add_argument('--drop-rate', type=float, default=0.0,
+                        help='fraction of requests whose connection is dropped')
+    parser.add_argument('--seed', type=int, help='seed for reproducible latencies and errors')
+    parser.add_argument('-v', '--verbose', action='store_true', help='log every request')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.verbose:
+        logging.getLogger('animalia.FakeWitServer').setLevel(logging.DEBUG)
+
+    server = FakeWitServer(port=args.port,
+                           latency=args.latency,
+                           error_rate=args.error_rate,
+                           error_statuses=args.error_status or [500],
+                           drop_rate=args.drop_rate,
+                           seed=args.seed)
+    num_responses = 0
+    for path in args.responses_file:
+        num_responses += server.add_responses(responses_from_file(path))
+    if args.test_data:
+        num_responses += server.add_responses(responses_from_test_data())
+    if args.db:
+        num_responses += server.add_responses(responses_from_db())
+
+    server.start()
+    logger.info("Serving {0} recorded responses at {1}".format(num_responses, server.query_uri))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+    logger.info("Served {0}".format(server.stats()))
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Fill concept_ancestors, the closure of 'is' relationships, from existing relationships.
+
+Run after sql/migrate_concept_ancestors.sql has created the table. Rows are computed by
+ConceptAncestor.rebuild, the same code that maintains the table as facts are added and deleted.
+
+"""
+
+from __future__ import unicode_literals
+
+import argparse
+import logging
+
+from animalia import fact_model
+
+ch = logging.StreamHandler()
+ch.setFormatter(logging.Formatter(fmt='%(name)s [%(levelname)s] %(message)s'))
+logging.root.addHandler(ch)
+logger = logging.getLogger('migrate_concept_ancestors')
+logger.setLevel(logging.INFO)
+
+
+def migrate():
+    """Rebuild concept_ancestors and commit.
+
+    :rtype: int
+    :return: number of rows in concept_ancestors
+
+    """
+    session = fact_model.db.session
+    is_type_id = fact_model.RelationshipType.id_for_name('is')
+    if is_type_id is not None:
+        fact_model.ConceptAncestor.rebuild(session.connection(), is_type_id)
+    session.commit()
+    return session.query(fact_model.ConceptAncestor).count()
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Fill concept_ancestors from existing relationships',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-v', '--verbose', action='store_true', help='verbose output')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.verbose:
+        logging.getLogger('animalia').setLevel(logging.DEBUG)
+    logger.info("Filled concept_ancestors: {0} rows".format(migrate()))
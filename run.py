@@ -2,6 +2,19 @@
 # -*- coding: utf-8 -*-
 
 """Run flask animalia app.
+
+By default runs the single-process development server. With --workers, serves with a
+PreforkServer of that many worker processes, e.g. one per core:
+
+  ./run.py --host 0.0.0.0 --workers 0 --backlog 512
+
+With --threads, each worker serves that many requests concurrently in threads, e.g. so that
+requests waiting on wit.ai do not hold up others:
+
+  ./run.py --workers 0 --threads 32
+
+Send SIGHUP to the master process to reload workers gracefully, SIGTERM to stop.
+
 """
 
 from __future__ import unicode_literals
@@ -9,14 +22,39 @@ from __future__ import unicode_literals
 import argparse
 import logging
 
-from animalia import app
+from animalia import create_app
+from animalia.config import Config
+
+
+logger = logging.getLogger('animalia')
+
+
+def create_worker_app():
+    """Create app in PreforkServer worker and load its caches before it serves requests.
+    """
+    app = create_app()
+    from animalia.fact_manager import FactManager
+    try:
+        FactManager.warm_caches()
+    except Exception:
+        # Caches are loaded on first use instead
+        logger.exception("Failed to warm caches")
+    return app
 
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Flask animalia app",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-    parser.add_argument('-p', '--port', default='8080', 
-                        help='localhost port for application')
+    parser.add_argument('--host', default=Config.serve_host,
+                        help='address to bind, e.g. 0.0.0.0 for all interfaces')
+    parser.add_argument('-p', '--port', default=str(Config.serve_port), 
+                        help='port for application')
+    parser.add_argument('-w', '--workers', type=int, default=Config.serve_workers,
+                        help='serve with this many worker processes; 0 for one per core')
+    parser.add_argument('--backlog', type=int, default=Config.serve_backlog,
+                        help='maximum connections queued for workers')
+    parser.add_argument('-t', '--threads', type=int, default=Config.serve_threads,
+                        help='requests served concurrently by each worker')
     parser.add_argument('-v', '--verbose', action='store_true', 
                         help='debugging capability and verbose output')
     return parser.parse_args()
@@ -24,7 +62,16 @@ def parse_args():
 
 if __name__ == "__main__":
     args = parse_args()
-    if args.verbose:
-        app.logger.setLevel(logging.DEBUG)
     port = int(args.port)
-    app.run(host='localhost', port=port, debug=args.verbose)
+    if args.workers is not None:
+        logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+        from animalia.prefork_server import PreforkServer
+        server = PreforkServer(create_worker_app, host=args.host, port=port,
+                               workers=args.workers or None, backlog=args.backlog,
+                               threads=args.threads)
+        server.run()
+    else:
+        app = create_app()
+        if args.verbose:
+            app.logger.setLevel(logging.DEBUG)
+        app.run(host=args.host, port=port, debug=args.verbose, threaded=args.threads > 1)
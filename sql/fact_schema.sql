@@ -5,7 +5,7 @@ use animalia;
 
 DROP TABLE IF EXISTS `concepts`;
 CREATE TABLE `concepts` (
-  `concept_id` char(36) NOT NULL,
+  `concept_id` int(11) NOT NULL AUTO_INCREMENT,
   `concept_name` varchar(255) NOT NULL,
   PRIMARY KEY (`concept_id`),
   UNIQUE KEY `concept_name_UNIQUE` (`concept_name`)
@@ -15,13 +15,14 @@ CREATE TABLE `concepts` (
 DROP TABLE IF EXISTS `relationships`;
 CREATE TABLE `relationships` (
   `relationship_id` char(36) NOT NULL,
-  `relationship_type_id` char(36) NOT NULL,
-  `subject_id` char(36) NOT NULL,
-  `object_id` char(36) NOT NULL,
+  `relationship_type_id` int(11) NOT NULL,
+  `subject_id` int(11) NOT NULL,
+  `object_id` int(11) NOT NULL,
   `count` int(11) DEFAULT NULL,
   `fact_id` char(36) DEFAULT NULL,
   PRIMARY KEY (`relationship_id`),
-  UNIQUE KEY `relationship_foreign_keys_UNIQUE` (`subject_id`, `object_id`, `relationship_type_id`),
+  UNIQUE KEY `relationship_foreign_keys_UNIQUE` (`subject_id`, `relationship_type_id`, `object_id`),
+  INDEX `ix_relationship_type_object` (`relationship_type_id`, `object_id`, `count`, `subject_id`),
   INDEX `ix_relationship_fact_id` (`fact_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 
@@ -29,12 +30,29 @@ CREATE TABLE `relationships` (
 DROP TABLE IF EXISTS `relationship_types`;
 CREATE TABLE `relationship_types` (
   `relationship_type_name` varchar(45) NOT NULL,
-  `relationship_type_id` char(36) NOT NULL,
+  `relationship_type_id` int(11) NOT NULL,
   PRIMARY KEY (`relationship_type_name`),
   INDEX `ix_relationship_types_relationship_type_id` (`relationship_type_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 
 
+DROP TABLE IF EXISTS `relationship_type_ids`;
+CREATE TABLE `relationship_type_ids` (
+  `relationship_type_id` int(11) NOT NULL AUTO_INCREMENT,
+  PRIMARY KEY (`relationship_type_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+
+DROP TABLE IF EXISTS `concept_ancestors`;
+CREATE TABLE `concept_ancestors` (
+  `ancestor_id` int(11) NOT NULL,
+  `descendant_id` int(11) NOT NULL,
+  `depth` int(11) NOT NULL,
+  PRIMARY KEY (`ancestor_id`, `descendant_id`),
+  INDEX `ix_concept_ancestor_descendant` (`descendant_id`, `ancestor_id`, `depth`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+
 DROP TABLE IF EXISTS `incoming_facts`;
 CREATE TABLE `incoming_facts` (
   `fact_id` char(36) NOT NULL,
@@ -46,6 +64,15 @@ CREATE TABLE `incoming_facts` (
   UNIQUE KEY `fact_text_UNIQUE` (`fact_text`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 
+DROP TABLE IF EXISTS `kb_generation`;
+CREATE TABLE `kb_generation` (
+  `kb_generation_id` int(11) NOT NULL,
+  `generation` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`kb_generation_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+INSERT INTO `kb_generation` (`kb_generation_id`, `generation`) VALUES (1, 0);
+
 -- 
 -- insert known relationship type synonyms
 --
@@ -53,26 +80,30 @@ INSERT INTO `relationship_types`
 (`relationship_type_name`, `relationship_type_id`)
 VALUES
 -- is
-('is',   'b93573ec-be70-4a2d-850b-4338ce75308f'),
-('isa',  'b93573ec-be70-4a2d-850b-4338ce75308f'),
-('is a', 'b93573ec-be70-4a2d-850b-4338ce75308f'),
-('are', 'b93573ec-be70-4a2d-850b-4338ce75308f'),
+('is',   1),
+('isa',  1),
+('is a', 1),
+('are', 1),
 
 -- eat
-('eat',  'c1108ed8-fe18-4758-9d6e-4029de322407'),
-('eats', 'c1108ed8-fe18-4758-9d6e-4029de322407'),
+('eat',  2),
+('eats', 2),
 
 -- has
-('has',    '17511629-f91b-4bcd-8c03-01ae1500c134'),
-('hasa',   '17511629-f91b-4bcd-8c03-01ae1500c134'),
-('has a',  '17511629-f91b-4bcd-8c03-01ae1500c134'),
-('have',   '17511629-f91b-4bcd-8c03-01ae1500c134'),
-('have a', '17511629-f91b-4bcd-8c03-01ae1500c134'),
+('has',    3),
+('hasa',   3),
+('has a',  3),
+('have',   3),
+('have a', 3),
 
 -- lives
-('lives',    '34d72b28-423c-4e7d-8a40-457031d5735b'),
-('live',     '34d72b28-423c-4e7d-8a40-457031d5735b'),
-('live in',  '34d72b28-423c-4e7d-8a40-457031d5735b'),
-('lives in', '34d72b28-423c-4e7d-8a40-457031d5735b'),
-('where', '34d72b28-423c-4e7d-8a40-457031d5735b')
+('lives',    4),
+('live',     4),
+('live in',  4),
+('lives in', 4),
+('where', 4)
 ;
+
+-- ids of new relationship types are allocated after those of the synonyms above
+INSERT INTO `relationship_type_ids` (`relationship_type_id`)
+SELECT DISTINCT `relationship_type_id` FROM `relationship_types`;
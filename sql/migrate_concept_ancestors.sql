@@ -0,0 +1,17 @@
+-- Create concept_ancestors, the closure of 'is' relationships. Run against a database created
+-- by a version of fact_schema.sql without concept_ancestors, after migrate_integer_keys.sql if
+-- that is needed, and then fill the table from existing relationships with
+-- migrate_concept_ancestors.py. The application maintains the table from then on; running both
+-- again rebuilds it. Rows are computed by ConceptAncestor.rebuild in animalia/fact_model.py,
+-- which also defines the meta types, such as 'species', that are not inherited.
+
+use animalia;
+
+DROP TABLE IF EXISTS `concept_ancestors`;
+CREATE TABLE `concept_ancestors` (
+  `ancestor_id` int(11) NOT NULL,
+  `descendant_id` int(11) NOT NULL,
+  `depth` int(11) NOT NULL,
+  PRIMARY KEY (`ancestor_id`, `descendant_id`),
+  INDEX `ix_concept_ancestor_descendant` (`descendant_id`, `ancestor_id`, `depth`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
@@ -0,0 +1,101 @@
+-- Replace UUID keys of concepts and relationship types with integer keys.
+-- Run against a database created by a version of fact_schema.sql in which concept_id and
+-- relationship_type_id were CHAR(36) UUIDs. Ids of relationships and facts are unchanged.
+-- Relationships whose subject, object or relationship type does not exist are dropped.
+-- Tables are copied with new keys and swapped in with a single atomic rename.
+
+use animalia;
+
+-- Assign integer keys to existing UUIDs
+DROP TABLE IF EXISTS `concept_keys`;
+CREATE TABLE `concept_keys` (
+  `concept_key` int(11) NOT NULL AUTO_INCREMENT,
+  PRIMARY KEY (`concept_key`),
+  UNIQUE KEY `concept_id_UNIQUE` (`concept_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8
+SELECT `concept_id` FROM `concepts` ORDER BY `concept_name`;
+
+DROP TABLE IF EXISTS `relationship_type_keys`;
+CREATE TABLE `relationship_type_keys` (
+  `relationship_type_key` int(11) NOT NULL AUTO_INCREMENT,
+  PRIMARY KEY (`relationship_type_key`),
+  UNIQUE KEY `relationship_type_id_UNIQUE` (`relationship_type_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8
+SELECT `relationship_type_id` FROM `relationship_types`
+GROUP BY `relationship_type_id` ORDER BY MIN(`relationship_type_name`);
+
+
+DROP TABLE IF EXISTS `concepts_new`;
+CREATE TABLE `concepts_new` (
+  `concept_id` int(11) NOT NULL AUTO_INCREMENT,
+  `concept_name` varchar(255) NOT NULL,
+  PRIMARY KEY (`concept_id`),
+  UNIQUE KEY `concept_name_UNIQUE` (`concept_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+INSERT INTO `concepts_new` (`concept_id`, `concept_name`)
+SELECT k.`concept_key`, c.`concept_name`
+FROM `concepts` c
+JOIN `concept_keys` k ON k.`concept_id` = c.`concept_id`;
+
+
+DROP TABLE IF EXISTS `relationship_types_new`;
+CREATE TABLE `relationship_types_new` (
+  `relationship_type_name` varchar(45) NOT NULL,
+  `relationship_type_id` int(11) NOT NULL,
+  PRIMARY KEY (`relationship_type_name`),
+  INDEX `ix_relationship_types_relationship_type_id` (`relationship_type_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+INSERT INTO `relationship_types_new` (`relationship_type_name`, `relationship_type_id`)
+SELECT t.`relationship_type_name`, k.`relationship_type_key`
+FROM `relationship_types` t
+JOIN `relationship_type_keys` k ON k.`relationship_type_id` = t.`relationship_type_id`;
+
+
+DROP TABLE IF EXISTS `relationships_new`;
+CREATE TABLE `relationships_new` (
+  `relationship_id` char(36) NOT NULL,
+  `relationship_type_id` int(11) NOT NULL,
+  `subject_id` int(11) NOT NULL,
+  `object_id` int(11) NOT NULL,
+  `count` int(11) DEFAULT NULL,
+  `fact_id` char(36) DEFAULT NULL,
+  PRIMARY KEY (`relationship_id`),
+  UNIQUE KEY `relationship_foreign_keys_UNIQUE` (`subject_id`, `relationship_type_id`, `object_id`),
+  INDEX `ix_relationship_type_object` (`relationship_type_id`, `object_id`, `count`, `subject_id`),
+  INDEX `ix_relationship_fact_id` (`fact_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+INSERT INTO `relationships_new`
+(`relationship_id`, `relationship_type_id`, `subject_id`, `object_id`, `count`, `fact_id`)
+SELECT r.`relationship_id`,
+       tk.`relationship_type_key`,
+       sk.`concept_key`,
+       ok.`concept_key`,
+       r.`count`,
+       r.`fact_id`
+FROM `relationships` r
+JOIN `relationship_type_keys` tk ON tk.`relationship_type_id` = r.`relationship_type_id`
+JOIN `concept_keys` sk ON sk.`concept_id` = r.`subject_id`
+JOIN `concept_keys` ok ON ok.`concept_id` = r.`object_id`;
+
+
+RENAME TABLE
+  `concepts` TO `concepts_uuid`, `concepts_new` TO `concepts`,
+  `relationship_types` TO `relationship_types_uuid`,
+  `relationship_types_new` TO `relationship_types`,
+  `relationships` TO `relationships_uuid`, `relationships_new` TO `relationships`;
+
+-- Ids of new relationship types are allocated after the keys assigned above
+DROP TABLE IF EXISTS `relationship_type_ids`;
+CREATE TABLE `relationship_type_ids` (
+  `relationship_type_id` int(11) NOT NULL AUTO_INCREMENT,
+  PRIMARY KEY (`relationship_type_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+INSERT INTO `relationship_type_ids` (`relationship_type_id`)
+SELECT `relationship_type_key` FROM `relationship_type_keys`;
+
+DROP TABLE `concepts_uuid`, `relationship_types_uuid`, `relationships_uuid`,
+  `concept_keys`, `relationship_type_keys`;
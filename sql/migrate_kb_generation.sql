@@ -0,0 +1,17 @@
+-- Create kb_generation, the count of committed changes to facts. Run against a database
+-- created by a version of fact_schema.sql without kb_generation.
+--
+-- FactManager increments the generation in the transaction of each change to facts, and every
+-- process serving the knowledge base compares it with the generation its caches were loaded
+-- at, so that caches are discarded after changes by other processes or hosts.
+
+use animalia;
+
+DROP TABLE IF EXISTS `kb_generation`;
+CREATE TABLE `kb_generation` (
+  `kb_generation_id` int(11) NOT NULL,
+  `generation` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`kb_generation_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+INSERT INTO `kb_generation` (`kb_generation_id`, `generation`) VALUES (1, 0);
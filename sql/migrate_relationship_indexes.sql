@@ -0,0 +1,17 @@
+-- Replace indexes of relationships table with indexes matching FactQuery access patterns.
+-- Run against a database created by a version of fact_schema.sql without
+-- ix_relationship_type_object. Not needed after migrate_integer_keys.sql,
+-- migrate_uuid_to_binary.sql or migrate_uuid_to_char.sql, which create the current indexes.
+--
+-- relationship_foreign_keys_UNIQUE leads with subject and relationship type, which serves
+-- queries for the objects of a subject, e.g. 'What do bears eat?'. ix_relationship_type_object
+-- serves queries for the subjects of an object, e.g. 'Which animals have four legs?', and
+-- includes count and subject_id so that such queries read only the index.
+-- See benchmark_indexes.py for query plans and latencies before and after.
+
+use animalia;
+
+ALTER TABLE `relationships`
+  DROP INDEX `relationship_foreign_keys_UNIQUE`,
+  ADD UNIQUE KEY `relationship_foreign_keys_UNIQUE` (`subject_id`, `relationship_type_id`, `object_id`),
+  ADD INDEX `ix_relationship_type_object` (`relationship_type_id`, `object_id`, `count`, `subject_id`);
@@ -0,0 +1,18 @@
+-- Create relationship_type_ids, the sequence that ids of new relationship types are allocated
+-- from, and fill it with the ids of existing relationship types. Run against a database with
+-- integer relationship type ids that was created by a version of fact_schema.sql without
+-- relationship_type_ids. Not needed after migrate_integer_keys.sql, which creates the table.
+--
+-- Synonyms share a relationship type id, so relationship_types cannot generate its own ids;
+-- see _next_relationship_type_id in animalia/fact_model.py.
+
+use animalia;
+
+DROP TABLE IF EXISTS `relationship_type_ids`;
+CREATE TABLE `relationship_type_ids` (
+  `relationship_type_id` int(11) NOT NULL AUTO_INCREMENT,
+  PRIMARY KEY (`relationship_type_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+INSERT INTO `relationship_type_ids` (`relationship_type_id`)
+SELECT DISTINCT `relationship_type_id` FROM `relationship_types`;
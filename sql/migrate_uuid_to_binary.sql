@@ -0,0 +1,57 @@
+-- Convert UUID columns of animalia schema from CHAR(36) to BINARY(16).
+-- Run against a database created by fact_schema.sql, then set Config.uuid_storage to 'binary'.
+-- Databases created before concepts and relationship types had integer keys must first be
+-- migrated by migrate_integer_keys.sql.
+-- Tables are copied with converted ids and swapped in with a single atomic rename.
+-- See migrate_uuid_to_char.sql to revert.
+
+use animalia;
+
+DROP TABLE IF EXISTS `relationships_binary`;
+CREATE TABLE `relationships_binary` (
+  `relationship_id` binary(16) NOT NULL,
+  `relationship_type_id` int(11) NOT NULL,
+  `subject_id` int(11) NOT NULL,
+  `object_id` int(11) NOT NULL,
+  `count` int(11) DEFAULT NULL,
+  `fact_id` binary(16) DEFAULT NULL,
+  PRIMARY KEY (`relationship_id`),
+  UNIQUE KEY `relationship_foreign_keys_UNIQUE` (`subject_id`, `relationship_type_id`, `object_id`),
+  INDEX `ix_relationship_type_object` (`relationship_type_id`, `object_id`, `count`, `subject_id`),
+  INDEX `ix_relationship_fact_id` (`fact_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+INSERT INTO `relationships_binary`
+(`relationship_id`, `relationship_type_id`, `subject_id`, `object_id`, `count`, `fact_id`)
+SELECT UNHEX(REPLACE(`relationship_id`, '-', '')),
+       `relationship_type_id`,
+       `subject_id`,
+       `object_id`,
+       `count`,
+       UNHEX(REPLACE(`fact_id`, '-', ''))
+FROM `relationships`;
+
+
+DROP TABLE IF EXISTS `incoming_facts_binary`;
+CREATE TABLE `incoming_facts_binary` (
+  `fact_id` binary(16) NOT NULL,
+  `fact_text` varchar(255) NOT NULL,
+  `parsed_fact` text NOT NULL,
+  `creation_date_utc` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP, 
+  `deleted` boolean NOT NULL DEFAULT False,
+  PRIMARY KEY (`fact_id`),
+  UNIQUE KEY `fact_text_UNIQUE` (`fact_text`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+INSERT INTO `incoming_facts_binary`
+(`fact_id`, `fact_text`, `parsed_fact`, `creation_date_utc`, `deleted`)
+SELECT UNHEX(REPLACE(`fact_id`, '-', '')), `fact_text`, `parsed_fact`, `creation_date_utc`,
+       `deleted`
+FROM `incoming_facts`;
+
+
+RENAME TABLE
+  `relationships` TO `relationships_char`, `relationships_binary` TO `relationships`,
+  `incoming_facts` TO `incoming_facts_char`, `incoming_facts_binary` TO `incoming_facts`;
+
+DROP TABLE `relationships_char`, `incoming_facts_char`;
@@ -0,0 +1,55 @@
+-- Convert UUID columns of animalia schema from BINARY(16) back to CHAR(36).
+-- Run against a database migrated by migrate_uuid_to_binary.sql, then set
+-- Config.uuid_storage to 'char'.
+-- Tables are copied with converted ids and swapped in with a single atomic rename.
+
+use animalia;
+
+DROP TABLE IF EXISTS `relationships_new`;
+CREATE TABLE `relationships_new` (
+  `relationship_id` char(36) NOT NULL,
+  `relationship_type_id` int(11) NOT NULL,
+  `subject_id` int(11) NOT NULL,
+  `object_id` int(11) NOT NULL,
+  `count` int(11) DEFAULT NULL,
+  `fact_id` char(36) DEFAULT NULL,
+  PRIMARY KEY (`relationship_id`),
+  UNIQUE KEY `relationship_foreign_keys_UNIQUE` (`subject_id`, `relationship_type_id`, `object_id`),
+  INDEX `ix_relationship_type_object` (`relationship_type_id`, `object_id`, `count`, `subject_id`),
+  INDEX `ix_relationship_fact_id` (`fact_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+INSERT INTO `relationships_new`
+(`relationship_id`, `relationship_type_id`, `subject_id`, `object_id`, `count`, `fact_id`)
+SELECT LOWER(INSERT(INSERT(INSERT(INSERT(HEX(`relationship_id`), 9, 0, '-'), 14, 0, '-'), 19, 0, '-'), 24, 0, '-')),
+       `relationship_type_id`,
+       `subject_id`,
+       `object_id`,
+       `count`,
+       LOWER(INSERT(INSERT(INSERT(INSERT(HEX(`fact_id`), 9, 0, '-'), 14, 0, '-'), 19, 0, '-'), 24, 0, '-'))
+FROM `relationships`;
+
+
+DROP TABLE IF EXISTS `incoming_facts_new`;
+CREATE TABLE `incoming_facts_new` (
+  `fact_id` char(36) NOT NULL,
+  `fact_text` varchar(255) NOT NULL,
+  `parsed_fact` text NOT NULL,
+  `creation_date_utc` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP, 
+  `deleted` boolean NOT NULL DEFAULT False,
+  PRIMARY KEY (`fact_id`),
+  UNIQUE KEY `fact_text_UNIQUE` (`fact_text`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+INSERT INTO `incoming_facts_new`
+(`fact_id`, `fact_text`, `parsed_fact`, `creation_date_utc`, `deleted`)
+SELECT LOWER(INSERT(INSERT(INSERT(INSERT(HEX(`fact_id`), 9, 0, '-'), 14, 0, '-'), 19, 0, '-'), 24, 0, '-')), `fact_text`, `parsed_fact`, `creation_date_utc`,
+       `deleted`
+FROM `incoming_facts`;
+
+
+RENAME TABLE
+  `relationships` TO `relationships_binary`, `relationships_new` TO `relationships`,
+  `incoming_facts` TO `incoming_facts_binary`, `incoming_facts_new` TO `incoming_facts`;
+
+DROP TABLE `relationships_binary`, `incoming_facts_binary`;
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit tests for AnswerCache class.
+"""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from animalia.answer_cache import AnswerCache
+
+
+class AnswerCacheTests(unittest.TestCase):
+    """Verify behavior of AnswerCache.
+    """
+    def test_get__miss(self):
+        """Verify miss for question that is not cached.
+        """
+        cache = AnswerCache()
+        self.assertEqual((False, None), cache.get('where do otters live', 0))
+        self.assertEqual(1, cache.stats()['misses'])
+
+    def test_set_and_get(self):
+        """Verify cached answer is returned for same question and generation.
+        """
+        cache = AnswerCache()
+        cache.set('where do otters live', 0, ['rivers'])
+        cache.set('do otters have scales', 0, None)
+        self.assertEqual((True, ['rivers']), cache.get('where do otters live', 0))
+        self.assertEqual((True, None), cache.get('do otters have scales', 0))
+        self.assertEqual({'entries': 2, 'generation': 0, 'hits': 2, 'misses': 0, 'hit_rate': 1.0},
+                         cache.stats())
+
+    def test_get__newer_generation(self):
+        """Verify that answers of older generation are discarded.
+        """
+        cache = AnswerCache()
+        cache.set('where do otters live', 0, ['rivers'])
+        self.assertEqual((False, None), cache.get('where do otters live', 1))
+        self.assertEqual(0, cache.stats()['entries'])
+        self.assertEqual(1, cache.stats()['generation'])
+
+    def test_set__older_generation(self):
+        """Verify that answer computed from older generation is not cached.
+        """
+        cache = AnswerCache()
+        cache.set('where do otters live', 2, ['rivers'])
+        cache.set('where do otters live', 1, ['lakes'])
+        self.assertEqual((True, ['rivers']), cache.get('where do otters live', 2))
+        self.assertEqual((False, None), cache.get('where do otters live', 1))
+
+    def test_set__evict_least_recently_used(self):
+        """Verify that least recently used answer is evicted when max_entries is exceeded.
+        """
+        cache = AnswerCache(max_entries=2)
+        cache.set('question one', 0, 'one')
+        cache.set('question two', 0, 'two')
+        cache.get('question one', 0)
+        cache.set('question three', 0, 'three')
+        self.assertEqual(2, cache.stats()['entries'])
+        self.assertEqual((True, 'one'), cache.get('question one', 0))
+        self.assertEqual((False, None), cache.get('question two', 0))
+
+    def test_clear(self):
+        """Verify that clear removes answers and resets counts.
+        """
+        cache = AnswerCache()
+        cache.set('where do otters live', 0, ['rivers'])
+        cache.get('where do otters live', 0)
+        cache.clear()
+        self.assertEqual({'entries': 0, 'generation': 0, 'hits': 0, 'misses': 0, 'hit_rate': 0.0},
+                         cache.stats())
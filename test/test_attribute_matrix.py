@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit tests for AttributeMatrix class.
+"""
+
+from __future__ import unicode_literals
+
+import unittest
+import uuid
+
+from mock import Mock, patch
+
+from animalia.attribute_matrix import AttributeMatrix
+from animalia.concept_hierarchy import ConceptHierarchy
+import animalia.fact_model as fact_model
+from animalia.fact_model import CommittedChanges, RelationshipRecord
+
+
+class AttributeMatrixTestCase(unittest.TestCase):
+    """Base class for tests of matrix built from small set of animal facts.
+    """
+    is_type_id = 1
+    eat_type_id = 2
+    has_type_id = 3
+
+    facts = [(is_type_id, 'mammals', 'species', None),
+             (is_type_id, 'reptiles', 'species', None),
+             (is_type_id, 'otters', 'mammals', None),
+             (is_type_id, 'bears', 'mammals', None),
+             (is_type_id, 'snakes', 'reptiles', None),
+             (is_type_id, 'geckoes', 'reptiles', None),
+             (is_type_id, 'otters', 'animals', None),
+             (is_type_id, 'bears', 'animals', None),
+             (is_type_id, 'snakes', 'animals', None),
+             (is_type_id, 'geckoes', 'animals', None),
+             (eat_type_id, 'otters', 'fish', None),
+             (eat_type_id, 'bears', 'fish', None),
+             (eat_type_id, 'snakes', 'geckoes', None),
+             (has_type_id, 'otters', 'legs', 4),
+             (has_type_id, 'bears', 'legs', 4),
+             (has_type_id, 'geckoes', 'legs', 4),
+             (has_type_id, 'otters', 'fur', None),
+             (has_type_id, 'bears', 'fur', None)]
+
+    def setUp(self):
+        self.matrix = AttributeMatrix()
+        for name, type_id in (('is', self.is_type_id), ('are', self.is_type_id),
+                              ('eat', self.eat_type_id), ('have', self.has_type_id)):
+            self.matrix.add_relationship_type(name, type_id)
+
+        hierarchy = ConceptHierarchy()
+        self.records = {}
+        for type_id, subject_name, object_name, count in self.facts:
+            record = self.make_record(type_id, subject_name, object_name, count=count)
+            self.records[(subject_name, type_id, object_name)] = record
+            self.matrix.add_relationship(record)
+            if type_id == self.is_type_id:
+                hierarchy.add_ancestor(subject_name, object_name)
+
+        get_hierarchy_patcher = patch.object(ConceptHierarchy, 'get_hierarchy',
+                                             return_value=hierarchy)
+        get_hierarchy_patcher.start()
+        self.addCleanup(get_hierarchy_patcher.stop)
+
+    @staticmethod
+    def make_record(relationship_type_id, subject_name, object_name, count=None):
+        return RelationshipRecord(relationship_id=uuid.uuid4(),
+                                  relationship_type_id=relationship_type_id,
+                                  subject_name=subject_name,
+                                  object_name=object_name,
+                                  count=count,
+                                  fact_id=uuid.uuid4())
+
+    def which(self, **kwargs):
+        """Select names of animals matching parsed query built from kwargs.
+        """
+        subject_type = kwargs.pop('subject_type', 'animals')
+        object_is_species = kwargs.pop('object_is_species', False)
+        attrs = dict(relationship_type_name='eat',
+                     object_name='fish',
+                     relationship_number=None,
+                     relationship_negation=False)
+        attrs.update(kwargs)
+        mask = self.matrix.which_animal_mask(Mock(name='parsed_query', **attrs),
+                                             subject_type=subject_type,
+                                             object_is_species=object_is_species)
+        return set(self.matrix.concept_names(mask))
+
+
+class WhichAnimalMaskTests(AttributeMatrixTestCase):
+    """Verify AttributeMatrix.which_animal_mask.
+    """
+    def test_which_animal_mask(self):
+        """Verify match on relationship type and object.
+        """
+        self.assertEqual(set(['otters', 'bears']), self.which())
+
+    def test_which_animal_mask__synonym(self):
+        """Verify that relationship type synonyms select same column.
+        """
+        self.assertEqual(set(['otters', 'bears']),
+                         self.which(relationship_type_name='are', object_name='mammals'))
+
+    def test_which_animal_mask__negation(self):
+        """Verify that negation selects other animals of subject type.
+        """
+        self.assertEqual(set(['snakes', 'geckoes']), self.which(relationship_negation=True))
+
+    def test_which_animal_mask__relationship_number(self):
+        """Verify match on relationship count.
+        """
+        self.assertEqual(set(['otters', 'bears', 'geckoes']),
+                         self.which(relationship_type_name='have', object_name='legs',
+                                    relationship_number='4'))
+        self.assertEqual(set(),
+                         self.which(relationship_type_name='have', object_name='legs',
+                                    relationship_number='2'))
+        self.assertEqual(set(['snakes']),
+                         self.which(relationship_type_name='have', object_name='legs',
+                                    relationship_number='4', relationship_negation=True))
+
+    def test_which_animal_mask__subject_type(self):
+        """Verify that subject type restricts selected animals.
+        """
+        self.assertEqual(set(['geckoes']),
+                         self.which(relationship_type_name='have', object_name='legs',
+                                    subject_type='reptiles'))
+
+    def test_which_animal_mask__species_object(self):
+        """Verify that objects of species match when object is a species.
+        """
+        self.assertEqual(set(['snakes']),
+                         self.which(object_name='reptiles', object_is_species=True))
+        self.assertEqual(set(), self.which(object_name='reptiles'))
+
+    def test_which_animal_mask__unknown(self):
+        """Verify empty mask for unknown relationship type or object.
+        """
+        self.assertEqual(set(), self.which(relationship_type_name='kick'))
+        self.assertEqual(set(), self.which(object_name='berries'))
+        self.assertEqual(set(['otters', 'bears', 'snakes', 'geckoes']),
+                         self.which(object_name='berries', relationship_negation=True))
+
+    def test_type_mask(self):
+        """Verify that concept types are matched transitively but meta types are not.
+        """
+        self.matrix.add_relationship(
+            self.make_record(self.is_type_id, 'sea_otters', 'otters'))
+        for concept_type in ('otters', 'mammals', 'animals'):
+            ConceptHierarchy.get_hierarchy().add_ancestor('sea_otters', concept_type)
+
+        def names(concept_type):
+            return set(self.matrix.concept_names(self.matrix.type_mask(concept_type)))
+        self.assertEqual(set(['otters', 'bears', 'sea_otters']), names('mammals'))
+        self.assertEqual(set(['mammals', 'reptiles']), names('species'))
+
+
+class ApplyChangesTests(AttributeMatrixTestCase):
+    """Verify maintenance of AttributeMatrix.
+    """
+    def test_remove_relationship(self):
+        """Verify that removed relationships clear attributes.
+        """
+        self.matrix.remove_relationship(self.records[('bears', self.eat_type_id, 'fish')])
+        self.assertEqual(set(['otters']), self.which())
+
+        self.matrix.remove_relationship(self.records[('otters', self.eat_type_id, 'fish')])
+        self.assertEqual(set(), self.which())
+        self.assertEqual(7, self.matrix.stats()['attributes'])
+
+    def test_apply_changes(self):
+        """Verify that committed changes are applied.
+        """
+        changes = CommittedChanges(
+            saved_relationships=[self.make_record(self.eat_type_id, 'geckoes', 'fish')],
+            deleted_relationships=[self.records[('bears', self.eat_type_id, 'fish')]],
+            saved_relationship_types=[('eats', self.eat_type_id)],
+            saved_concepts=[],
+            deleted_concepts=[],
+            changed_ancestors=[])
+        self.matrix.apply_changes(changes)
+
+        self.assertEqual(set(['otters', 'geckoes']), self.which(relationship_type_name='eats'))
+
+    def test_add_relationship__count(self):
+        """Verify that saving relationship again updates its count.
+        """
+        self.matrix.add_relationship(self.make_record(self.has_type_id, 'bears', 'legs', 2))
+        self.assertEqual(set(['bears']),
+                         self.which(relationship_type_name='have', object_name='legs',
+                                    relationship_number='2'))
+
+    def test_stats(self):
+        self.assertEqual({'concepts': 11, 'attributes': 8, 'relationships': 18},
+                         self.matrix.stats())
+
+
+class GetMatrixTests(unittest.TestCase):
+    """Verify loading and sharing of AttributeMatrix.
+    """
+    def tearDown(self):
+        AttributeMatrix.reset()
+
+    @patch.object(fact_model, 'add_commit_listener')
+    @patch.object(fact_model.Relationship, 'select_records')
+    @patch.object(fact_model.RelationshipType, 'select_name_id_pairs')
+    def test_get_matrix(self, select_name_id_pairs, select_records, add_commit_listener):
+        """Verify that matrix is loaded once and registered for committed changes.
+        """
+        select_name_id_pairs.return_value = [('eat', 2)]
+        select_records.return_value = [AttributeMatrixTestCase.make_record(2, 'otters', 'fish')]
+
+        matrix = AttributeMatrix.get_matrix()
+        self.assertIs(matrix, AttributeMatrix.get_matrix())
+        self.assertEqual({'concepts': 2, 'attributes': 1, 'relationships': 1}, matrix.stats())
+        select_records.assert_called_once_with()
+        add_commit_listener.assert_called_once_with(matrix.apply_changes)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit tests for Bitmap class.
+"""
+
+from __future__ import unicode_literals
+
+import random
+import unittest
+
+from animalia.bitmap import Bitmap
+
+
+class BitmapTests(unittest.TestCase):
+    """Verify Bitmap against equivalent sets.
+    """
+    def setUp(self):
+        rand = random.Random(17)
+        # Sparse values spread over containers, dense values filling one bitset container
+        self.sparse = set(rand.randrange(0, 1 << 20) for _ in range(3000))
+        self.dense = set(rand.randrange(0, 1 << 16) for _ in range(30000))
+
+    def test_add_and_discard(self):
+        """Verify membership and length as values are added and discarded.
+        """
+        bitmap = Bitmap([5, 70000, 5])
+        self.assertEqual(2, len(bitmap))
+        self.assertTrue(70000 in bitmap)
+        self.assertFalse(6 in bitmap)
+
+        bitmap.discard(70000)
+        bitmap.discard(70000)
+        self.assertEqual([5], list(bitmap))
+
+    def test_iter(self):
+        """Verify that values are iterated in order.
+        """
+        self.assertEqual(sorted(self.sparse), list(Bitmap(self.sparse)))
+        self.assertEqual(sorted(self.dense), list(Bitmap(self.dense)))
+
+    def test_set_operations(self):
+        """Verify &, | and - of array and bitset containers.
+        """
+        for values, other_values in ((self.sparse, self.dense), (self.dense, self.sparse),
+                                     (self.dense, set(range(0, 1 << 16, 3))),
+                                     (self.sparse, set(list(self.sparse)[::2]))):
+            bitmap, other = Bitmap(values), Bitmap(other_values)
+            self.assertEqual(sorted(values & other_values), list(bitmap & other))
+            self.assertEqual(sorted(values | other_values), list(bitmap | other))
+            self.assertEqual(sorted(values - other_values), list(bitmap - other))
+            self.assertEqual(len(values - other_values), len(bitmap - other))
+
+    def test_union(self):
+        """Verify union of several bitmaps.
+        """
+        parts = [set(range(i, 1 << 17, 5)) for i in range(3)]
+        self.assertEqual(sorted(parts[0] | parts[1] | parts[2]),
+                         list(Bitmap.union(Bitmap(part) for part in parts)))
+        self.assertEqual(0, len(Bitmap.union([])))
+
+    def test_discard__dense(self):
+        """Verify that bitset container reverts to array when values are discarded.
+        """
+        bitmap = Bitmap(range(5000))
+        self.assertEqual(8192, bitmap.size_in_bytes())
+        for value in range(1000, 5000):
+            bitmap.discard(value)
+        self.assertEqual(list(range(1000)), list(bitmap))
+        self.assertEqual(2000, bitmap.size_in_bytes())
+        self.assertEqual(Bitmap(range(1000)), bitmap)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit tests for ConceptHierarchy class.
+"""
+
+from __future__ import unicode_literals
+
+import unittest
+import uuid
+
+from mock import patch
+
+import animalia.fact_model as fact_model
+from animalia.concept_hierarchy import ConceptHierarchy
+from animalia.fact_model import AncestorRecord, CommittedChanges
+
+
+class ConceptHierarchyTestCase(unittest.TestCase):
+    """Base class for tests of hierarchy built from closure of small set of animal concepts.
+    """
+    def setUp(self):
+        self.hierarchy = ConceptHierarchy()
+        for concept_name, concept_type in (('otters', 'mammals'),
+                                           ('otters', 'animals'),
+                                           ('otters', 'vertebrates'),
+                                           ('otters', 'chordates'),
+                                           ('bats', 'mammals'),
+                                           ('bats', 'vertebrates'),
+                                           ('bats', 'chordates'),
+                                           ('mammals', 'vertebrates'),
+                                           ('mammals', 'chordates'),
+                                           ('vertebrates', 'chordates'),
+                                           ('mammals', 'species'),
+                                           ('vertebrates', 'species')):
+            self.hierarchy.add_ancestor(concept_name, concept_type)
+
+    @staticmethod
+    def make_changes(changed_ancestors):
+        return CommittedChanges(saved_relationships=[],
+                                deleted_relationships=[],
+                                saved_relationship_types=[],
+                                saved_concepts=[],
+                                deleted_concepts=[],
+                                changed_ancestors=changed_ancestors)
+
+
+class ClosureTests(ConceptHierarchyTestCase):
+    """Verify lookups in closure of 'is' relationships.
+    """
+    def test_ancestors(self):
+        """Verify that ancestors include concept types of concept types.
+        """
+        self.assertEqual(set(['mammals', 'animals', 'vertebrates', 'chordates']),
+                         self.hierarchy.ancestors('otters'))
+        self.assertEqual(set(['vertebrates', 'chordates', 'species']),
+                         self.hierarchy.ancestors('mammals'))
+        self.assertEqual(set(), self.hierarchy.ancestors('fish'))
+
+    def test_descendants(self):
+        """Verify that descendants include concepts of concept types.
+        """
+        self.assertEqual(set(['otters', 'bats', 'mammals']),
+                         self.hierarchy.descendants('vertebrates'))
+        self.assertEqual(set(['mammals', 'vertebrates']), self.hierarchy.descendants('species'))
+
+    def test_is_a(self):
+        """Verify membership checks.
+        """
+        self.assertTrue(self.hierarchy.is_a('otters', 'chordates'))
+        self.assertTrue(self.hierarchy.is_a('mammals', 'species'))
+        self.assertFalse(self.hierarchy.is_a('otters', 'species'))
+        self.assertFalse(self.hierarchy.is_a('mammals', 'otters'))
+        self.assertFalse(self.hierarchy.is_a('fish', 'animals'))
+
+    def test_remove_ancestor(self):
+        """Verify that removed ancestor is removed from ancestors and descendants.
+        """
+        self.hierarchy.remove_ancestor('bats', 'chordates')
+        self.assertEqual(set(['mammals', 'vertebrates']), self.hierarchy.ancestors('bats'))
+        self.assertEqual(set(['otters', 'mammals', 'vertebrates']),
+                         self.hierarchy.descendants('chordates'))
+        self.assertEqual({'concepts': 7, 'closure_pairs': 11}, self.hierarchy.stats())
+
+        # Removing again is harmless
+        self.hierarchy.remove_ancestor('bats', 'chordates')
+
+
+class HierarchyUpdateTests(ConceptHierarchyTestCase):
+    """Verify changes to ConceptHierarchy from committed changes.
+    """
+    def test_apply_changes(self):
+        """Verify that committed rows of concept_ancestors are applied in order.
+        """
+        self.hierarchy.apply_changes(self.make_changes([
+                    AncestorRecord('birds', 'herons', False),
+                    AncestorRecord('animals', 'otters', True),
+                    AncestorRecord('fish', 'otters', False),
+                    AncestorRecord('fish', 'otters', True)]))
+
+        self.assertTrue(self.hierarchy.is_a('herons', 'birds'))
+        self.assertFalse(self.hierarchy.is_a('otters', 'animals'))
+        self.assertFalse(self.hierarchy.is_a('otters', 'fish'))
+
+
+class SharedHierarchyTests(unittest.TestCase):
+    """Verify management of hierarchy shared within process.
+    """
+    def tearDown(self):
+        ConceptHierarchy.reset()
+
+    @patch.object(fact_model.ConceptAncestor, 'select_name_pairs')
+    def test_get_hierarchy(self, select_name_pairs):
+        """Verify that shared hierarchy is loaded once and receives committed changes.
+        """
+        select_name_pairs.return_value = [('mammals', 'otters')]
+
+        hierarchy = ConceptHierarchy.get_hierarchy()
+        self.assertTrue(hierarchy is ConceptHierarchy.get_hierarchy())
+        select_name_pairs.assert_called_once_with()
+        self.assertTrue(hierarchy.apply_changes in fact_model._commit_listeners)
+        self.assertTrue(hierarchy.is_a('otters', 'mammals'))
+
+    @patch.object(ConceptHierarchy, 'load')
+    def test_reset(self, load):
+        """Verify that reset hierarchy is reloaded and no longer receives committed changes.
+        """
+        hierarchy = ConceptHierarchy()
+        load.return_value = hierarchy
+        self.assertTrue(hierarchy is ConceptHierarchy.get_hierarchy())
+
+        ConceptHierarchy.reset()
+        self.assertFalse(hierarchy.apply_changes in fact_model._commit_listeners)
+        load.return_value = ConceptHierarchy()
+        self.assertFalse(hierarchy is ConceptHierarchy.get_hierarchy())
+
+
+class ConceptAncestorsTests(unittest.TestCase):
+    """Verify that hierarchy agrees with concept_ancestors as 'is' relationships change.
+    """
+    def setUp(self):
+        self.suffix = uuid.uuid4()
+        self.is_type = fact_model.RelationshipType.select_by_name('is')
+        self.concepts = {}
+        self.hierarchy = ConceptHierarchy.load()
+        # Changes are recorded at flush only while someone listens for them
+        fact_model.add_commit_listener(self.hierarchy.apply_changes)
+
+    def tearDown(self):
+        fact_model.remove_commit_listener(self.hierarchy.apply_changes)
+        fact_model.db.session.rollback()
+
+    def concept(self, name):
+        """Return Concept for name, unique to test unless it is a meta type.
+        """
+        if name not in self.concepts:
+            concept_name = name
+            if name not in ConceptHierarchy.meta_types:
+                concept_name = '{0}_{1}'.format(name, self.suffix)
+            self.concepts[name] = (fact_model.Concept.select_by_name(concept_name) or
+                                   fact_model.Concept(concept_name=concept_name))
+        return self.concepts[name]
+
+    def add_is(self, subject_name, object_name):
+        relationship = fact_model.Relationship(subject=self.concept(subject_name),
+                                               object=self.concept(object_name),
+                                               relationship_types=[self.is_type])
+        fact_model.db.session.add(relationship)
+        fact_model.db.session.flush()
+        return relationship
+
+    def apply_flushed_changes(self):
+        """Apply changes recorded since last call, as if they had been committed.
+        """
+        changes = fact_model.db.session.info.pop('committed_changes')
+        self.hierarchy.apply_changes(changes)
+
+    def assert_hierarchy_agrees(self):
+        """Verify that hierarchy and a hierarchy freshly loaded from concept_ancestors agree
+        on ancestors of test concepts.
+        """
+        loaded = ConceptHierarchy.load()
+        for name, concept in self.concepts.iteritems():
+            self.assertEqual(loaded.ancestors(concept.concept_name),
+                             self.hierarchy.ancestors(concept.concept_name))
+
+    def test_add_and_delete(self):
+        """Verify agreement after 'is' relationships are added and deleted.
+        """
+        self.add_is('otter', 'mammal')
+        self.add_is('mammal', 'vertebrate')
+        self.add_is('mammal', 'species')
+        self.apply_flushed_changes()
+        self.assert_hierarchy_agrees()
+        self.assertTrue(self.hierarchy.is_a(self.concept('otter').concept_name,
+                                            self.concept('vertebrate').concept_name))
+        self.assertFalse(self.hierarchy.is_a(self.concept('otter').concept_name, 'species'))
+
+        relationship = self.add_is('vertebrate', 'animal')
+        self.add_is('otter', 'animal')
+        fact_model.db.session.delete(relationship)
+        fact_model.db.session.flush()
+        self.apply_flushed_changes()
+        self.assert_hierarchy_agrees()
+        self.assertTrue(self.hierarchy.is_a(self.concept('otter').concept_name,
+                                            self.concept('animal').concept_name))
+        self.assertFalse(self.hierarchy.is_a(self.concept('mammal').concept_name,
+                                             self.concept('animal').concept_name))
@@ -14,7 +14,8 @@ import json
 import logging
 import mock
 
-from animalia import app
+from animalia import create_app
+from animalia.config import Config
 from animalia.exc import IncomingDataError, ExternalApiError
 from animalia.fact_manager import FactManager
 
@@ -23,8 +24,11 @@ class FactManagerTests(unittest.TestCase):
     """Verify /animals/facts endpoints.
     """
     def setUp(self):
-        self.app = app.test_client()
+        self.app = create_app().test_client()
         self.app.testing = True 
+        patcher = mock.patch.object(FactManager, 'sync_kb_generation', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def query_facts(self, question):
         """Helper method to call ask question API with provided question.
@@ -48,6 +52,13 @@ class FactManagerTests(unittest.TestCase):
                              data=json.dumps({'fact': fact_sentence}),
                              content_type='application/json')
 
+    def post_facts(self, fact_sentences):
+        """Helper method to call post facts batch API with provided fact sentences.
+        """
+        return self.app.post('/animals/facts/batch',
+                             data=json.dumps({'facts': fact_sentences}),
+                             content_type='application/json')
+
     @mock.patch.object(FactManager, 'delete_fact_by_id')
     def test_delete_fact(self, delete_fact):
         """Verify success scenario.
@@ -212,6 +223,61 @@ class FactManagerTests(unittest.TestCase):
                                      'details': 'bad news'}),
                          response.data)
 
+    @mock.patch.object(FactManager, 'facts_from_sentences')
+    def test_post_facts(self, make_facts):
+        """Verify success scenario with per-sentence results.
+        """
+        # Set up mocks and test data
+        fact_id = uuid.uuid4()
+        make_facts.return_value = [(mock.Mock(name='fact', fact_id=fact_id), None),
+                                   (None, IncomingDataError('boo hoo'))]
+        sentences = ['the otter lives in the river', 'unparseable fact']
+
+        # Make call
+        response = self.post_facts(sentences)
+
+        # Verify response status and data
+        self.assertTrue(status.is_success(response.status_code))
+        self.assertEqual({'results': [{'id': str(fact_id)},
+                                      {'message': 'Failed to parse your fact',
+                                       'details': 'boo hoo'}]},
+                         json.loads(response.data))
+
+        # Verify mocks
+        make_facts.assert_called_once_with(sentences)
+
+    def test_post_facts__no_post_data(self):
+        """Verify 400 if no list of sentences is posted.
+        """
+        for facts in ([], 'the otter lives in the river', None):
+            response = self.post_facts(facts)
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+            self.assertEqual(json.dumps({'message': 'List of fact sentences is required'}),
+                             response.data)
+
+    @mock.patch.object(FactManager, 'facts_from_sentences')
+    def test_post_facts__not_strings(self, make_facts):
+        """Verify 400 if any posted sentence is not a string.
+        """
+        for facts in (['the otter lives in the river', 42],
+                      [None],
+                      [['the otter lives in the river']],
+                      [{'fact': 'the otter lives in the river'}]):
+            response = self.post_facts(facts)
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+            self.assertEqual(json.dumps({'message': 'Fact sentences must be strings'}),
+                             response.data)
+        self.assertEqual(0, make_facts.call_count)
+
+    @mock.patch.object(Config, 'fact_batch_max_sentences', 2)
+    def test_post_facts__too_many_sentences(self):
+        """Verify 400 if more than maximum number of sentences is posted.
+        """
+        response = self.post_facts(['fact one', 'fact two', 'fact three'])
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual(json.dumps({'message': 'At most 2 fact sentences may be submitted'}),
+                         response.data)
+
     @mock.patch.object(FactManager, 'query_facts')
     def test_query_facts(self, query_facts):
         """Verify success scenario.
@@ -299,16 +365,3 @@ class FactManagerTests(unittest.TestCase):
                                      'details': 'bad news'}),
                          response.data)
 
-
-
-
-
-
-
-
-
-
-
-
-
-
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit tests for FactGraph class.
+"""
+
+from __future__ import unicode_literals
+
+import unittest
+import uuid
+
+from mock import Mock, patch
+
+from animalia.concept_hierarchy import ConceptHierarchy
+import animalia.fact_model as fact_model
+from animalia.fact_graph import FactGraph
+from animalia.fact_model import CommittedChanges, RelationshipRecord
+
+
+class FactGraphTestCase(unittest.TestCase):
+    """Base class for tests of graph built from small set of shoe facts.
+    """
+    is_type_id = uuid.uuid4()
+    kicks_type_id = uuid.uuid4()
+
+    def setUp(self):
+        self.graph = FactGraph()
+        for name in ('is', 'is a', 'isa'):
+            self.graph.add_relationship_type(name, self.is_type_id)
+        self.graph.add_relationship_type('kicks', self.kicks_type_id)
+
+        self.high_heel_is_shoe = self.make_record(self.is_type_id, 'high_heel', 'shoe')
+        self.high_heel_is_hazard = self.make_record(self.is_type_id, 'high_heel', 'safety_hazard')
+        self.trainer_is_shoe = self.make_record(self.is_type_id, 'trainer', 'shoe')
+        self.high_heel_kicks_trainer = self.make_record(
+            self.kicks_type_id, 'high_heel', 'trainer', count=3)
+        for record in (self.high_heel_is_shoe, self.high_heel_is_hazard, self.trainer_is_shoe,
+                       self.high_heel_kicks_trainer):
+            self.graph.add_relationship(record)
+
+    @staticmethod
+    def make_record(relationship_type_id, subject_name, object_name, count=None):
+        return RelationshipRecord(relationship_id=uuid.uuid4(),
+                                  relationship_type_id=relationship_type_id,
+                                  subject_name=subject_name,
+                                  object_name=object_name,
+                                  count=count,
+                                  fact_id=uuid.uuid4())
+
+    @staticmethod
+    def names(matches, attr):
+        return set([getattr(m, attr).concept_name for m in matches])
+
+
+class SelectByValuesTests(FactGraphTestCase):
+    """Verify FactGraph.select_by_values.
+    """
+    def test_select_by_values(self):
+        """Verify match on relationship type, subject and object.
+        """
+        matches = self.graph.select_by_values(relationship_type_name='is',
+                                              subject_name='high_heel',
+                                              object_name='shoe')
+        self.assertEqual(1, len(matches))
+        rel = matches[0]
+        self.assertEqual(self.high_heel_is_shoe.relationship_id, rel.relationship_id)
+        self.assertEqual(self.is_type_id, rel.relationship_type_id)
+        self.assertEqual(self.high_heel_is_shoe.fact_id, rel.fact_id)
+        self.assertEqual('high_heel', rel.subject.concept_name)
+        self.assertEqual('shoe', rel.object.concept_name)
+
+    def test_select_by_values__synonym(self):
+        """Verify that relationship type synonyms select same relationships.
+        """
+        matches = self.graph.select_by_values(relationship_type_name='is a', object_name='shoe')
+        self.assertEqual(set(['high_heel', 'trainer']), self.names(matches, 'subject'))
+
+    def test_select_by_values__no_subject(self):
+        """Verify select with no subject name provided.
+        """
+        matches = self.graph.select_by_values(relationship_type_name='is', object_name='shoe')
+        self.assertEqual(set(['high_heel', 'trainer']), self.names(matches, 'subject'))
+
+    def test_select_by_values__no_object(self):
+        """Verify select with no object name provided.
+        """
+        matches = self.graph.select_by_values(relationship_type_name='is',
+                                              subject_name='high_heel')
+        self.assertEqual(set(['safety_hazard', 'shoe']), self.names(matches, 'object'))
+
+    def test_select_by_values__no_subject_or_object(self):
+        """Verify select with neither subject_name or object_name provided.
+        """
+        matches = self.graph.select_by_values(relationship_type_name='is')
+        self.assertEqual(3, len(matches))
+
+    def test_select_by_values__relationship_number(self):
+        """Verify that count is matched when relationship_number is specified.
+        """
+        matches = self.graph.select_by_values(relationship_type_name='kicks',
+                                              relationship_number=3,
+                                              subject_name='high_heel')
+        self.assertEqual(1, len(matches))
+        self.assertEqual(3, matches[0].count)
+
+        matches = self.graph.select_by_values(relationship_type_name='kicks',
+                                              relationship_number=13,
+                                              subject_name='high_heel')
+        self.assertEqual([], matches)
+
+    def test_select_by_values__unknown_names(self):
+        """Verify empty list for unknown relationship type, subject or object.
+        """
+        self.assertEqual([], self.graph.select_by_values(relationship_type_name='wears'))
+        self.assertEqual([], self.graph.select_by_values(relationship_type_name='is',
+                                                         subject_name='flip_flop'))
+        self.assertEqual([], self.graph.select_by_values(relationship_type_name='is',
+                                                         object_name='boot'))
+
+    def test_concept_types(self):
+        """Verify concept_types of graph and of selected concepts.
+        """
+        self.assertEqual(set(['shoe', 'safety_hazard']),
+                         set(self.graph.concept_types('high_heel')))
+        self.assertEqual([], self.graph.concept_types('shoe'))
+        self.assertEqual([], self.graph.concept_types('flip_flop'))
+
+        matches = self.graph.select_by_values(relationship_type_name='kicks')
+        self.assertEqual(['shoe'], matches[0].object.concept_types)
+
+
+class GraphUpdateTests(FactGraphTestCase):
+    """Verify changes to FactGraph.
+    """
+    def test_remove_relationship(self):
+        """Verify that removed relationship is no longer selected.
+        """
+        self.graph.remove_relationship(self.trainer_is_shoe)
+        matches = self.graph.select_by_values(relationship_type_name='is', object_name='shoe')
+        self.assertEqual(set(['high_heel']), self.names(matches, 'subject'))
+        self.assertEqual([], self.graph.concept_types('trainer'))
+        self.assertEqual({'concepts': 4, 'relationship_types': 2, 'relationships': 3},
+                         self.graph.stats())
+
+        # Removing again is harmless
+        self.graph.remove_relationship(self.trainer_is_shoe)
+
+    def test_add_relationship__update_count(self):
+        """Verify that adding existing relationship updates its count.
+        """
+        self.graph.add_relationship(self.high_heel_kicks_trainer._replace(count=4))
+        matches = self.graph.select_by_values(relationship_type_name='kicks')
+        self.assertEqual(1, len(matches))
+        self.assertEqual(4, matches[0].count)
+
+    def test_apply_changes(self):
+        """Verify that committed changes are applied to graph.
+        """
+        wears_type_id = uuid.uuid4()
+        flip_flop_wears_sock = self.make_record(wears_type_id, 'flip_flop', 'sock')
+        changes = CommittedChanges(saved_relationships=[flip_flop_wears_sock],
+                                   deleted_relationships=[self.trainer_is_shoe],
+                                   saved_relationship_types=[('wears', wears_type_id)],
+                                   saved_concepts=[],
+                                   deleted_concepts=[],
+                                   changed_ancestors=[])
+        self.graph.apply_changes(changes)
+
+        matches = self.graph.select_by_values(relationship_type_name='wears')
+        self.assertEqual(set(['flip_flop']), self.names(matches, 'subject'))
+        matches = self.graph.select_by_values(relationship_type_name='is', object_name='shoe')
+        self.assertEqual(set(['high_heel']), self.names(matches, 'subject'))
+
+
+class WhichAnimalSubjectsTests(FactGraphTestCase):
+    """Verify posting lists combined by FactGraph.which_animal_subjects.
+    """
+    def setUp(self):
+        super(WhichAnimalSubjectsTests, self).setUp()
+        self.flip_flop_is_sandal = self.make_record(self.is_type_id, 'flip_flop', 'sandal')
+        self.sandal_is_shoe = self.make_record(self.is_type_id, 'sandal', 'shoe')
+        for record in (self.flip_flop_is_sandal, self.sandal_is_shoe):
+            self.graph.add_relationship(record)
+
+        hierarchy = ConceptHierarchy()
+        for subject_name, object_name in (('high_heel', 'shoe'), ('high_heel', 'safety_hazard'),
+                                          ('trainer', 'shoe'), ('flip_flop', 'sandal'),
+                                          ('flip_flop', 'shoe'), ('sandal', 'shoe')):
+            hierarchy.add_ancestor(subject_name, object_name)
+        get_hierarchy_patcher = patch.object(ConceptHierarchy, 'get_hierarchy',
+                                             return_value=hierarchy)
+        get_hierarchy_patcher.start()
+        self.addCleanup(get_hierarchy_patcher.stop)
+
+    def which(self, **kwargs):
+        """Select names of concepts matching parsed query built from kwargs.
+        """
+        subject_type = kwargs.pop('subject_type', 'shoe')
+        object_is_species = kwargs.pop('object_is_species', False)
+        attrs = dict(relationship_type_name='kicks',
+                     object_name='trainer',
+                     relationship_number=None,
+                     relationship_negation=False)
+        attrs.update(kwargs)
+        subjects = self.graph.which_animal_subjects(Mock(name='parsed_query', **attrs),
+                                                    subject_type=subject_type,
+                                                    object_is_species=object_is_species)
+        return set(self.graph.concept_names(subjects))
+
+    def test_which_animal_subjects(self):
+        """Verify match on relationship type and object.
+        """
+        self.assertEqual(set(['high_heel']), self.which())
+        self.assertEqual(set(['high_heel']),
+                         self.which(relationship_type_name='isa', object_name='safety_hazard'))
+
+    def test_which_animal_subjects__negation(self):
+        """Verify that negation selects other concepts of subject type.
+        """
+        self.assertEqual(set(['trainer', 'sandal', 'flip_flop']),
+                         self.which(relationship_negation=True))
+
+    def test_which_animal_subjects__relationship_number(self):
+        """Verify match on relationship count, including updated and removed counts.
+        """
+        self.assertEqual(set(['high_heel']), self.which(relationship_number='3'))
+        self.assertEqual(set(), self.which(relationship_number='4'))
+
+        self.graph.add_relationship(self.high_heel_kicks_trainer._replace(count=4))
+        self.assertEqual(set(), self.which(relationship_number='3'))
+        self.assertEqual(set(['high_heel']), self.which(relationship_number='4'))
+
+        self.graph.remove_relationship(self.high_heel_kicks_trainer)
+        self.assertEqual(set(), self.which(relationship_number='4'))
+        self.assertEqual(set(), self.which())
+
+    def test_which_animal_subjects__species_object(self):
+        """Verify that objects of concept type match when object is a species.
+        """
+        self.graph.add_relationship(self.make_record(self.kicks_type_id, 'trainer', 'flip_flop'))
+        self.assertEqual(set(['trainer']),
+                         self.which(object_name='sandal', object_is_species=True))
+        self.assertEqual(set(), self.which(object_name='sandal'))
+
+    def test_which_animal_subjects__unknown(self):
+        """Verify empty result for unknown relationship type or object.
+        """
+        self.assertEqual(set(), self.which(relationship_type_name='wears'))
+        self.assertEqual(set(), self.which(object_name='boot'))
+        self.assertEqual(set(['high_heel', 'trainer', 'sandal', 'flip_flop']),
+                         self.which(object_name='boot', relationship_negation=True))
+
+    def test_type_subjects(self):
+        """Verify that concept types are matched transitively.
+        """
+        self.assertEqual(set(['flip_flop']),
+                         set(self.graph.concept_names(self.graph.type_subjects('sandal'))))
+        self.assertEqual(set(['high_heel', 'trainer', 'sandal', 'flip_flop']),
+                         set(self.graph.concept_names(self.graph.type_subjects('shoe'))))
+
+        self.graph.remove_relationship(self.sandal_is_shoe)
+        for concept_name in ('sandal', 'flip_flop'):
+            ConceptHierarchy.get_hierarchy().remove_ancestor(concept_name, 'shoe')
+        self.assertEqual(set(['high_heel', 'trainer']),
+                         set(self.graph.concept_names(self.graph.type_subjects('shoe'))))
+
+
+class SharedGraphTests(unittest.TestCase):
+    """Verify management of graph shared within process.
+    """
+    def tearDown(self):
+        FactGraph.reset()
+
+    @patch.object(fact_model.Relationship, 'select_records')
+    @patch.object(fact_model.RelationshipType, 'select_name_id_pairs')
+    def test_get_graph(self, select_type_pairs, select_records):
+        """Verify that shared graph is loaded once and receives committed changes.
+        """
+        is_type_id = uuid.uuid4()
+        select_type_pairs.return_value = [('is', is_type_id)]
+        select_records.return_value = [
+            FactGraphTestCase.make_record(is_type_id, 'trainer', 'shoe')]
+
+        graph = FactGraph.get_graph()
+        self.assertTrue(graph is FactGraph.get_graph())
+        self.assertEqual(1, select_records.call_count)
+        self.assertTrue(graph.apply_changes in fact_model._commit_listeners)
+        self.assertEqual(['shoe'], graph.concept_types('trainer'))
+
+    @patch.object(FactGraph, 'load')
+    def test_reset(self, load):
+        """Verify that reset graph is reloaded and no longer receives committed changes.
+        """
+        graph = FactGraph()
+        load.return_value = graph
+        self.assertTrue(graph is FactGraph.get_graph())
+
+        FactGraph.reset()
+        self.assertFalse(graph.apply_changes in fact_model._commit_listeners)
+        load.return_value = FactGraph()
+        self.assertFalse(graph is FactGraph.get_graph())
@@ -9,15 +9,28 @@ from __future__ import unicode_literals
 import copy
 import json
 import logging
+import os
+import shutil
+import tempfile
+import threading
 import unittest
 import uuid
 
 from mock import Mock, call, patch
+import sqlalchemy.exc as sa_exc
 
+from animalia.answer_cache import AnswerCache
+from animalia.concept_hierarchy import ConceptHierarchy
+from animalia.config import Config
 import animalia.exc as exc
+from animalia.fact_graph import FactGraph
 import animalia.fact_model as fact_model
 from animalia.fact_manager import logger, FactManager
+from animalia.fact_query import FactQuery
 from animalia.parsed_sentence import ParsedSentence
+from animalia.plurals import Plurals
+from animalia.wit_cache import WitCache
+from animalia.wit_client import WitClient
 import wit_responses
 
 # Set log level for unit tests
@@ -27,6 +40,10 @@ logger.setLevel(logging.WARN)
 class FactManagerTests(unittest.TestCase):
     """Verify behavior of simple FactManager methods.
     """
+    def setUp(self):
+        patcher = patch.object(fact_model.KbGeneration, 'increment', return_value=1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     @patch.object(fact_model.db.session, 'commit')
     @patch.object(FactManager, '_save_parsed_fact')
@@ -50,11 +67,14 @@ class FactManagerTests(unittest.TestCase):
         parse_response.return_value = mock_parsed_sentence
         save_fact.return_value = saved_fact = Mock(name='saved_fact')
 
+        kb_generation = FactManager._kb_generation
+
         # Make call
         fact = FactManager.fact_from_sentence(mock_sentence)
 
         # Verify result
         self.assertEqual(saved_fact, fact)
+        self.assertEqual(kb_generation + 1, FactManager._kb_generation)
         
         # Verify mocks
         normalize_sentence.assert_called_once_with(mock_sentence)
@@ -158,9 +178,11 @@ class FactManagerTests(unittest.TestCase):
         ensure_relationship.return_value = mock_rel
         concept_name = 'otters'
         concept_type = 'animals'
+        kb_generation = FactManager._kb_generation
 
         # Make call
         FactManager.add_concept(concept_name, concept_type)
+        self.assertEqual(kb_generation + 1, FactManager._kb_generation)
 
         # Verify mocks
         expected_calls = [call(concept_name), call(concept_type)]
@@ -191,6 +213,45 @@ class FactManagerTests(unittest.TestCase):
         expected_calls = [call('otters'), call('animals')]
         self.assertEqual(expected_calls, ensure_concept.call_args_list)
 
+    @patch.object(fact_model.db.session, 'commit')
+    @patch.object(FactManager, '_merge_to_db_session')
+    @patch.object(FactManager, '_ensure_relationship')
+    @patch.object(FactManager, '_ensure_concept')
+    def test_add_concepts(self, ensure_concept, ensure_relationship, merge, commit):
+        """Verify that add_concepts adds all concepts in single transaction.
+        """
+        ensure_concept.side_effect = lambda name: Mock(name=name)
+        ensure_relationship.side_effect = [Mock(name='rel_1'), Mock(name='rel_2')]
+        kb_generation = FactManager._kb_generation
+
+        FactManager.add_concepts([('otter', 'mammal'), ('mammals', 'species')])
+
+        self.assertEqual([call('otters'), call('mammals'), call('mammals'), call('species')],
+                         ensure_concept.call_args_list)
+        self.assertEqual(2, merge.call_count)
+        self.assertEqual(1, commit.call_count)
+        self.assertEqual(kb_generation + 1, FactManager._kb_generation)
+
+    @patch.object(fact_model.db.session, 'commit')
+    @patch.object(FactManager, '_merge_to_db_session')
+    @patch.object(FactManager, '_ensure_relationship')
+    @patch.object(FactManager, '_ensure_concept')
+    @patch.object(Plurals, 'get_plurals')
+    def test_add_concepts__normalize_in_batch(self, get_plurals, ensure_concept,
+                                              ensure_relationship, merge, commit):
+        """Verify that add_concepts normalizes all names with single call to get_plurals.
+        """
+        get_plurals.side_effect = lambda names: dict((n, n + '_p') for n in names)
+        kb_generation = FactManager._kb_generation
+
+        FactManager.add_concepts([('Otter', 'mammal'), ('mammal', 'Species')])
+
+        self.assertEqual(1, get_plurals.call_count)
+        self.assertEqual([call('otter_p'), call('mammal_p'), call('mammal_p'), call('species_p')],
+                         ensure_concept.call_args_list)
+        self.assertEqual(1, commit.call_count)
+        self.assertEqual(kb_generation + 1, FactManager._kb_generation)
+
 
 @patch.object(FactManager, '_merge_to_db_session')
 @patch.object(FactManager, '_ensure_relationship')
@@ -267,23 +328,25 @@ class SaveParsedFactTests(unittest.TestCase):
         select_fact.assert_called_once_with(dup_fact_id)
 
 
+@patch.object(fact_model.ConceptAncestor, 'is_ancestor')
 class EnsureConceptWithTypeTests(unittest.TestCase):
     """Verify behavior of _ensure_concept_with_type method.
     """
     @patch.object(FactManager, '_ensure_relationship')
     @patch.object(FactManager, '_ensure_concept')
-    def test_ensure_concept_with_type(self, ensure_concept, ensure_relationship):
+    def test_ensure_concept_with_type(self, ensure_concept, ensure_relationship, is_ancestor):
         """Verify calls made by _ensure_concept_with_type.
         """
         # Set up mocks and test data
         concept_name = 'high heel'
         concept_type = 'shoes'
+        is_ancestor.return_value = False
         mock_subj_concept = Mock(name='subj_concept', 
                                  concept_name=concept_name, 
-                                 concept_types=[])
+                                 concept_id=11)
         mock_subj_type_concept = Mock(name='obj_concept', 
                                       concept_name=concept_type, 
-                                      concept_types=['accessory'])
+                                      concept_id=12)
         ensure_concept.side_effect = [mock_subj_concept, mock_subj_type_concept]
         ensure_relationship.return_value = mock_rel = Mock(name='relationship',
                                                            subject=mock_subj_concept)
@@ -307,19 +370,26 @@ class EnsureConceptWithTypeTests(unittest.TestCase):
                                                     relationship_type_name='is',
                                                     new_fact_id=mock_fact_id,
                                                     error_on_duplicate=False)
+        is_ancestor.assert_called_once_with(11, 12)
 
+    @patch.object(fact_model.RelationshipType, 'id_for_name', return_value=1)
+    @patch.object(fact_model.ConceptAncestor, 'select_descendant_ids', return_value=set())
+    @patch.object(fact_model.Relationship, 'select_by_subject_id')
     @patch.object(FactManager, '_ensure_relationship')
     @patch.object(FactManager, '_ensure_concept')
-    def test_ensure_concept_with_type__loop(self, ensure_concept, ensure_relationship):
+    def test_ensure_concept_with_type__loop(self, ensure_concept, ensure_relationship,
+                                            select_by_subject_id, select_descendant_ids,
+                                            id_for_name, is_ancestor):
         """Verify calls made by _ensure_concept_with_type when loop is detected.
         """
         # Set up mocks and test data
         concept_name = 'high heel'
         concept_type = 'shoes'
         conflicting_fact_id = uuid.uuid4()
+        is_ancestor.return_value = True
         mock_subj_concept = Mock(name='subj_concept', 
                                  concept_name=concept_name, 
-                                 concept_types=[])
+                                 concept_id=11)
         mock_concept_type_rels = [Mock(name='foo_relationship',
                                        fact_id=uuid.uuid4(),
                                        object=Mock(concept_name='foo')),
@@ -328,9 +398,9 @@ class EnsureConceptWithTypeTests(unittest.TestCase):
                                        object=Mock(concept_name=concept_name))]
         mock_subj_type_concept = Mock(name='obj_concept', 
                                       concept_name=concept_type, 
-                                      concept_types=['foo', concept_name],
-                                      concept_type_relationships=mock_concept_type_rels)
+                                      concept_id=12)
         ensure_concept.side_effect = [mock_subj_concept, mock_subj_type_concept]
+        select_by_subject_id.return_value = mock_concept_type_rels
 
         # Make call
         try:
@@ -343,10 +413,129 @@ class EnsureConceptWithTypeTests(unittest.TestCase):
             self.assertEqual(conflicting_fact_id, ex.conflicting_fact_id)
 
         self.assertEqual(0, ensure_relationship.call_count)
+        is_ancestor.assert_called_once_with(11, 12)
+        select_by_subject_id.assert_called_once_with(12, 1)
+
+    @patch.object(fact_model.RelationshipType, 'id_for_name', return_value=1)
+    @patch.object(fact_model.ConceptAncestor, 'select_descendant_ids')
+    @patch.object(fact_model.Relationship, 'select_by_subject_id')
+    @patch.object(FactManager, '_ensure_relationship')
+    @patch.object(FactManager, '_ensure_concept')
+    def test_ensure_concept_with_type__transitive_loop(self, ensure_concept,
+                                                       ensure_relationship,
+                                                       select_by_subject_id,
+                                                       select_descendant_ids,
+                                                       id_for_name, is_ancestor):
+        """Verify that loop through other concepts references fact of first 'is' relationship.
+        """
+        # Set up mocks and test data; 'shoes is clothing', 'clothing is high heel'
+        concept_name = 'high heel'
+        concept_type = 'shoes'
+        conflicting_fact_id = uuid.uuid4()
+        is_ancestor.return_value = True
+        select_descendant_ids.return_value = set([13])
+        mock_subj_concept = Mock(name='subj_concept', 
+                                 concept_name=concept_name, 
+                                 concept_id=11)
+        mock_concept_type_rels = [Mock(name='foo_relationship',
+                                       fact_id=uuid.uuid4(),
+                                       object_id=14,
+                                       object=Mock(concept_name='foo')),
+                                  Mock(name='clothing_relationship',
+                                       fact_id=conflicting_fact_id,
+                                       object_id=13,
+                                       object=Mock(concept_name='clothing'))]
+        mock_subj_type_concept = Mock(name='obj_concept', 
+                                      concept_name=concept_type, 
+                                      concept_id=12)
+        ensure_concept.side_effect = [mock_subj_concept, mock_subj_type_concept]
+        select_by_subject_id.return_value = mock_concept_type_rels
+
+        # Make call
+        try:
+            FactManager._ensure_concept_with_type(concept_name, concept_type)
+            self.fail("Did not expect to get here")
+        except exc.ConflictingFactError as ex:
+            expected_msg = ("Cannot add relationship 'high heel is shoes'; existing "
+                            "relationship 'shoes is clothing' makes shoes a kind of high heel")
+            self.assertEqual(expected_msg, ex.message)
+            self.assertEqual(conflicting_fact_id, ex.conflicting_fact_id)
+
+        self.assertEqual(0, ensure_relationship.call_count)
+        select_by_subject_id.assert_called_once_with(12, 1)
+        select_descendant_ids.assert_called_once_with(11, [14, 13])
+
+
+@patch.object(fact_model.Concept, 'reference')
+@patch.object(fact_model.Concept, 'select_by_name')
+class EnsureConceptTests(unittest.TestCase):
+    """Verify behavior of _ensure_concept and cache of concept ids.
+    """
+    def setUp(self):
+        super(EnsureConceptTests, self).setUp()
+        self.concept_ids = {'otters': 3}
+        concept_ids_patcher = patch.object(FactManager, '_get_concept_ids',
+                                           return_value=self.concept_ids)
+        concept_ids_patcher.start()
+        self.addCleanup(concept_ids_patcher.stop)
+
+    def test_ensure_concept__cached(self, select_by_name, reference):
+        """Verify that concept with cached id is not selected.
+        """
+        reference.return_value = mock_concept = Mock(name='concept')
+        self.assertEqual(mock_concept, FactManager._ensure_concept('otters'))
+        reference.assert_called_once_with(3, 'otters')
+        self.assertEqual(0, select_by_name.call_count)
+
+    def test_ensure_concept__not_cached(self, select_by_name, reference):
+        """Verify that concept without cached id is selected, or created if not found.
+        """
+        select_by_name.return_value = mock_concept = Mock(name='concept')
+        self.assertEqual(mock_concept, FactManager._ensure_concept('herons'))
+        select_by_name.assert_called_once_with('herons')
+
+        select_by_name.return_value = None
+        concept = FactManager._ensure_concept('herons')
+        self.assertEqual('herons', concept.concept_name)
+        self.assertIsNone(concept.concept_id)
+        self.assertEqual(0, reference.call_count)
+
+
+@patch.object(fact_model.Concept, 'select_name_id_pairs')
+@patch.object(fact_model, 'add_commit_listener')
+@patch.object(FactManager, '_concept_ids', None)
+class ConceptIdsTests(unittest.TestCase):
+    """Verify loading and maintenance of cached concept ids.
+    """
+    def test_get_concept_ids(self, add_commit_listener, select_name_id_pairs):
+        """Verify that concept ids are loaded once.
+        """
+        select_name_id_pairs.return_value = [('otters', 3)]
+
+        concept_ids = FactManager._get_concept_ids()
+        self.assertEqual({'otters': 3}, concept_ids)
+        self.assertIs(concept_ids, FactManager._get_concept_ids())
+        self.assertEqual(1, select_name_id_pairs.call_count)
+        add_commit_listener.assert_called_once_with(FactManager._apply_committed_changes)
+
+    def test_apply_committed_changes(self, add_commit_listener, select_name_id_pairs):
+        """Verify that saved concepts are added to cache and deleted concepts are removed.
+        """
+        select_name_id_pairs.return_value = [('otters', 3), ('herons', 4)]
+        concept_ids = FactManager._get_concept_ids()
+
+        FactManager._apply_committed_changes(fact_model.CommittedChanges(
+                saved_relationships=[],
+                deleted_relationships=[],
+                saved_relationship_types=[('lives', 5)],
+                saved_concepts=[('rivers', 6)],
+                deleted_concepts=[('herons', 4), ('otters', 99)],
+                changed_ancestors=[]))
+        self.assertEqual({'otters': 3, 'rivers': 6}, concept_ids)
 
 
 @patch.object(fact_model.Relationship, 'select_by_foreign_keys')
-@patch.object(fact_model.RelationshipType, 'select_by_name')
+@patch.object(fact_model.RelationshipType, 'reference')
 class EnsureRelationshipTests(unittest.TestCase):
     """Verify behavior of _ensure_relationship.
     """
@@ -354,14 +543,17 @@ class EnsureRelationshipTests(unittest.TestCase):
         super(EnsureRelationshipTests, self).setUp()
         self.subj_concept = Mock(name='subj_concept', concept_id=uuid.uuid4())
         self.obj_concept = Mock(name='obj_concept', concept_id=uuid.uuid4())
+        id_for_name_patcher = patch.object(fact_model.RelationshipType, 'id_for_name',
+                                           side_effect={'aunt': 7}.get)
+        id_for_name_patcher.start()
+        self.addCleanup(id_for_name_patcher.stop)
 
-    def test_ensure_relationship(self, select_type_by_name, select_relationship):
+    def test_ensure_relationship(self, reference_type, select_relationship):
         """Verify calls made for new relationship and relationship_type_name.
         """
         # Set up mocks and test data
-        select_type_by_name.return_value = None
         select_relationship.return_value = None
-        relationship_type_name = 'aunt'
+        relationship_type_name = 'uncle'
         new_fact_id = uuid.uuid4()
 
         # Make call
@@ -378,12 +570,12 @@ class EnsureRelationshipTests(unittest.TestCase):
         self.assertIsNone(relationship.count)
         self.assertEqual(new_fact_id, relationship.fact_id)
 
-    def test_ensure_relationship__existing_type(self, select_type_by_name, select_relationship):
+    def test_ensure_relationship__existing_type(self, reference_type, select_relationship):
         """Verify calls made by _ensure_relationship for existing relationship_type.
         """
         # Set up mocks and test data
         r_name = 'aunt'
-        select_type_by_name.return_value = mock_rel_type = Mock(name='relationship_type',
+        reference_type.return_value = mock_rel_type = Mock(name='relationship_type',
                                                                 relationship_type_name=r_name,
                                                                 relationship_type_id=uuid.uuid4())
         select_relationship.return_value = None
@@ -403,17 +595,17 @@ class EnsureRelationshipTests(unittest.TestCase):
         self.assertEqual(new_fact_id, relationship.fact_id)
 
         # Verify mocks
-        select_type_by_name.assert_called_once_with(r_name)
+        reference_type.assert_called_once_with(r_name, 7)
         select_relationship.assert_called_once_with(self.subj_concept.concept_id,
                                                     self.obj_concept.concept_id,
                                                     mock_rel_type.relationship_type_id)
 
-    def test_ensure_relationship__duplicate(self, select_type_by_name, select_relationship):
+    def test_ensure_relationship__duplicate(self, reference_type, select_relationship):
         """Verify calls made by _ensure_relationship for existing relationship.
         """
         # Set up mocks and test data
         r_name = 'aunt'
-        select_type_by_name.return_value = mock_rel_type = Mock(name='relationship_type',
+        reference_type.return_value = mock_rel_type = Mock(name='relationship_type',
                                                                 relationship_type_name=r_name)
         select_relationship.return_value = mock_rel = Mock(name='relationship')
 
@@ -425,12 +617,12 @@ class EnsureRelationshipTests(unittest.TestCase):
         # Verify result
         self.assertEqual(relationship, mock_rel)
 
-    def test_ensure_relationship__duplicate_raise(self, select_type_by_name, select_relationship):
+    def test_ensure_relationship__duplicate_raise(self, reference_type, select_relationship):
         """Verify raise for duplicate relationship with error_on_duplicate=True.
         """
         # Set up mocks and test data
         r_name = 'aunt'
-        select_type_by_name.return_value = mock_rel_type = Mock(name='relationship_type',
+        reference_type.return_value = mock_rel_type = Mock(name='relationship_type',
                                                                 relationship_type_name=r_name)
         select_relationship.return_value = mock_rel = Mock(name='relationship',
                                                            fact_id=uuid.uuid4())
@@ -448,13 +640,13 @@ class EnsureRelationshipTests(unittest.TestCase):
             new_fact_id=uuid.uuid4(),
             error_on_duplicate=True)
 
-    def test_ensure_relationship__duplicate__no_count_specified(self, select_type_by_name, 
+    def test_ensure_relationship__duplicate__no_count_specified(self, reference_type, 
                                                                 select_relationship):
         """Verify duplicate if relationship has count but no relationship_number is specified.
         """
         # Set up mocks and test data
         r_name = 'aunt'
-        select_type_by_name.return_value = mock_rel_type = Mock(name='relationship_type',
+        reference_type.return_value = mock_rel_type = Mock(name='relationship_type',
                                                                 relationship_type_name=r_name)
         select_relationship.return_value = mock_rel = Mock(name='relationship',
                                                            fact_id=uuid.uuid4(),
@@ -473,13 +665,13 @@ class EnsureRelationshipTests(unittest.TestCase):
             new_fact_id=uuid.uuid4(),
             error_on_duplicate=True)
 
-    def test_ensure_relationship__duplicate__matching_count(self, select_type_by_name, 
+    def test_ensure_relationship__duplicate__matching_count(self, reference_type, 
                                                             select_relationship):
         """Verify duplicate if relationship has count.
         """
         # Set up mocks and test data
         r_name = 'aunt'
-        select_type_by_name.return_value = mock_rel_type = Mock(name='relationship_type',
+        reference_type.return_value = mock_rel_type = Mock(name='relationship_type',
                                                                 relationship_type_name=r_name)
         select_relationship.return_value = mock_rel = Mock(name='relationship',
                                                            fact_id=uuid.uuid4(),
@@ -499,14 +691,14 @@ class EnsureRelationshipTests(unittest.TestCase):
             new_fact_id=uuid.uuid4(),
             error_on_duplicate=True)
 
-    def test_ensure_relationship__conflict(self, select_type_by_name, select_relationship):
+    def test_ensure_relationship__conflict(self, reference_type, select_relationship):
         """Verify error on conflict with existing relationship count.
         """
         # Set up mocks and test data
         r_name = 'aunt'
         orig_count = 3
         new_count = 4
-        select_type_by_name.return_value = mock_rel_type = Mock(name='relationship_type',
+        reference_type.return_value = mock_rel_type = Mock(name='relationship_type',
                                                                 relationship_type_name=r_name)
         select_relationship.return_value = mock_rel = Mock(name='relationship', count=orig_count)
 
@@ -525,12 +717,12 @@ class EnsureRelationshipTests(unittest.TestCase):
             new_fact_id=uuid.uuid4(),
             error_on_duplicate=True)
 
-    def test_ensure_relationship__needs_update(self, select_type_by_name, select_relationship):
+    def test_ensure_relationship__needs_update(self, reference_type, select_relationship):
         """Verify relationship.count is set on existing relationship if relationship_number is sent.
         """
         # Set up mocks and test data
         r_name = 'aunt'
-        select_type_by_name.return_value = mock_rel_type = Mock(name='relationship_type',
+        reference_type.return_value = mock_rel_type = Mock(name='relationship_type',
                                                                 relationship_type_name=r_name)
         select_relationship.return_value = mock_rel = Mock(name='relationship',
                                                            count=None)
@@ -562,11 +754,14 @@ class DeleteFactTests(unittest.TestCase):
         mock_relationships = [Mock(name='relationship_1'), Mock(name='relationship_2')]
         select_relationships.return_value = mock_relationships
         
+        kb_generation = FactManager._kb_generation
+
         # Make call
         deleted_fact_id = FactManager.delete_fact_by_id(fact_id)
 
         # Verify result
         self.assertEqual(fact_id, deleted_fact_id)
+        self.assertEqual(kb_generation + 1, FactManager._kb_generation)
 
         # Verify mocks
         select_fact.assert_called_once_with(fact_id)
@@ -598,3 +793,528 @@ class DeleteFactTests(unittest.TestCase):
         self.assertEqual(0, select_relationships.call_count)
         self.assertEqual(0, delete_from_session.call_count)
 
+
+
+@patch.object(fact_model.db.session, 'commit')
+@patch.object(fact_model.db.session, 'begin_nested')
+@patch.object(FactManager, '_save_parsed_fact')
+@patch.object(FactManager, '_parse_fact_sentence')
+@patch.object(fact_model.IncomingFact, 'select_by_texts')
+class FactsFromSentencesTests(unittest.TestCase):
+    """Verify behavior of facts_from_sentences method.
+    """
+    def setUp(self):
+        patcher = patch.object(fact_model.KbGeneration, 'increment', return_value=1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_facts_from_sentences(self, select_facts, parse_sentence, save_fact, begin_nested,
+                                  commit):
+        """Verify results for new, existing, repeated, unparseable and conflicting facts.
+        """
+        # Set up mocks and test data
+        existing_fact = Mock(name='existing_fact')
+        select_facts.return_value = {'the otter lives in the river': existing_fact}
+        parsed_1 = Mock(name='parsed_1')
+        parsed_2 = Mock(name='parsed_2')
+        parse_error = exc.InvalidFactDataError('no intent')
+        parse_sentence.side_effect = lambda s: {'the otter eats fish': (parsed_1, None),
+                                                'the otter eats mud': (None, parse_error),
+                                                'the otter has 5 legs': (parsed_2, None)}[s]
+        new_fact = Mock(name='new_fact')
+        conflict_error = exc.ConflictingFactError('4 legs')
+        save_fact.side_effect = [new_fact, conflict_error]
+        begin_nested.side_effect = savepoints = [Mock(name='savepoint_1'),
+                                                 Mock(name='savepoint_2')]
+        kb_generation = FactManager._kb_generation
+
+        # Make call
+        results = FactManager.facts_from_sentences(['The otter eats fish.',
+                                                    'the otter lives in the river',
+                                                    'the otter eats fish',
+                                                    'the otter eats mud',
+                                                    '!',
+                                                    'the otter has 5 legs'])
+
+        # Verify results
+        self.assertEqual((new_fact, None), results[0])
+        self.assertEqual((existing_fact, None), results[1])
+        self.assertEqual((new_fact, None), results[2])
+        self.assertEqual((None, parse_error), results[3])
+        self.assertEqual(None, results[4][0])
+        self.assertTrue(isinstance(results[4][1], exc.SentenceParseError))
+        self.assertEqual((None, conflict_error), results[5])
+        self.assertEqual(kb_generation + 1, FactManager._kb_generation)
+
+        # Verify mocks
+        self.assertEqual(3, parse_sentence.call_count)
+        self.assertEqual([call(parsed_1), call(parsed_2)], save_fact.call_args_list)
+        self.assertEqual(1, savepoints[0].commit.call_count)
+        self.assertEqual(1, savepoints[1].rollback.call_count)
+        self.assertEqual(1, commit.call_count)
+
+    def test_parse_fact_sentences(self, select_facts, parse_sentence, save_fact, begin_nested,
+                                  commit):
+        """Verify that sentences are parsed by bounded number of threads in order.
+        """
+        parse_sentence.side_effect = lambda s: (s.upper(), None)
+        sentences = ['fact {0}'.format(i) for i in range(20)]
+        with patch.object(Config, 'fact_batch_wit_concurrency', 4):
+            results = FactManager._parse_fact_sentences(sentences)
+        self.assertEqual([(s.upper(), None) for s in sentences], results)
+
+    def test_save_parsed_facts(self, select_facts, parse_sentence, save_fact, begin_nested,
+                               commit):
+        """Verify that parsed facts are saved once, in order, and errors are passed through.
+        """
+        # Set up mocks and test data
+        existing_fact = Mock(name='existing_fact')
+        select_facts.return_value = {'the otter lives in the river': existing_fact}
+        parsed_1 = Mock(name='parsed_1')
+        parse_error = exc.InvalidFactDataError('no intent')
+        new_fact = Mock(name='new_fact')
+        save_fact.return_value = new_fact
+        begin_nested.return_value = savepoint = Mock(name='savepoint')
+        kb_generation = FactManager._kb_generation
+
+        # Make call
+        results = FactManager.save_parsed_facts(
+            [('the otter eats fish', parsed_1, None),
+             ('the otter lives in the river', Mock(name='parsed_2'), None),
+             ('the otter eats fish', parsed_1, None),
+             ('the otter eats mud', None, parse_error)])
+
+        # Verify results
+        self.assertEqual([(new_fact, None), (existing_fact, None), (new_fact, None),
+                          (None, parse_error)], results)
+        self.assertEqual(kb_generation + 1, FactManager._kb_generation)
+
+        # Verify mocks
+        select_facts.assert_called_once_with(['the otter eats fish',
+                                              'the otter lives in the river',
+                                              'the otter eats fish'])
+        save_fact.assert_called_once_with(parsed_1)
+        self.assertEqual(1, savepoint.commit.call_count)
+        self.assertEqual(1, commit.call_count)
+        self.assertEqual(0, parse_sentence.call_count)
+
+    def test_save_parsed_facts__database_error(self, select_facts, parse_sentence, save_fact,
+                                               begin_nested, commit):
+        """Verify that database error of one fact rolls back its savepoint only.
+        """
+        select_facts.return_value = {}
+        integrity_error = sa_exc.IntegrityError('INSERT INTO concepts', {}, Exception('duplicate'))
+        new_fact = Mock(name='new_fact')
+        save_fact.side_effect = [integrity_error, new_fact]
+        begin_nested.return_value = savepoint = Mock(name='savepoint')
+
+        results = FactManager.save_parsed_facts(
+            [('the otter eats fish', Mock(name='parsed_1'), None),
+             ('the otter eats mud', Mock(name='parsed_2'), None)])
+
+        self.assertEqual([(None, integrity_error), (new_fact, None)], results)
+        self.assertEqual(1, savepoint.rollback.call_count)
+        self.assertEqual(1, savepoint.commit.call_count)
+        self.assertEqual(1, commit.call_count)
+
+    def test_parse_fact_sentence__public(self, select_facts, parse_sentence, save_fact,
+                                         begin_nested, commit):
+        """Verify that public parse_fact_sentence normalizes sentence and does not use database.
+        """
+        parsed = Mock(name='parsed')
+        parse_sentence.return_value = (parsed, None)
+        self.assertEqual(('the otter eats fish', parsed, None),
+                         FactManager.parse_fact_sentence('The otter eats fish!'))
+        parse_sentence.assert_called_once_with('the otter eats fish')
+
+        sentence, parsed, error = FactManager.parse_fact_sentence('?')
+        self.assertIsNone(parsed)
+        self.assertTrue(isinstance(error, exc.SentenceParseError))
+        self.assertEqual(1, parse_sentence.call_count)
+        self.assertEqual(0, select_facts.call_count)
+
+
+@patch.object(FactManager, '_query_wit')
+class ParseFactSentenceTests(unittest.TestCase):
+    """Verify behavior of _parse_fact_sentence method.
+    """
+    def test_parse_fact_sentence(self, query_wit):
+        """Verify parsed sentence for valid fact.
+        """
+        query_wit.return_value = copy.deepcopy(wit_responses.animal_leg_fact_data)
+        parsed_sentence, error = FactManager._parse_fact_sentence('the otter has four legs')
+        self.assertIsNone(error)
+        self.assertEqual('otters', parsed_sentence.subject_name)
+
+    def test_parse_fact_sentence__external_api_error(self, query_wit):
+        """Verify that wit.ai failure is returned as error of sentence.
+        """
+        query_wit.side_effect = error = exc.ExternalApiError('down')
+        self.assertEqual((None, error), FactManager._parse_fact_sentence('the otter eats fish'))
+
+    @patch.object(ParsedSentence, 'from_wit_response')
+    def test_parse_fact_sentence__invalid_fact(self, parse_response, query_wit):
+        """Verify InvalidFactDataError is returned for sentence that is not valid fact.
+        """
+        parse_response.side_effect = ValueError('no intent')
+        parsed_sentence, error = FactManager._parse_fact_sentence('the otter eats fish')
+        self.assertIsNone(parsed_sentence)
+        self.assertTrue(isinstance(error, exc.InvalidFactDataError))
+
+
+@patch.object(FactQuery, 'find_answer')
+@patch.object(ParsedSentence, 'from_wit_response')
+@patch.object(FactManager, '_query_wit')
+class QueryFactsTests(unittest.TestCase):
+    """Verify behavior of query_facts method.
+    """
+    def setUp(self):
+        self.answer_cache = AnswerCache(max_entries=10)
+        patcher = patch.object(FactManager, '_get_answer_cache', return_value=self.answer_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_query_facts(self, query_wit, parse_response, find_answer):
+        """Verify calls made by query_facts and caching of answer.
+        """
+        query_wit.return_value = test_data = copy.deepcopy(wit_responses.animal_leg_fact_data)
+        find_answer.return_value = ['rivers']
+
+        self.assertEqual(['rivers'], FactManager.query_facts('Where do otters live'))
+        query_wit.assert_called_once_with('where do otters live?')
+        parse_response.assert_called_once_with(test_data)
+        self.assertEqual((True, ['rivers']),
+                         self.answer_cache.get('where do otters live', FactManager._kb_generation))
+
+    def test_query_facts__cached(self, query_wit, parse_response, find_answer):
+        """Verify that cached answer is returned without wit.ai request or fact query.
+        """
+        find_answer.return_value = None
+        self.assertIsNone(FactManager.query_facts('Where do otters live?'))
+        self.assertIsNone(FactManager.query_facts('where do otters live'))
+        self.assertEqual(1, query_wit.call_count)
+        self.assertEqual(1, find_answer.call_count)
+        self.assertEqual(1, FactManager.answer_cache_stats()['hits'])
+        self.assertEqual(1, FactManager.answer_cache_stats()['misses'])
+
+    def test_query_facts__kb_generation(self, query_wit, parse_response, find_answer):
+        """Verify that cached answer is not returned once facts have changed.
+        """
+        find_answer.side_effect = [['rivers'], ['lakes', 'rivers']]
+        self.assertEqual(['rivers'], FactManager.query_facts('where do otters live'))
+        FactManager._bump_kb_generation()
+        self.assertEqual(['lakes', 'rivers'], FactManager.query_facts('where do otters live'))
+        self.assertEqual(2, query_wit.call_count)
+
+    def test_query_facts__invalid_query(self, query_wit, parse_response, find_answer):
+        """Verify InvalidQueryDataError and no cached answer for unparseable query.
+        """
+        parse_response.side_effect = ValueError('no intent')
+        self.assertRaises(exc.InvalidQueryDataError,
+                          FactManager.query_facts,
+                          'where do otters live')
+        self.assertEqual(0, self.answer_cache.stats()['entries'])
+
+
+@patch.object(FactManager, '_reset_caches')
+@patch.object(fact_model.KbGeneration, 'select_generation', return_value=5)
+class KbGenerationTests(unittest.TestCase):
+    """Verify syncing of caches with knowledge base generation in database.
+    """
+    def setUp(self):
+        FactManager._synced_kb_generation = 5
+        FactManager._kb_generation_checked_at = 0
+
+    def tearDown(self):
+        FactManager._synced_kb_generation = None
+        FactManager._kb_generation_checked_at = 0
+
+    def test_sync_kb_generation(self, select_generation, reset_caches):
+        """Verify that changes by other processes discard caches and cached answers.
+        """
+        self.assertFalse(FactManager.sync_kb_generation())
+        self.assertEqual(0, reset_caches.call_count)
+
+        kb_generation = FactManager._kb_generation
+        select_generation.return_value = 6
+        FactManager._kb_generation_checked_at = 0
+        self.assertTrue(FactManager.sync_kb_generation())
+        self.assertEqual(1, reset_caches.call_count)
+        self.assertEqual(kb_generation + 1, FactManager._kb_generation)
+        self.assertEqual(6, FactManager._synced_kb_generation)
+
+    def test_sync_kb_generation__interval(self, select_generation, reset_caches):
+        """Verify that generation is selected at most once per check interval.
+        """
+        with patch.object(Config, 'kb_generation_check_interval', 60):
+            self.assertFalse(FactManager.sync_kb_generation())
+            select_generation.return_value = 6
+            self.assertFalse(FactManager.sync_kb_generation())
+        self.assertEqual(1, select_generation.call_count)
+        with patch.object(Config, 'kb_generation_check_interval', 0):
+            self.assertTrue(FactManager.sync_kb_generation())
+
+    def test_sync_kb_generation__unsynced(self, select_generation, reset_caches):
+        """Verify that caches of process that has not synced yet are discarded.
+        """
+        FactManager._synced_kb_generation = None
+        self.assertTrue(FactManager.sync_kb_generation())
+        self.assertEqual(5, FactManager._synced_kb_generation)
+
+    @patch.object(fact_model.db.session, 'commit')
+    @patch.object(fact_model.KbGeneration, 'increment', return_value=6)
+    def test_commit_kb_changes(self, increment, commit_txn, select_generation, reset_caches):
+        """Verify that own changes increment generation without discarding caches.
+        """
+        kb_generation = FactManager._kb_generation
+        FactManager._commit_kb_changes()
+        increment.assert_called_once_with()
+        commit_txn.assert_called_once_with()
+        self.assertEqual(kb_generation + 1, FactManager._kb_generation)
+        self.assertEqual(6, FactManager._synced_kb_generation)
+
+        select_generation.return_value = 6
+        self.assertFalse(FactManager.sync_kb_generation())
+        self.assertEqual(0, reset_caches.call_count)
+
+    @patch.object(fact_model.db.session, 'commit')
+    @patch.object(fact_model.KbGeneration, 'increment', return_value=7)
+    def test_commit_kb_changes__unsynced(self, increment, commit_txn, select_generation,
+                                         reset_caches):
+        """Verify that changes by other processes are synced after own changes.
+        """
+        FactManager._commit_kb_changes()
+        self.assertEqual(5, FactManager._synced_kb_generation)
+
+        select_generation.return_value = 7
+        self.assertTrue(FactManager.sync_kb_generation())
+        self.assertEqual(1, reset_caches.call_count)
+
+
+class CachesTests(unittest.TestCase):
+    """Verify warming and discarding of in-process caches.
+    """
+    def tearDown(self):
+        FactManager._concept_ids = None
+
+    @patch.object(FactManager, '_check_kb_generation')
+    @patch.object(fact_model.db.session, 'remove')
+    @patch.object(Plurals, 'load_lexicon')
+    @patch.object(FactGraph, 'get_graph')
+    @patch.object(fact_model.RelationshipType, 'id_for_name')
+    @patch.object(FactManager, '_get_concept_ids')
+    @patch.object(ConceptHierarchy, 'get_hierarchy')
+    def test_warm_caches(self, get_hierarchy, get_concept_ids, id_for_name, get_graph,
+                         load_lexicon, session_remove, check_kb_generation):
+        """Verify that caches of configured query backend are loaded.
+        """
+        with patch.object(Config, 'fact_query_backend', 'graph'), \
+                patch.object(Plurals, 'lexicon', None):
+            FactManager.warm_caches()
+        get_hierarchy.assert_called_once_with()
+        get_concept_ids.assert_called_once_with()
+        id_for_name.assert_called_once_with('is')
+        get_graph.assert_called_once_with()
+        load_lexicon.assert_called_once_with()
+        session_remove.assert_called_once_with()
+        check_kb_generation.assert_called_once_with()
+
+        get_graph.reset_mock()
+        with patch.object(Config, 'fact_query_backend', 'sql'):
+            FactManager.warm_caches()
+        self.assertEqual(0, get_graph.call_count)
+
+    @patch.object(fact_model.RelationshipType, 'reset_ids_by_name')
+    @patch.object(FactGraph, 'reset')
+    @patch.object(ConceptHierarchy, 'reset')
+    @patch.object(fact_model, 'remove_commit_listener')
+    def test_reset_caches(self, remove_commit_listener, reset_hierarchy, reset_graph,
+                          reset_ids_by_name):
+        """Verify that caches are discarded and concept ids unregistered for changes.
+        """
+        FactManager._concept_ids = {'otters': 3}
+        FactManager._reset_caches()
+        self.assertIsNone(FactManager._concept_ids)
+        remove_commit_listener.assert_called_once_with(FactManager._apply_committed_changes)
+        reset_hierarchy.assert_called_once_with()
+        reset_graph.assert_called_once_with()
+        reset_ids_by_name.assert_called_once_with()
+
+
+@patch.object(fact_model.db.session, 'remove')
+@patch.object(FactManager, '_query_wit')
+class AsyncTests(unittest.TestCase):
+    """Verify behavior of fact_from_sentence_async and query_facts_async methods.
+    """
+    def setUp(self):
+        self.answer_cache = AnswerCache(max_entries=10)
+        patcher = patch.object(FactManager, '_get_answer_cache', return_value=self.answer_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for name, value in (('async_wit_concurrency', 8), ('async_db_pool_size', 2)):
+            patcher = patch.object(Config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        FactManager._async_pools_pid = None
+
+    def tearDown(self):
+        for pool in FactManager._get_async_pools():
+            pool.close()
+            pool.join()
+        FactManager._async_pools_pid = None
+
+    @patch.object(FactManager, '_save_wit_fact')
+    @patch.object(fact_model.IncomingFact, 'select_by_text')
+    def test_fact_from_sentence_async(self, select_fact, save_fact, query_wit, session_remove):
+        """Verify that fact is selected, parsed and saved in thread pools.
+        """
+        select_fact.return_value = None
+        query_wit.return_value = test_data = copy.deepcopy(wit_responses.animal_leg_fact_data)
+        save_fact.return_value = saved_fact = Mock(name='saved_fact')
+
+        future = FactManager.fact_from_sentence_async('The otter has four legs.')
+        self.assertIs(saved_fact, future.result())
+        select_fact.assert_called_once_with('the otter has four legs')
+        query_wit.assert_called_once_with('the otter has four legs')
+        save_fact.assert_called_once_with(test_data)
+        # db session of thread is removed after selecting and after saving
+        self.assertEqual(2, session_remove.call_count)
+
+    @patch.object(FactManager, '_save_wit_fact')
+    @patch.object(fact_model.IncomingFact, 'select_by_text')
+    def test_fact_from_sentence_async__existing_sentence(self, select_fact, save_fact,
+                                                         query_wit, session_remove):
+        """Verify that existing fact is returned without wit.ai request.
+        """
+        select_fact.return_value = mock_fact = Mock(name='incoming_fact')
+        self.assertIs(mock_fact,
+                      FactManager.fact_from_sentence_async('the otter has four legs').result())
+        self.assertEqual(0, query_wit.call_count)
+        self.assertEqual(0, save_fact.call_count)
+
+    @patch.object(FactManager, '_save_wit_fact')
+    @patch.object(fact_model.IncomingFact, 'select_by_text')
+    def test_fact_from_sentence_async__errors(self, select_fact, save_fact, query_wit,
+                                              session_remove):
+        """Verify that errors are raised by result of future.
+        """
+        self.assertRaisesRegexp(exc.SentenceParseError,
+                                'Empty fact sentence provided',
+                                FactManager.fact_from_sentence_async('!').result)
+
+        select_fact.return_value = None
+        query_wit.side_effect = exc.ExternalApiError('wit is down')
+        self.assertRaisesRegexp(exc.ExternalApiError,
+                                'wit is down',
+                                FactManager.fact_from_sentence_async('the otter eats fish').result)
+        self.assertEqual(0, save_fact.call_count)
+
+    @patch.object(FactQuery, 'find_answer')
+    @patch.object(ParsedSentence, 'from_wit_response')
+    def test_query_facts_async(self, parse_response, find_answer, query_wit, session_remove):
+        """Verify that query is answered in thread pools and that cached answer is returned.
+        """
+        query_wit.return_value = test_data = copy.deepcopy(wit_responses.animal_leg_fact_data)
+        find_answer.return_value = ['rivers']
+
+        self.assertEqual(['rivers'], FactManager.query_facts_async('Where do otters live').result())
+        query_wit.assert_called_once_with('where do otters live?')
+        parse_response.assert_called_once_with(test_data)
+        self.assertEqual(1, session_remove.call_count)
+
+        future = FactManager.query_facts_async('where do otters live?')
+        self.assertTrue(future.done())
+        self.assertEqual(['rivers'], future.result())
+        self.assertEqual(1, query_wit.call_count)
+
+    @patch.object(ParsedSentence, 'from_wit_response')
+    def test_query_facts_async__invalid_query(self, parse_response, query_wit, session_remove):
+        """Verify that errors are raised by result of future.
+        """
+        self.assertRaises(exc.InvalidQueryDataError, FactManager.query_facts_async('').result)
+
+        parse_response.side_effect = ValueError('no intent')
+        self.assertRaises(exc.InvalidQueryDataError,
+                          FactManager.query_facts_async('where do otters live').result)
+        self.assertEqual(0, self.answer_cache.stats()['entries'])
+
+    @patch.object(FactQuery, 'find_answer')
+    @patch.object(ParsedSentence, 'from_wit_response')
+    def test_query_facts_async__concurrent(self, parse_response, find_answer, query_wit,
+                                           session_remove):
+        """Verify that wit.ai requests of many calls are in flight at once.
+        """
+        in_flight = []
+        all_in_flight = threading.Event()
+        release = threading.Event()
+
+        def query_wit_side_effect(sentence):
+            in_flight.append(sentence)
+            if len(in_flight) == 8:
+                all_in_flight.set()
+            release.wait(5)
+            return {'_text': sentence}
+        query_wit.side_effect = query_wit_side_effect
+        find_answer.return_value = ['rivers']
+
+        futures = [FactManager.query_facts_async('where do otters {0} live'.format(i))
+                   for i in range(8)]
+        self.assertTrue(all_in_flight.wait(5))
+        self.assertFalse(any(future.done() for future in futures))
+        release.set()
+        self.assertEqual([['rivers']] * 8, [future.result() for future in futures])
+
+
+@patch.object(WitClient, 'shared')
+class QueryWitTests(unittest.TestCase):
+    """Verify behavior of _query_wit method.
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.wit_cache = WitCache(os.path.join(self.tmp_dir, 'wit_cache.sqlite'),
+                                  'https://wit.example.com/message', 'v1')
+        self.response_data = copy.deepcopy(wit_responses.animal_leg_fact_data)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_query_wit(self, shared_client):
+        """Verify that response from wit.ai is returned and cached.
+        """
+        shared_client.return_value = mock_client = Mock(name='wit_client')
+        mock_client.query.return_value = self.response_data
+        with patch.object(FactManager, '_get_wit_cache', return_value=self.wit_cache):
+            response = FactManager._query_wit('the otter has four legs')
+        self.assertEqual(self.response_data, response)
+        mock_client.query.assert_called_once_with('the otter has four legs')
+        self.assertEqual(self.response_data, self.wit_cache.get('the otter has four legs'))
+
+    def test_query_wit__cached(self, shared_client):
+        """Verify that cached response is returned without request to wit.ai.
+        """
+        self.wit_cache.set('the otter has four legs', self.response_data)
+        with patch.object(FactManager, '_get_wit_cache', return_value=self.wit_cache):
+            response = FactManager._query_wit('the otter has four legs')
+        self.assertEqual(self.response_data, response)
+        self.assertEqual(0, shared_client.call_count)
+
+    def test_query_wit__no_cache(self, shared_client):
+        """Verify request to wit.ai when cache is disabled.
+        """
+        shared_client.return_value = mock_client = Mock(name='wit_client')
+        mock_client.query.return_value = self.response_data
+        with patch.object(FactManager, '_get_wit_cache', return_value=None):
+            response = FactManager._query_wit('the otter has four legs')
+        self.assertEqual(self.response_data, response)
+        mock_client.query.assert_called_once_with('the otter has four legs')
+
+    def test_query_wit__failed_response(self, shared_client):
+        """Verify ExternalApiError and no cache entry for failed request to wit.ai.
+        """
+        shared_client.return_value = mock_client = Mock(name='wit_client')
+        mock_client.query.side_effect = exc.ExternalApiError('uh oh')
+        with patch.object(FactManager, '_get_wit_cache', return_value=self.wit_cache):
+            self.assertRaises(exc.ExternalApiError,
+                              FactManager._query_wit,
+                              'the otter has four legs')
+        self.assertIsNone(self.wit_cache.get('the otter has four legs'))
@@ -7,10 +7,25 @@
 from __future__ import unicode_literals
 
 import datetime
+import itertools
+import random
 import unittest
 import uuid
 
-from animalia.fact_model import db, Concept, IncomingFact, Relationship, RelationshipType
+from mock import Mock, patch
+import sqlalchemy as sa
+import sqlalchemy.event as sa_event
+
+import animalia.fact_model as fact_model
+from animalia.fact_model import (db, Concept, ConceptAncestor, IncomingFact, KbGeneration,
+                                 Relationship, RelationshipType, RelationshipTypeId)
+
+
+# Integer keys for test concepts and relationship types, clear of keys assigned by database
+_test_keys = itertools.count(random.randint(10 ** 8, 10 ** 9))
+
+def new_key():
+    return next(_test_keys)
 
 
 class FactModelTestCase(unittest.TestCase):
@@ -31,7 +46,7 @@ class ConceptTests(FactModelTestCase):
         """Verify creation with concept_name and concept_id.
         """
         concept_name = 'flower_{0}'.format(uuid.uuid4())
-        concept_id = uuid.uuid4()
+        concept_id = new_key()
         concept = Concept(concept_name=concept_name, concept_id=concept_id)
         db.session.add(concept)
         self.reset_session()
@@ -52,7 +67,7 @@ class ConceptTests(FactModelTestCase):
         retrieved_concept = db.session.query(Concept).filter_by(concept_name=concept_name).first()
         self.assertIsNotNone(retrieved_concept, "Expected to find persisted Concept")
         self.assertEqual(concept_name, retrieved_concept.concept_name)
-        self.assertTrue(isinstance(retrieved_concept.concept_id, uuid.UUID))
+        self.assertTrue(isinstance(retrieved_concept.concept_id, (int, long)))
 
     def test_select_by_name(self):
         """Verify select_by_name method.
@@ -77,6 +92,36 @@ class ConceptTests(FactModelTestCase):
         retrieved_concept = Concept.select_by_name('flower_123')
         self.assertIsNone(retrieved_concept, "Expected to find no persisted Concept")
 
+    def test_reference(self):
+        """Verify that reference attaches persistent Concept without selecting it.
+        """
+        concept_name = 'flower_{0}'.format(uuid.uuid4())
+        concept = Concept(concept_name=concept_name)
+        db.session.add(concept)
+        db.session.flush()
+        concept_id = concept.concept_id
+        self.assertIs(concept, Concept.reference(concept_id, concept_name))
+        db.session.expunge_all()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        sa_event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            concept = Concept.reference(concept_id, concept_name)
+        finally:
+            sa_event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual([], statements)
+        self.assertTrue(sa.inspect(concept).persistent)
+        self.assertIs(concept, Concept.reference(concept_id, concept_name))
+
+        relationship = Relationship(subject=concept,
+                                    object=Concept(concept_name='plant_{0}'.format(concept_id)),
+                                    relationship_types=[RelationshipType.select_by_name('is')])
+        db.session.add(relationship)
+        self.reset_session()
+        self.assertEqual(concept_id, Relationship.select_by_values(
+                relationship_type_name='is', subject_name=concept_name)[0].subject_id)
+
 
 class RelationshipTypeTests(FactModelTestCase):
     """Verify RelationshipType ORM.
@@ -85,7 +130,7 @@ class RelationshipTypeTests(FactModelTestCase):
         """Verify creation with relationship_type_name and relationship_type_id.
         """
         rel_type_name = 'eats_{0}'.format(uuid.uuid4())
-        rel_type_id = uuid.uuid4()
+        rel_type_id = new_key()
         rel_type = RelationshipType(relationship_type_name=rel_type_name, 
                                         relationship_type_id=rel_type_id)
         db.session.add(rel_type)
@@ -109,7 +154,75 @@ class RelationshipTypeTests(FactModelTestCase):
             relationship_type_name=rel_type_name).first()
         self.assertIsNotNone(retrieved_rel_type, "Expected to find persisted RelationshipType")
         self.assertEqual(rel_type_name, retrieved_rel_type.relationship_type_name)
-        self.assertTrue(isinstance(retrieved_rel_type.relationship_type_id, uuid.UUID))
+        self.assertTrue(isinstance(retrieved_rel_type.relationship_type_id, (int, long)))
+
+    def test_relationship_type__default_id__new_types(self):
+        """Verify that each new RelationshipType that is not a synonym gets a new id.
+        """
+        rel_types = [RelationshipType(relationship_type_name='eats_{0}'.format(uuid.uuid4()))
+                     for i in range(2)]
+        for rel_type in rel_types:
+            db.session.add(rel_type)
+            db.session.flush()
+        self.assertTrue(rel_types[1].relationship_type_id > rel_types[0].relationship_type_id)
+
+    def test_relationship_type__default_id__sequence(self):
+        """Verify that ids of new RelationshipTypes are allocated from RelationshipTypeId.
+        """
+        rel_type = RelationshipType(relationship_type_name='eats_{0}'.format(uuid.uuid4()))
+        db.session.add(rel_type)
+        db.session.flush()
+        self.assertIsNotNone(db.session.query(RelationshipTypeId).get(
+                rel_type.relationship_type_id))
+        self.assertEqual([], db.session.query(RelationshipType).filter(
+                RelationshipType.relationship_type_id==rel_type.relationship_type_id).filter(
+                RelationshipType.relationship_type_name!=rel_type.relationship_type_name).all())
+
+    def test_id_for_name(self):
+        """Verify that synonyms resolve to one id and that new types are found.
+        """
+        is_type_id = RelationshipType.id_for_name('is')
+        self.assertIsNotNone(is_type_id)
+        for synonym in ('are', 'is a', 'isa'):
+            self.assertEqual(is_type_id, RelationshipType.id_for_name(synonym))
+        self.assertIsNone(RelationshipType.id_for_name('eats_123'))
+
+        rel_type_name = 'eats_{0}'.format(uuid.uuid4())
+        rel_type_id = new_key()
+        db.session.add(RelationshipType(relationship_type_name=rel_type_name,
+                                        relationship_type_id=rel_type_id))
+        db.session.flush()
+        self.assertEqual(rel_type_id, RelationshipType.id_for_name(rel_type_name))
+
+    def test_id_for_name__committed(self):
+        """Verify that committed relationship types are added to ids by name.
+        """
+        RelationshipType.id_for_name('is')
+        rel_type_name = 'eats_{0}'.format(uuid.uuid4())
+        with patch.object(RelationshipType, '_ids_by_name', {}):
+            RelationshipType._refresh_ids_by_name(fact_model.CommittedChanges(
+                    [], [], [(rel_type_name, 99)], [], [], []))
+            with patch.object(db.session, 'query') as query:
+                self.assertEqual(99, RelationshipType.id_for_name(rel_type_name))
+                self.assertEqual(0, query.call_count)
+
+    def test_reset_ids_by_name(self):
+        """Verify that ids by name are reloaded after reset.
+        """
+        RelationshipType.id_for_name('is')
+        RelationshipType.reset_ids_by_name()
+        self.assertIsNone(RelationshipType._ids_by_name)
+        self.assertNotIn(RelationshipType._refresh_ids_by_name, fact_model._commit_listeners)
+        self.assertIsNotNone(RelationshipType.id_for_name('is'))
+        self.assertIn('is', RelationshipType._ids_by_name)
+
+    def test_refresh_ids_by_name__reset(self):
+        """Verify that committed changes are ignored while ids by name are not loaded.
+        """
+        RelationshipType.reset_ids_by_name()
+        RelationshipType._refresh_ids_by_name(fact_model.CommittedChanges(
+                [], [], [('eats_123', new_key())], [], [], []))
+        self.assertIsNone(RelationshipType._ids_by_name)
 
     def test_select_by_name(self):
         """Verify select_by_name method.
@@ -134,6 +247,18 @@ class RelationshipTypeTests(FactModelTestCase):
         retrieved_rel_type = RelationshipType.select_by_name('eats_123')
         self.assertIsNone(retrieved_rel_type, "Expected to find no persisted RelationshipType")
 
+    def test_select_name_id_pairs(self):
+        """Verify select_name_id_pairs method.
+        """
+        rel_type_name = 'eats_{0}'.format(uuid.uuid4())
+        rel_type_id = new_key()
+        db.session.add(RelationshipType(relationship_type_name=rel_type_name,
+                                        relationship_type_id=rel_type_id))
+        self.reset_session()
+
+        pairs = RelationshipType.select_name_id_pairs()
+        self.assertTrue((rel_type_name, rel_type_id) in pairs)
+
 
 class RelationshipTests(FactModelTestCase):
     """Verify Relationship ORM.
@@ -143,7 +268,7 @@ class RelationshipTests(FactModelTestCase):
         """
         concept = db.session.query(Concept).filter_by(concept_name=concept_name).first()
         if not concept:
-            concept = Concept(concept_name=concept_name, concept_id=uuid.uuid4())
+            concept = Concept(concept_name=concept_name, concept_id=new_key())
         return concept
         
     def _get_relationship_type(self, relationship_type_name):
@@ -152,7 +277,7 @@ class RelationshipTests(FactModelTestCase):
         rel_type = db.session.query(RelationshipType).filter_by(
             relationship_type_name=relationship_type_name).first()
         if not rel_type:
-            rel_type = RelationshipType(relationship_type_id=uuid.uuid4(),
+            rel_type = RelationshipType(relationship_type_id=new_key(),
                                         relationship_type_name=relationship_type_name)
         return rel_type
 
@@ -160,9 +285,9 @@ class RelationshipTests(FactModelTestCase):
         """Verify creation with all non-nullable data.
         """
         rel_id = uuid.uuid4()
-        rel_type_id = uuid.uuid4()
-        subject_id = uuid.uuid4()
-        object_id = uuid.uuid4()
+        rel_type_id = new_key()
+        subject_id = new_key()
+        object_id = new_key()
         relationship = Relationship(relationship_id=rel_id,
                                     relationship_type_id=rel_type_id,
                                     subject_id=subject_id,
@@ -186,9 +311,9 @@ class RelationshipTests(FactModelTestCase):
         count = 10
         fact_id = uuid.uuid4()
         relationship = Relationship(relationship_id=rel_id,
-                                    relationship_type_id=uuid.uuid4(),
-                                    subject_id=uuid.uuid4(),
-                                    object_id=uuid.uuid4(),
+                                    relationship_type_id=new_key(),
+                                    subject_id=new_key(),
+                                    object_id=new_key(),
                                     count=count,
                                     fact_id=fact_id)
         db.session.add(relationship)
@@ -203,9 +328,9 @@ class RelationshipTests(FactModelTestCase):
     def test_relationship__default_id(self):
         """Verify that relationship_id is assigned when Relationship is persisted.
         """
-        rel_type_id = uuid.uuid4()
-        subject_id = uuid.uuid4()
-        object_id = uuid.uuid4()
+        rel_type_id = new_key()
+        subject_id = new_key()
+        object_id = new_key()
         relationship = Relationship(relationship_type_id=rel_type_id,
                                     subject_id=subject_id,
                                     object_id=object_id)
@@ -224,20 +349,20 @@ class RelationshipTests(FactModelTestCase):
     def test_relationship__select_by_fact_id(self):
         """Verify select_by_fact_id method finds expected Relationships
         """
-        rel_type_ids = [uuid.uuid4(), uuid.uuid4()]
+        rel_type_ids = [new_key(), new_key()]
         fact_id = uuid.uuid4()
 
         # Add two Relationships with fact_id
         for rel_type_id in rel_type_ids:
             db.session.add(Relationship(relationship_type_id=rel_type_id,
-                                        subject_id=uuid.uuid4(),
-                                        object_id=uuid.uuid4(),
+                                        subject_id=new_key(),
+                                        object_id=new_key(),
                                         fact_id=fact_id))
             
         # Add another Relationship with a different fact_id
-        db.session.add(Relationship(relationship_type_id=uuid.uuid4(),
-                                    subject_id=uuid.uuid4(),
-                                    object_id=uuid.uuid4(),
+        db.session.add(Relationship(relationship_type_id=new_key(),
+                                    subject_id=new_key(),
+                                    object_id=new_key(),
                                     fact_id=uuid.uuid4()))
         self.reset_session()
 
@@ -255,14 +380,14 @@ class RelationshipTests(FactModelTestCase):
     def test_relationship__select_by_foreign_keys(self):
         """Verify select_by_foreign_keys method finds expected Relationship.
         """
-        rel_type_id = uuid.uuid4()
-        subject_id = uuid.uuid4()
-        object_id = uuid.uuid4()
+        rel_type_id = new_key()
+        subject_id = new_key()
+        object_id = new_key()
 
         fk_sets = [(rel_type_id, subject_id, object_id),
-                   (uuid.uuid4(), subject_id, object_id),
-                   (rel_type_id, uuid.uuid4(), object_id),
-                   (rel_type_id, subject_id, uuid.uuid4())]
+                   (new_key(), subject_id, object_id),
+                   (rel_type_id, new_key(), object_id),
+                   (rel_type_id, subject_id, new_key())]
 
         for (rt_id, s_id, o_id) in fk_sets:
             db.session.add(Relationship(relationship_type_id=rt_id,
@@ -281,11 +406,33 @@ class RelationshipTests(FactModelTestCase):
     def test_relationship__select_by_foreign_keys__no_match(self):
         """Verify select_by_foreign_keys method returns None if there is no match.
         """
-        retrieved_rel = Relationship.select_by_foreign_keys(subject_id=uuid.uuid4(),
-                                                            object_id=uuid.uuid4(),
-                                                            relationship_type_id=uuid.uuid4())
+        retrieved_rel = Relationship.select_by_foreign_keys(subject_id=new_key(),
+                                                            object_id=new_key(),
+                                                            relationship_type_id=new_key())
         self.assertIsNone(retrieved_rel, "Expected to not find persisted Relationship")
 
+    def test_relationship__select_by_subject_id(self):
+        """Verify select_by_subject_id method finds relationships of subject and type.
+        """
+        rel_type_id = new_key()
+        subject_id = new_key()
+        object_ids = [new_key(), new_key()]
+        for object_id in object_ids:
+            db.session.add(Relationship(relationship_type_id=rel_type_id,
+                                        subject_id=subject_id,
+                                        object_id=object_id))
+        db.session.add(Relationship(relationship_type_id=new_key(),
+                                    subject_id=subject_id,
+                                    object_id=new_key()))
+        db.session.add(Relationship(relationship_type_id=rel_type_id,
+                                    subject_id=new_key(),
+                                    object_id=object_ids[0]))
+        self.reset_session()
+
+        retrieved_rels = Relationship.select_by_subject_id(subject_id, rel_type_id)
+        self.assertEqual(sorted(object_ids), sorted(rel.object_id for rel in retrieved_rels))
+        self.assertEqual([], Relationship.select_by_subject_id(new_key(), rel_type_id))
+
     def _setup_relationships(self):
         # Concepts and relationships
         high_heel = self._get_concept('high_heel')
@@ -395,6 +542,27 @@ class RelationshipTests(FactModelTestCase):
                                                 object_name='trainer')
         self.assertEqual(0, len(matches))
 
+    def test_relationship__select_records(self):
+        """Verify select_records method.
+        """
+        self._setup_relationships()
+        records = Relationship.select_records()
+        kicks = [r for r in records if r.subject_name == 'high_heel' and r.count == 3]
+        self.assertEqual(1, len(kicks))
+        self.assertEqual('trainer', kicks[0].object_name)
+        self.assertEqual(self._get_relationship_type('kicks').relationship_type_id,
+                         kicks[0].relationship_type_id)
+        self.assertTrue(isinstance(kicks[0].relationship_id, uuid.UUID))
+
+    def test_relationship__select_records__relationship_type(self):
+        """Verify select_records method when relationship_type_id is specified.
+        """
+        self._setup_relationships()
+        kicks_type_id = self._get_relationship_type('kicks').relationship_type_id
+        records = Relationship.select_records(relationship_type_id=kicks_type_id)
+        self.assertTrue(records)
+        self.assertEqual(set([kicks_type_id]), set([r.relationship_type_id for r in records]))
+
     def test_relationship__subject_relation(self):
         """Verify subject relation on Relationship.
         """
@@ -402,8 +570,8 @@ class RelationshipTests(FactModelTestCase):
         subject_concept = self._get_concept('flat')
         relationship = Relationship(relationship_id=rel_id,
                                     subject=subject_concept,
-                                    object_id=uuid.uuid4(),
-                                    relationship_type_id=uuid.uuid4())
+                                    object_id=new_key(),
+                                    relationship_type_id=new_key())
         db.session.add(relationship)
         self.reset_session()
 
@@ -426,9 +594,9 @@ class RelationshipTests(FactModelTestCase):
         rel_id = uuid.uuid4()
         object_concept = self._get_concept('flat')
         relationship = Relationship(relationship_id=rel_id,
-                                    subject_id=uuid.uuid4(),
+                                    subject_id=new_key(),
                                     object=object_concept,
-                                    relationship_type_id=uuid.uuid4())
+                                    relationship_type_id=new_key())
         db.session.add(relationship)
         self.reset_session()
 
@@ -449,11 +617,11 @@ class RelationshipTests(FactModelTestCase):
         """Verify relationship_types relation and relationship_type_names association proxy.
         """
         rel_id = uuid.uuid4()
-        rel_type = RelationshipType(relationship_type_id=uuid.uuid4(),
+        rel_type = RelationshipType(relationship_type_id=new_key(),
                                     relationship_type_name='is_{0}'.format(uuid.uuid4()))
         relationship = Relationship(relationship_id=rel_id,
-                                    subject_id=uuid.uuid4(),
-                                    object_id=uuid.uuid4(),
+                                    subject_id=new_key(),
+                                    object_id=new_key(),
                                     relationship_types=[rel_type])
         db.session.add(relationship)
         self.reset_session()
@@ -480,7 +648,7 @@ class RelationshipTests(FactModelTestCase):
         """Verify relationship_types and relationship_type_names with multiple matches.
         """
         rel_id = uuid.uuid4()
-        rel_type_id = uuid.uuid4()
+        rel_type_id = new_key()
         rel_type_names = ['{0}_{1}'.format(n, uuid.uuid4()) 
                           for n in ['has', 'has a', 'hasa', 'have']]
         for name in rel_type_names:
@@ -489,8 +657,8 @@ class RelationshipTests(FactModelTestCase):
             db.session.add(rel_type)
 
         relationship = Relationship(relationship_id=rel_id,
-                                    subject_id=uuid.uuid4(),
-                                    object_id=uuid.uuid4(),
+                                    subject_id=new_key(),
+                                    object_id=new_key(),
                                     relationship_type_id=rel_type_id)
         db.session.add(relationship)
         self.reset_session()
@@ -511,7 +679,7 @@ class RelationshipTests(FactModelTestCase):
         """Verify that new Relationship and RelationshipType does not delete existing match.
         """
         rel_id = uuid.uuid4()
-        rel_type_id = uuid.uuid4()
+        rel_type_id = new_key()
         rel_type_names = ['{0}_{1}'.format(n, uuid.uuid4()) for n in ['is', 'isa']]
         relationship_types = [
             RelationshipType(relationship_type_id=rel_type_id,
@@ -527,8 +695,8 @@ class RelationshipTests(FactModelTestCase):
 
         # New Relationship with new RelationshipType with same relationship_type_id.
         relationship = Relationship(relationship_id=rel_id,
-                                    subject_id=uuid.uuid4(),
-                                    object_id=uuid.uuid4(),
+                                    subject_id=new_key(),
+                                    object_id=new_key(),
                                     relationship_types=[relationship_types[1]])
         db.session.add(relationship)
         self.reset_session()
@@ -550,7 +718,7 @@ class RelationshipTests(FactModelTestCase):
         rel_id = uuid.uuid4()
         subject_concept = self._get_concept('flat')
         object_concept =  self._get_concept('shoe')
-        rel_type = RelationshipType(relationship_type_id=uuid.uuid4(),
+        rel_type = RelationshipType(relationship_type_id=new_key(),
                                     relationship_type_name='is_{0}'.format(uuid.uuid4()))
         relationship = Relationship(relationship_id=rel_id,
                                     subject=subject_concept,
@@ -633,6 +801,245 @@ class RelationshipTests(FactModelTestCase):
                          set([r.object.concept_id for r in high_heel.concept_type_relationships]))
 
 
+class ConceptAncestorTests(FactModelTestCase):
+    """Verify maintenance of concept_ancestors on flush of 'is' relationships.
+    """
+    def setUp(self):
+        self.suffix = uuid.uuid4()
+        self.is_type = db.session.query(RelationshipType).filter_by(
+            relationship_type_name='is').first()
+        if not self.is_type:
+            self.is_type = RelationshipType(relationship_type_id=new_key(),
+                                            relationship_type_name='is')
+
+    def concept(self, name):
+        """Return Concept for name, unique to test unless it is a meta type.
+        """
+        if name not in ConceptAncestor.meta_types:
+            name = '{0}_{1}'.format(name, self.suffix)
+        concept = db.session.query(Concept).filter_by(concept_name=name).first()
+        return concept or Concept(concept_name=name)
+
+    def add_is(self, subject_name, object_name):
+        relationship = Relationship(subject=self.concept(subject_name),
+                                    object=self.concept(object_name),
+                                    relationship_types=[self.is_type])
+        db.session.add(relationship)
+        db.session.flush()
+        return relationship
+
+    def ancestors(self, name):
+        """Select ancestors of concept as dict of ancestor name to depth.
+        """
+        ancestor = sa.orm.aliased(Concept)
+        descendant = sa.orm.aliased(Concept)
+        query = db.session.query(ancestor.concept_name, ConceptAncestor.depth).\
+            join(ConceptAncestor, ConceptAncestor.ancestor_id==ancestor.concept_id).\
+            join(descendant, ConceptAncestor.descendant_id==descendant.concept_id).\
+            filter(descendant.concept_name==self.concept(name).concept_name)
+        return dict((name.replace('_{0}'.format(self.suffix), ''), depth)
+                    for name, depth in query)
+
+    def test_refresh(self):
+        """Verify that ancestors are added transitively with shortest depth.
+        """
+        self.add_is('otter', 'mammal')
+        self.add_is('mammal', 'vertebrate')
+        self.add_is('vertebrate', 'animal')
+        self.add_is('otter', 'animal')
+
+        self.assertEqual({'mammal': 1, 'vertebrate': 2, 'animal': 1}, self.ancestors('otter'))
+        self.assertEqual({'vertebrate': 1, 'animal': 2}, self.ancestors('mammal'))
+        self.assertEqual({}, self.ancestors('animal'))
+
+    def test_refresh__meta_type(self):
+        """Verify that meta types are not inherited.
+        """
+        self.add_is('mammal', 'species')
+        self.add_is('otter', 'mammal')
+        self.add_is('mammal', 'animal')
+
+        self.assertEqual({'species': 1, 'animal': 1}, self.ancestors('mammal'))
+        self.assertEqual({'mammal': 1, 'animal': 2}, self.ancestors('otter'))
+
+    def test_refresh__delete(self):
+        """Verify that ancestors are recomputed when 'is' relationship is deleted.
+        """
+        self.add_is('otter', 'mammal')
+        relationship = self.add_is('mammal', 'vertebrate')
+        self.add_is('vertebrate', 'animal')
+        self.add_is('mammal', 'animal')
+
+        db.session.delete(relationship)
+        db.session.flush()
+        self.assertEqual({'mammal': 1, 'animal': 2}, self.ancestors('otter'))
+        self.assertEqual({'animal': 1}, self.ancestors('mammal'))
+
+    def test_refresh__loop(self):
+        """Verify that loops of 'is' relationships do not relate concepts to themselves.
+        """
+        self.add_is('otter', 'mammal')
+        self.add_is('mammal', 'otter')
+
+        self.assertEqual({'mammal': 1}, self.ancestors('otter'))
+        self.assertEqual({'otter': 1}, self.ancestors('mammal'))
+
+    def test_refresh__savepoint(self):
+        """Verify that rolling back savepoint rolls back its ancestors.
+        """
+        self.add_is('otter', 'mammal')
+        savepoint = db.session.begin_nested()
+        self.add_is('mammal', 'animal')
+        savepoint.rollback()
+
+        self.assertEqual({'mammal': 1}, self.ancestors('otter'))
+
+    def test_rebuild(self):
+        """Verify that rebuild recomputes ancestors of all concepts from 'is' relationships.
+        """
+        self.add_is('mammal', 'species')
+        self.add_is('otter', 'mammal')
+        self.add_is('mammal', 'animal')
+        db.session.execute(ConceptAncestor.__table__.delete())
+
+        ConceptAncestor.rebuild(db.session.connection(), self.is_type.relationship_type_id)
+        self.assertEqual({'species': 1, 'animal': 1}, self.ancestors('mammal'))
+        self.assertEqual({'mammal': 1, 'animal': 2}, self.ancestors('otter'))
+
+    def test_is_ancestor(self):
+        """Verify is_ancestor method.
+        """
+        self.add_is('otter', 'mammal')
+        self.add_is('mammal', 'animal')
+        otter, mammal, animal = [self.concept(name) for name in ('otter', 'mammal', 'animal')]
+
+        self.assertTrue(ConceptAncestor.is_ancestor(animal.concept_id, otter.concept_id))
+        self.assertTrue(ConceptAncestor.is_ancestor(mammal.concept_id, otter.concept_id))
+        self.assertFalse(ConceptAncestor.is_ancestor(otter.concept_id, animal.concept_id))
+        self.assertFalse(ConceptAncestor.is_ancestor(None, otter.concept_id))
+
+    def test_select_descendant_ids(self):
+        """Verify select_descendant_ids method.
+        """
+        self.add_is('otter', 'mammal')
+        self.add_is('mammal', 'animal')
+        self.add_is('salmon', 'fish')
+        otter, mammal, animal, salmon = [self.concept(name) for name in
+                                         ('otter', 'mammal', 'animal', 'salmon')]
+
+        self.assertEqual(set([otter.concept_id, mammal.concept_id]),
+                         ConceptAncestor.select_descendant_ids(
+                             animal.concept_id,
+                             [otter.concept_id, mammal.concept_id, salmon.concept_id]))
+        self.assertEqual(set(), ConceptAncestor.select_descendant_ids(otter.concept_id,
+                                                                      [animal.concept_id]))
+        self.assertEqual(set(), ConceptAncestor.select_descendant_ids(animal.concept_id, []))
+
+
+class CommitListenerTests(FactModelTestCase):
+    """Verify notification of committed changes.
+    """
+    def setUp(self):
+        self.listener = Mock(name='listener')
+        fact_model.add_commit_listener(self.listener)
+
+    def tearDown(self):
+        fact_model.remove_commit_listener(self.listener)
+        super(CommitListenerTests, self).tearDown()
+
+    def test_flushed_changes(self):
+        """Verify that flushed Relationships and RelationshipTypes are recorded.
+        """
+        rel_id = uuid.uuid4()
+        rel_type = RelationshipType(relationship_type_id=new_key(),
+                                    relationship_type_name='is_{0}'.format(uuid.uuid4()))
+        relationship = Relationship(relationship_id=rel_id,
+                                    subject=Concept(concept_name='flat_{0}'.format(rel_id)),
+                                    object=Concept(concept_name='shoe_{0}'.format(rel_id)),
+                                    relationship_types=[rel_type],
+                                    count=2)
+        db.session.add(relationship)
+        db.session.flush()
+
+        changes = db.session.info['committed_changes']
+        self.assertEqual([(rel_type.relationship_type_name, rel_type.relationship_type_id)],
+                         changes.saved_relationship_types)
+        self.assertEqual(1, len(changes.saved_relationships))
+        record = changes.saved_relationships[0]
+        self.assertEqual(rel_id, record.relationship_id)
+        self.assertEqual(rel_type.relationship_type_id, record.relationship_type_id)
+        self.assertEqual('flat_{0}'.format(rel_id), record.subject_name)
+        self.assertEqual('shoe_{0}'.format(rel_id), record.object_name)
+        self.assertEqual(2, record.count)
+        self.assertEqual([], changes.deleted_relationships)
+        self.assertEqual(set([(relationship.subject.concept_name, relationship.subject_id),
+                              (relationship.object.concept_name, relationship.object_id)]),
+                         set(changes.saved_concepts))
+
+        db.session.delete(relationship)
+        db.session.flush()
+        self.assertEqual([record], changes.deleted_relationships)
+
+    def test_flushed_changes__rollback(self):
+        """Verify that recorded changes are discarded on rollback without notification.
+        """
+        db.session.add(RelationshipType(relationship_type_id=new_key(),
+                                        relationship_type_name='is_{0}'.format(uuid.uuid4())))
+        db.session.flush()
+        self.assertTrue('committed_changes' in db.session.info)
+
+        db.session.rollback()
+        self.assertFalse('committed_changes' in db.session.info)
+        self.assertEqual(0, self.listener.call_count)
+
+    def test_flushed_changes__savepoint(self):
+        """Verify that savepoints do not notify and roll back only their own changes.
+        """
+        names = ['flower_{0}'.format(uuid.uuid4()) for i in range(2)]
+        savepoint = db.session.begin_nested()
+        db.session.add(Concept(concept_name=names[0]))
+        savepoint.commit()
+        savepoint = db.session.begin_nested()
+        db.session.add(Concept(concept_name=names[1]))
+        db.session.flush()
+        savepoint.rollback()
+
+        self.assertEqual(0, self.listener.call_count)
+        changes = db.session.info['committed_changes']
+        self.assertEqual([names[0]], [name for name, concept_id in changes.saved_concepts])
+
+    def test_notify_commit_listeners(self):
+        """Verify that listeners are called with recorded changes after commit.
+        """
+        changes = fact_model.CommittedChanges([Mock(name='saved')], [], [], [], [], [])
+        failing_listener = Mock(name='failing_listener', side_effect=ValueError('uh oh'))
+        fact_model.add_commit_listener(failing_listener)
+        try:
+            mock_session = Mock(name='session', info={'committed_changes': changes},
+                                transaction=None)
+            fact_model._notify_commit_listeners(mock_session)
+        finally:
+            fact_model.remove_commit_listener(failing_listener)
+
+        self.listener.assert_called_once_with(changes)
+        failing_listener.assert_called_once_with(changes)
+        self.assertEqual({}, mock_session.info)
+
+
+class KbGenerationTests(FactModelTestCase):
+    """Verify KbGeneration ORM.
+    """
+    def test_increment(self):
+        """Verify that generation is incremented in current transaction only.
+        """
+        generation = KbGeneration.select_generation()
+        self.assertEqual(generation + 1, KbGeneration.increment())
+        self.assertEqual(generation + 2, KbGeneration.increment())
+        self.assertEqual(generation + 2, KbGeneration.select_generation())
+        db.session.rollback()
+        self.assertEqual(generation, KbGeneration.select_generation())
+
+
 class IncomingFactTests(FactModelTestCase):
     """Verify IncomingFact ORM.
     """
@@ -753,3 +1160,57 @@ class IncomingFactTests(FactModelTestCase):
 
 
     
+
+
+class UUIDTypeTests(unittest.TestCase):
+    """Verify conversion of UUIDs by UUIDType in both storage modes.
+    """
+    def setUp(self):
+        fact_model.UUIDType._interned_uuids.clear()
+
+    def test_char_storage(self):
+        """Verify that UUIDs are stored as strings and loaded as UUIDs.
+        """
+        uuid_type = fact_model.UUIDType(storage='char')
+        value = uuid.uuid4()
+        self.assertEqual(str(value), uuid_type.process_bind_param(value, None))
+        self.assertEqual(str(value), uuid_type.process_bind_param(str(value), None))
+        loaded = uuid_type.process_result_value(str(value), None)
+        self.assertTrue(isinstance(loaded, uuid.UUID))
+        self.assertEqual(value, loaded)
+        self.assertIsNone(uuid_type.process_result_value(None, None))
+
+    def test_binary_storage(self):
+        """Verify that UUIDs and UUID strings are stored as bytes and loaded as UUIDs.
+        """
+        uuid_type = fact_model.UUIDType(storage='binary')
+        value = uuid.uuid4()
+        self.assertEqual(value.bytes, uuid_type.process_bind_param(value, None))
+        self.assertEqual(value.bytes, uuid_type.process_bind_param(str(value), None))
+        self.assertEqual(value.bytes, uuid_type.process_bind_param(value.hex, None))
+        loaded = uuid_type.process_result_value(value.bytes, None)
+        self.assertEqual(value, loaded)
+        self.assertEqual(str(value), str(loaded))
+        self.assertEqual(hash(value), hash(loaded))
+        self.assertIsNone(uuid_type.process_bind_param(None, None))
+
+    def test_binary_storage__invalid(self):
+        """Verify ValueError for strings that are not UUIDs.
+        """
+        uuid_type = fact_model.UUIDType(storage='binary')
+        with self.assertRaises(ValueError):
+            uuid_type.process_bind_param('not-a-uuid', None)
+        with self.assertRaises(ValueError):
+            fact_model.UUIDType(storage='varchar')
+
+    def test_interned(self):
+        """Verify that loading same value again returns same UUID until cache is full.
+        """
+        uuid_type = fact_model.UUIDType(storage='binary')
+        value = uuid.uuid4()
+        loaded = uuid_type.process_result_value(value.bytes, None)
+        self.assertTrue(loaded is uuid_type.process_result_value(value.bytes, None))
+
+        with patch.object(fact_model.Config, 'uuid_intern_max_entries', 1):
+            other = uuid_type.process_result_value(uuid.uuid4().bytes, None)
+        self.assertEqual([other], fact_model.UUIDType._interned_uuids.values())
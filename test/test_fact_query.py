@@ -11,8 +11,16 @@ import unittest
 import uuid
 
 from mock import call, Mock, patch
-
-from animalia.fact_query import FactQuery
+import numpy as np
+import sqlalchemy.event as sa_event
+
+from animalia.attribute_matrix import AttributeMatrix
+from animalia.bitmap import Bitmap
+from animalia.concept_hierarchy import ConceptHierarchy
+from animalia.config import Config
+from animalia.fact_graph import FactGraph
+from animalia.fact_query import FactQuery, QueryMemo
+from animalia.query_compiler import QueryCompiler
 import animalia.fact_model as fact_model
 
 
@@ -51,6 +59,49 @@ class FactQueryTests(unittest.TestCase):
         # Verify mocks
         self.assertEqual(1, find_fn.call_count)
 
+    @patch.object(fact_model.Relationship, 'select_by_values')
+    @patch.object(ConceptHierarchy, 'get_hierarchy')
+    @patch.object(FactQuery, '_find_answer_function')
+    def test_find_answer__memo(self, find_fn, get_hierarchy, select_by_values):
+        """Verify that repeated lookups are memoized while answering query only.
+        """
+        get_hierarchy.return_value = mock_hierarchy = Mock(name='hierarchy')
+        mock_hierarchy.is_a.return_value = True
+        select_by_values.return_value = ['one']
+
+        def answer():
+            matches = FactQuery._select_matching_relationships('eats', subject_name='otter')
+            matches.append('two')
+            return (FactQuery._concept_is_species('birds'),
+                    FactQuery._concept_is_species('birds'),
+                    FactQuery._select_matching_relationships('eats', subject_name='otter'))
+        find_fn.return_value = answer
+        fact_query = FactQuery(parsed_query=Mock(name='parsed_query'))
+
+        self.assertEqual((True, True, ['one']), fact_query.find_answer())
+        self.assertEqual(1, mock_hierarchy.is_a.call_count)
+        self.assertEqual(1, select_by_values.call_count)
+        self.assertEqual(2, fact_query.saved_lookups)
+
+        # Memo is discarded when query is answered
+        FactQuery._concept_is_species('birds')
+        self.assertEqual(2, mock_hierarchy.is_a.call_count)
+        fact_query.find_answer()
+        self.assertEqual(2, select_by_values.call_count)
+
+    @patch.object(FactQuery, '_find_answer_function')
+    def test_find_answer__memo_discarded_on_error(self, find_fn):
+        """Verify that memo is discarded when answer function fails.
+        """
+        find_fn.return_value = Mock(name='answer_fn', side_effect=ValueError('fail'))
+        fact_query = FactQuery(parsed_query=Mock(name='parsed_query'))
+        try:
+            fact_query.find_answer()
+            self.fail("Expected ValueError")
+        except ValueError:
+            pass
+        self.assertIsNone(FactQuery._memo.current)
+
     @patch.object(FactQuery, '_find_answer_function')
     def test_find_answer__no_answer_fn(self, find_fn):
         """Verify ValueError if no answer function exists.
@@ -118,23 +169,26 @@ class FactQueryTests(unittest.TestCase):
         fn = fact_query._find_answer_function()
         self.assertEqual(fn, fact_query._animal_attribute_query)
 
-    @patch.object(FactQuery, '_select_matching_relationships')
-    def test_concept_is_species(self, select_relationships):
+    @patch.object(ConceptHierarchy, 'get_hierarchy')
+    def test_concept_is_species(self, get_hierarchy):
         """Verify calls made by _concept_is_species.
         """
-        select_relationships.return_value = mock_matches = Mock(name='matches')
+        get_hierarchy.return_value = mock_hierarchy = Mock(name='hierarchy')
+        mock_hierarchy.is_a.return_value = True
         result = FactQuery._concept_is_species('birds')
         self.assertTrue(result)
-        select_relationships.assert_called_once_with(
-            'is', subject_name='birds', object_name='species')
+        mock_hierarchy.is_a.assert_called_once_with('birds', 'species')
 
-    @patch.object(FactQuery, '_select_matching_relationships')
-    def test_concept_is_species__fail(self, select_relationships):
-        """Verify _concept_is_species when no matches are found
+    @patch.object(ConceptHierarchy, 'get_hierarchy')
+    def test_concept_is_species__fail(self, get_hierarchy):
+        """Verify _concept_is_species when concept is not a species.
         """
-        select_relationships.return_value = []
-        result = FactQuery._concept_is_species('birds')
-        self.assertFalse(result)
+        hierarchy = ConceptHierarchy()
+        hierarchy.add_ancestor('birds', 'species')
+        hierarchy.add_ancestor('herons', 'birds')
+        get_hierarchy.return_value = hierarchy
+        self.assertTrue(FactQuery._concept_is_species('birds'))
+        self.assertFalse(FactQuery._concept_is_species('herons'))
 
     @patch.object(FactQuery, '_select_matching_relationships')
     def test_select_by_concept_type(self, select_relationships):
@@ -157,6 +211,22 @@ class FactQueryTests(unittest.TestCase):
         self.assertEqual([], result)
 
 
+class QueryMemoTests(unittest.TestCase):
+    """Verify QueryMemo.
+    """
+    def test_get(self):
+        """Verify that lookup is made once per key and saved lookups are counted.
+        """
+        memo = QueryMemo()
+        lookup = Mock(name='lookup', return_value=None)
+        self.assertIsNone(memo.get(('a',), lookup))
+        self.assertIsNone(memo.get(('a',), lookup))
+        memo.get(('b',), lookup)
+        self.assertEqual(2, lookup.call_count)
+        self.assertEqual(3, memo.lookups)
+        self.assertEqual(1, memo.saved)
+
+
 class SelectMatchingRelationshipTests(unittest.TestCase):
 
     @patch.object(fact_model.Relationship, 'select_by_values')
@@ -185,9 +255,40 @@ class SelectMatchingRelationshipTests(unittest.TestCase):
                                                  relationship_number=test_rel_number)
 
 
+    @patch.object(Config, 'fact_query_backend', 'graph')
+    @patch.object(FactGraph, 'get_graph')
+    @patch.object(fact_model.Relationship, 'select_by_values')
+    def test_select_matching_relationships__graph(self, select_by_values, get_graph):
+        """Verify that relationships are selected from FactGraph when it is configured.
+        """
+        get_graph.return_value = mock_graph = Mock(name='graph')
+        mock_graph.select_by_values.return_value = ['one']
+
+        matches = FactQuery._select_matching_relationships('eats', subject_name='otter')
+        self.assertEqual(['one'], matches)
+
+        mock_graph.select_by_values.assert_called_once_with(relationship_type_name='eats',
+                                                            subject_name='otter',
+                                                            object_name=None,
+                                                            relationship_number=None)
+        self.assertEqual(0, select_by_values.call_count)
+
+
 class FilterRelationshipsByConceptTypeTests(unittest.TestCase):
     """Verify methods having to do with filtering subjects and objects by species.
     """
+    def setUp(self):
+        hierarchy = ConceptHierarchy()
+        for concept_name, concept_types in (('mock_subject_0', ['birds', 'snakes']),
+                                            ('mock_subject_1', ['snakes', 'turtles']),
+                                            ('mock_subject_2', ['snakes', 'birds'])):
+            for concept_type in concept_types:
+                hierarchy.add_ancestor(concept_name, concept_type)
+        patcher = patch.object(ConceptHierarchy, 'get_hierarchy', return_value=hierarchy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.hierarchy = hierarchy
+
     def test_filter_relationships_by_concept_type__subject(self):
         """Verify calls made by _filter_relationships_by_concept_type for 'subject' attr.
         """
@@ -246,6 +347,87 @@ class FilterRelationshipsByConceptTypeTests(unittest.TestCase):
         # Verify results
         self.assertEqual([mock_match_0, mock_match_2], filtered_matches)
 
+    def test_filter_relationships_by_concept_type__transitive(self):
+        """Verify that concept types are matched on all ancestors of concepts.
+        """
+        for concept_name, concept_type in (('snakes', 'reptiles'), ('turtles', 'reptiles'),
+                                           ('reptiles', 'species'),
+                                           ('mock_subject_0', 'reptiles'),
+                                           ('mock_subject_1', 'reptiles'),
+                                           ('mock_subject_2', 'reptiles')):
+            self.hierarchy.add_ancestor(concept_name, concept_type)
+        mock_matches = [Mock(name='mock_match_{0}'.format(i),
+                             subject=Mock(concept_name='mock_subject_{0}'.format(i)))
+                        for i in range(3)]
+        mock_matches.append(Mock(name='mock_match_3', subject=Mock(concept_name='reptiles')))
+
+        filtered_matches = FactQuery._filter_relationships_by_concept_type(
+            mock_matches, 'reptiles', relationship_attr='subject')
+        self.assertEqual(mock_matches[0:3], filtered_matches)
+
+        filtered_matches = FactQuery._filter_relationships_by_concept_type(
+            mock_matches, 'species', relationship_attr='subject')
+        self.assertEqual(mock_matches[3:], filtered_matches)
+
+
+class FilterRelationshipsStatementCountTests(unittest.TestCase):
+    """Verify statements executed when filtering persisted relationships by concept type.
+    """
+    def tearDown(self):
+        fact_model.db.session.rollback()
+
+    def _add_animals(self, count):
+        # Each animal is a bird through its own species, e.g. 'heron is wader', 'wader is bird'
+        is_type = fact_model.RelationshipType.select_by_name('is')
+        has_type = fact_model.RelationshipType.select_by_name('has')
+        self.suffix = uuid.uuid4().hex[:8]
+        bird = fact_model.Concept(concept_name='bird_{0}'.format(self.suffix))
+        feathers = fact_model.Concept(concept_name='feathers_{0}'.format(self.suffix))
+        for i in range(count):
+            kind = fact_model.Concept(concept_name='kind_{0}_{1}'.format(i, self.suffix))
+            animal = fact_model.Concept(concept_name='animal_{0}_{1}'.format(i, self.suffix))
+            fact_model.db.session.add_all([
+                fact_model.Relationship(subject=kind, object=bird, relationship_types=[is_type]),
+                fact_model.Relationship(subject=animal, object=kind,
+                                        relationship_types=[is_type]),
+                fact_model.Relationship(subject=animal, object=feathers,
+                                        relationship_types=[has_type])])
+        fact_model.db.session.flush()
+        fact_model.db.session.expunge_all()
+
+    def _count_statements(self):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        sa_event.listen(fact_model.db.engine, 'before_cursor_execute', listener)
+        try:
+            matches = FactQuery._select_matching_relationships(
+                'has', object_name='feathers_{0}'.format(self.suffix))
+            filtered_matches = FactQuery._filter_relationships_by_concept_type(
+                matches, 'bird_{0}'.format(self.suffix), relationship_attr='subject')
+        finally:
+            sa_event.remove(fact_model.db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(len(matches), len(filtered_matches))
+        return len(filtered_matches), len(statements)
+
+    @patch.object(Config, 'fact_query_backend', 'sql')
+    def test_filter_relationships_by_concept_type__statement_count(self):
+        """Verify that concept types of matches are not loaded one match at a time.
+        """
+        fact_model.RelationshipType.id_for_name('has')
+        self._add_animals(2)
+        with patch.object(ConceptHierarchy, 'get_hierarchy',
+                          return_value=ConceptHierarchy.load()):
+            match_count, few_statements = self._count_statements()
+        self.assertEqual(2, match_count)
+
+        self._add_animals(6)
+        with patch.object(ConceptHierarchy, 'get_hierarchy',
+                          return_value=ConceptHierarchy.load()):
+            match_count, many_statements = self._count_statements()
+        self.assertEqual(6, match_count)
+        self.assertEqual(1, few_statements)
+        self.assertEqual(few_statements, many_statements)
+
 
 class AnimalAttributeQueryTests(unittest.TestCase):
     """Verify logic of _animal_attribute_query.
@@ -436,8 +618,171 @@ class AnimalValuesQueryTests(unittest.TestCase):
             [mock_1, mock_2, mock_3], 'reptiles', relationship_attr='subject')
 
 
+@patch.object(Config, 'fact_query_backend', 'sql')
+class CompiledWhichAnimalQueryTests(unittest.TestCase):
+    """Verify logic of _which_animal_query answered by single compiled statement.
+    """
+    @patch.object(QueryCompiler, 'execute')
+    @patch.object(QueryCompiler, 'compile_which_animal_query')
+    @patch.object(FactQuery, '_concept_is_species')
+    @patch.object(FactQuery, '_select_matching_relationships')
+    def test_which_animals(self, select_relationships, concept_is_species, compile_query,
+                           execute):
+        """Scenario of relationship='eat', subject='reptiles', object='bugs'.
+        """
+        parsed_query = Mock(name='parsed_query',
+                            text='which reptiles eat bugs',
+                            subject_name='reptiles',
+                            object_name='bugs',
+                            relationship_type_name='eat',
+                            relationship_number=None,
+                            relationship_negation=False)
+        fact_query = FactQuery(parsed_query=parsed_query)
+        concept_is_species.side_effect = lambda name: name == 'reptiles'
+        compile_query.return_value = mock_statement = Mock(name='statement')
+        execute.return_value = ['snakes', 'turtles']
+
+        self.assertEqual(['snakes', 'turtles'], fact_query._which_animal_query())
+
+        compile_query.assert_called_once_with(parsed_query,
+                                              subject_type='reptiles',
+                                              object_is_species=False)
+        execute.assert_called_once_with(mock_statement)
+        self.assertEqual(0, select_relationships.call_count)
+
+    @patch.object(QueryCompiler, 'execute_scalar')
+    @patch.object(QueryCompiler, 'compile_how_many_animal_query')
+    @patch.object(FactQuery, '_which_animal_query')
+    @patch.object(FactQuery, '_concept_is_species')
+    def test_how_many_animals(self, concept_is_species, which_animal_query, compile_query,
+                              execute_scalar):
+        """Verify that how-many query is counted by database without selecting names.
+        """
+        parsed_query = Mock(name='parsed_query',
+                            text='how many animals do not have four legs',
+                            subject_name='animals',
+                            object_name='legs',
+                            relationship_type_name='have',
+                            relationship_number='4',
+                            relationship_negation=True)
+        fact_query = FactQuery(parsed_query=parsed_query)
+        concept_is_species.return_value = False
+        compile_query.return_value = mock_statement = Mock(name='statement')
+        execute_scalar.return_value = 7
+
+        self.assertEqual(7, fact_query._animal_how_many_query())
+
+        compile_query.assert_called_once_with(parsed_query,
+                                              subject_type='animals',
+                                              object_is_species=False)
+        execute_scalar.assert_called_once_with(mock_statement)
+        self.assertEqual(0, which_animal_query.call_count)
+
+
+@patch.object(Config, 'fact_query_backend', 'matrix')
+@patch.object(AttributeMatrix, 'get_matrix')
+@patch.object(FactQuery, '_concept_is_species')
+@patch.object(FactQuery, '_select_matching_relationships')
+class MatrixWhichAnimalQueryTests(unittest.TestCase):
+    """Verify which-animal and how-many queries answered by vectorized matrix operations.
+    """
+    def setUp(self):
+        self.parsed_query = Mock(name='parsed_query',
+                                 text='which animals eat reptiles',
+                                 subject_name='animals',
+                                 object_name='reptiles',
+                                 relationship_type_name='eat',
+                                 relationship_number=None,
+                                 relationship_negation=False)
+        self.mask = np.array([True, False, True])
+
+    def test_which_animals(self, select_relationships, concept_is_species, get_matrix):
+        """Scenario of relationship='eat', subject='animals', object='reptiles'.
+        """
+        fact_query = FactQuery(parsed_query=self.parsed_query)
+        concept_is_species.side_effect = lambda name: name == 'reptiles'
+        get_matrix.return_value = mock_matrix = Mock(name='matrix')
+        mock_matrix.which_animal_mask.return_value = self.mask
+        mock_matrix.concept_names.return_value = ['snakes', 'otters']
+
+        self.assertEqual(['snakes', 'otters'], fact_query._which_animal_query())
+
+        mock_matrix.which_animal_mask.assert_called_once_with(self.parsed_query,
+                                                              subject_type='animals',
+                                                              object_is_species=True)
+        mock_matrix.concept_names.assert_called_once_with(self.mask)
+        self.assertEqual(0, select_relationships.call_count)
+
+    def test_how_many_animals(self, select_relationships, concept_is_species, get_matrix):
+        """Verify that how-many query sums mask without selecting names.
+        """
+        self.parsed_query.text = 'how many animals eat reptiles'
+        fact_query = FactQuery(parsed_query=self.parsed_query)
+        concept_is_species.return_value = False
+        get_matrix.return_value = mock_matrix = Mock(name='matrix')
+        mock_matrix.which_animal_mask.return_value = self.mask
+
+        self.assertEqual(2, fact_query._animal_how_many_query())
+
+        mock_matrix.which_animal_mask.assert_called_once_with(self.parsed_query,
+                                                              subject_type='animals',
+                                                              object_is_species=False)
+        self.assertEqual(0, mock_matrix.concept_names.call_count)
+        self.assertEqual(0, select_relationships.call_count)
+
+
+@patch.object(Config, 'fact_query_backend', 'graph')
+@patch.object(FactGraph, 'get_graph')
+@patch.object(FactQuery, '_concept_is_species')
+@patch.object(FactQuery, '_select_matching_relationships')
+class GraphWhichAnimalQueryTests(unittest.TestCase):
+    """Verify which-animal and how-many queries answered by posting lists of fact graph.
+    """
+    def setUp(self):
+        self.parsed_query = Mock(name='parsed_query',
+                                 text='which reptiles do not eat bugs',
+                                 subject_name='reptiles',
+                                 object_name='bugs',
+                                 relationship_type_name='eat',
+                                 relationship_number=None,
+                                 relationship_negation=True)
+        self.subjects = Bitmap([3, 5])
+
+    def test_which_animals(self, select_relationships, concept_is_species, get_graph):
+        """Scenario of relationship='eat', subject='reptiles', object='bugs', negated.
+        """
+        fact_query = FactQuery(parsed_query=self.parsed_query)
+        concept_is_species.side_effect = lambda name: name == 'reptiles'
+        get_graph.return_value = mock_graph = Mock(name='graph')
+        mock_graph.which_animal_subjects.return_value = self.subjects
+        mock_graph.concept_names.return_value = ['snakes', 'turtles']
+
+        self.assertEqual(['snakes', 'turtles'], fact_query._which_animal_query())
+
+        mock_graph.which_animal_subjects.assert_called_once_with(self.parsed_query,
+                                                                 subject_type='reptiles',
+                                                                 object_is_species=False)
+        mock_graph.concept_names.assert_called_once_with(self.subjects)
+        self.assertEqual(0, select_relationships.call_count)
+
+    def test_how_many_animals(self, select_relationships, concept_is_species, get_graph):
+        """Verify that how-many query counts posting list without selecting names.
+        """
+        self.parsed_query.text = 'how many reptiles do not eat bugs'
+        fact_query = FactQuery(parsed_query=self.parsed_query)
+        concept_is_species.side_effect = lambda name: name == 'reptiles'
+        get_graph.return_value = mock_graph = Mock(name='graph')
+        mock_graph.which_animal_subjects.return_value = self.subjects
+
+        self.assertEqual(2, fact_query._animal_how_many_query())
+
+        self.assertEqual(0, mock_graph.concept_names.call_count)
+        self.assertEqual(0, select_relationships.call_count)
+
+
+@patch.object(Config, 'fact_query_backend', 'relationships')
 class WhichAnimalQueryTests(unittest.TestCase):
-    """Verify logic of _which_animal_query.
+    """Verify logic of _which_animal_query answered by selecting and filtering relationships.
     """
     @patch.object(FactQuery, '_filter_relationships_by_concept_type')
     @patch.object(FactQuery, '_concept_is_species')
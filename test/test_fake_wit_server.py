@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit tests for FakeWitServer class.
+"""
+
+from __future__ import unicode_literals
+
+import random
+import unittest
+
+import animalia.exc as exc
+from animalia.fake_wit_server import FakeWitServer, LatencyDistribution
+from animalia.parsed_sentence import ParsedSentence
+from animalia.wit_client import WitClient
+import wit_responses
+
+
+class FakeWitServerTests(unittest.TestCase):
+    """Verify responses served by FakeWitServer to WitClient.
+    """
+    def setUp(self):
+        self.server = FakeWitServer(seed=1).start()
+        self.server.add_responses(vars(wit_responses).values())
+        self.client = WitClient(self.server.query_uri, 'token', 'v1', read_timeout=5)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_recorded_response(self):
+        """Verify that recorded response is served regardless of case and punctuation.
+        """
+        response_data = self.client.query('The otter has four legs?')
+        self.assertEqual(wit_responses.animal_leg_fact_data, response_data)
+        self.assertEqual('otters', ParsedSentence.from_wit_response(response_data).subject_name)
+        self.assertEqual({'requests': 1, 'recorded': 1, 'unknown': 0, 'errors': 0, 'dropped': 0},
+                         self.server.stats())
+
+    def test_unknown_sentence(self):
+        """Verify that sentence without recorded response has no confident outcome.
+        """
+        response_data = self.client.query('the otter plays the violin')
+        self.assertEqual('the otter plays the violin', response_data['_text'])
+        self.assertEqual(0.0, response_data['outcomes'][0]['confidence'])
+        with self.assertRaises(ValueError):
+            ParsedSentence.from_wit_response(response_data).validate_fact()
+
+    def test_add_response(self):
+        """Verify that response can be recorded for sentence other than its '_text'.
+        """
+        self.server.add_response(wit_responses.animal_species_fact_data, 'otters are mammals')
+        self.assertEqual(wit_responses.animal_species_fact_data,
+                         self.client.query('Otters are mammals.'))
+
+    def test_injected_errors(self):
+        """Verify that injected error statuses and dropped connections fail requests.
+        """
+        self.server.error_rate = 1.0
+        self.server.error_statuses = [503]
+        response = self.client.get('the otter has four legs')
+        self.assertEqual(503, response.status_code)
+        with self.assertRaises(exc.ExternalApiError):
+            self.client.query('the otter has four legs')
+
+        self.server.error_rate = 0.0
+        self.server.drop_rate = 1.0
+        with self.assertRaises(exc.ExternalApiError):
+            self.client.query('the otter has four legs')
+
+        stats = self.server.stats()
+        self.assertEqual(2, stats['errors'])
+        self.assertEqual(0, stats['recorded'])
+        self.assertTrue(stats['dropped'] >= 1)
+
+    def test_unknown_path(self):
+        """Verify 404 for paths other than message API.
+        """
+        response = self.client.session.get(self.server.query_uri.replace('message', 'intents'))
+        self.assertEqual(404, response.status_code)
+
+
+class LatencyDistributionTests(unittest.TestCase):
+    """Verify sampling of simulated latencies.
+    """
+    def test_from_spec(self):
+        """Verify that specifications are parsed and samples are in seconds.
+        """
+        rand = random.Random(1)
+        self.assertEqual(0.05, LatencyDistribution.from_spec('constant:50').sample())
+        for i in range(100):
+            self.assertTrue(0.02 <= LatencyDistribution.from_spec('uniform:20:80', rand).sample()
+                            <= 0.08)
+            self.assertTrue(LatencyDistribution.from_spec('normal:10:50', rand).sample() >= 0)
+            self.assertTrue(LatencyDistribution.from_spec('exponential:10', rand).sample() >= 0)
+            self.assertTrue(LatencyDistribution.from_spec('lognormal:10:1', rand).sample() > 0)
+
+    def test_from_spec__invalid(self):
+        """Verify ValueError for unknown distribution or wrong number of parameters.
+        """
+        for spec in ('constant', 'uniform:20', 'gamma:1:2', 'constant:fast'):
+            with self.assertRaises(ValueError):
+                LatencyDistribution.from_spec(spec)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit tests for Future class.
+"""
+
+from __future__ import unicode_literals
+
+import sys
+import threading
+import unittest
+
+from mock import Mock
+
+from animalia.future import Future
+
+
+class FutureTests(unittest.TestCase):
+    """Verify completion of Future and notification of callers.
+    """
+    def test_set_result(self):
+        """Verify that result is returned to callers waiting in other threads.
+        """
+        future = Future()
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(future.result()))
+        waiter.start()
+        self.assertFalse(future.done())
+
+        future.set_result('otters')
+        waiter.join(5)
+        self.assertTrue(future.done())
+        self.assertEqual(['otters'], results)
+        self.assertIsNone(future.exception())
+
+    def test_set_exception(self):
+        """Verify that exception of call is raised by result.
+        """
+        future = Future()
+        try:
+            raise ValueError('no otters')
+        except ValueError:
+            future.set_exception(sys.exc_info())
+        self.assertRaisesRegexp(ValueError, 'no otters', future.result)
+        self.assertIsInstance(future.exception(), ValueError)
+
+    def test_set_result__done(self):
+        """Verify that future cannot be completed twice.
+        """
+        future = Future()
+        future.set_result(None)
+        self.assertRaises(RuntimeError, future.set_result, 'otters')
+
+    def test_add_done_callback(self):
+        """Verify that callbacks are called once future is done, even if one fails.
+        """
+        future = Future()
+        failing_callback = Mock(side_effect=ValueError('bad callback'))
+        callback = Mock()
+        future.add_done_callback(failing_callback)
+        future.add_done_callback(callback)
+        self.assertEqual(0, callback.call_count)
+
+        future.set_result('otters')
+        failing_callback.assert_called_once_with(future)
+        callback.assert_called_once_with(future)
+
+        late_callback = Mock()
+        future.add_done_callback(late_callback)
+        late_callback.assert_called_once_with(future)
@@ -14,6 +14,7 @@ import unittest
 from mock import Mock, patch
 
 from animalia.parsed_sentence import logger, ParsedSentence
+from animalia.plurals import Plurals
 import wit_responses
 
 # Set log level for unit tests
@@ -62,6 +63,16 @@ class FromWitResponseTests(unittest.TestCase):
         self.assertFalse(parsed_sentence.relationship_negation)
         self.assertEqual(json.dumps(self.parsed_data), parsed_sentence.orig_response)
 
+    @patch.object(Plurals, 'get_plurals', wraps=Plurals.get_plurals)
+    def test_from_wit_response__normalize_in_batch(self, get_plurals):
+        """Verify that concept entities are normalized with single call to get_plurals.
+        """
+        parsed_sentence = ParsedSentence.from_wit_response(self.parsed_data)
+        self.assertEqual('otters', parsed_sentence.subject_name)
+        self.assertEqual(1, get_plurals.call_count)
+        self.assertEqual(set(['animal', 'otter', 'species', 'mammal']),
+                         set(get_plurals.call_args[0][0]))
+
     def test_from_wit_response__number_entity(self):
         """Verify that valid data with 'number' entity passes from_wit_response factory method.
         """
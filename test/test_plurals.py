@@ -6,9 +6,15 @@
 
 from __future__ import unicode_literals
 
+import io
+import os
+import shutil
+import tempfile
+import threading
 from mock import patch
 import unittest
 
+from animalia.config import Config
 from animalia.plurals import Plurals
 
 
@@ -21,7 +27,10 @@ class PluralsTests(unittest.TestCase):
 
     def setUp(self):
         Plurals.inflect_engine = None
-        Plurals.cached_plurals = {}
+        Plurals.reset()
+        lexicon_patcher = patch.object(Config, 'plurals_lexicon_path', None)
+        lexicon_patcher.start()
+        self.addCleanup(lexicon_patcher.stop)
 
     def test_get_plural(self):
         """Verify behavior for generating plural of singular noun.
@@ -74,4 +83,103 @@ class PluralsTests(unittest.TestCase):
             second_plural = Plurals.get_plural(self.singular)
         self.assertEqual(second_plural, plural)
         self.assertEqual(0, inflect_engine.call_count)
-        
+
+    @patch.object(Config, 'plurals_cache_max_entries', 4)
+    def test_get_plural__evict_least_recently_used(self):
+        """Verify that cache is bounded and evicts least recently used nouns.
+        """
+        for noun in ('berry', 'otter', 'heron'):
+            Plurals.get_plural(noun)
+            Plurals.get_plural('berries')
+        # 'berries' was used last, 'berry' and 'otter' least recently
+        self.assertEqual(['otters', 'heron', 'herons', 'berries'], list(Plurals.cached_plurals))
+        self.assertEqual({'lexicon_entries': 0, 'cache_entries': 4, 'lexicon_hits': 0,
+                          'cache_hits': 3, 'misses': 3, 'hit_rate': 0.5},
+                         dict((k, v) for k, v in Plurals.stats().iteritems()
+                              if k != 'memory_bytes'))
+
+    def test_get_plurals(self):
+        """Verify that batch of nouns is deduped and only nouns not yet cached are inflected.
+        """
+        Plurals.get_plural('otter')
+        with patch.object(Plurals, 'inflect_noun', wraps=Plurals.inflect_noun) as inflect_noun:
+            plurals = Plurals.get_plurals(['berry', 'otters', 'berry', 'berries', 'otter'])
+        self.assertEqual({'berry': 'berries', 'berries': 'berries', 'otter': 'otters',
+                          'otters': 'otters'}, plurals)
+        self.assertEqual(2, inflect_noun.call_count)
+        self.assertEqual(2, Plurals.stats()['cache_hits'])
+        self.assertEqual({}, Plurals.get_plurals([]))
+
+    def test_get_plural__threads(self):
+        """Verify that concurrent lookups of nouns agree.
+        """
+        nouns = ['berry', 'otter', 'heron', 'gecko', 'salmon', 'bees'] * 20
+        results = []
+        def lookup():
+            results.append([Plurals.get_plural(noun) for noun in nouns])
+        threads = [threading.Thread(target=lookup) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(4, len(results))
+        for result in results:
+            self.assertEqual(results[0], result)
+        self.assertEqual(6, Plurals.stats()['misses'])
+
+
+class LexiconTests(unittest.TestCase):
+    """Verify use of precompiled lexicon by Plurals.
+    """
+    def setUp(self):
+        Plurals.reset()
+        self.addCleanup(Plurals.reset)
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.lexicon_path = os.path.join(self.temp_dir, 'lexicon.txt')
+        with io.open(self.lexicon_path, 'w', encoding='utf-8') as f:
+            f.write('# comment\nbody part\tbody parts\nmoose\tmeese\n\n')
+        lexicon_patcher = patch.object(Config, 'plurals_lexicon_path', self.lexicon_path)
+        lexicon_patcher.start()
+        self.addCleanup(lexicon_patcher.stop)
+
+    def test_get_plural__lexicon(self):
+        """Verify that nouns of lexicon are not inflected or cached.
+        """
+        with patch.object(Plurals, 'inflect_noun') as inflect_noun:
+            self.assertEqual('meese', Plurals.get_plural('moose'))
+            self.assertEqual('meese', Plurals.get_plural('meese'))
+            self.assertEqual('body parts', Plurals.get_plural('body part'))
+        self.assertEqual(0, inflect_noun.call_count)
+
+        stats = Plurals.stats()
+        self.assertEqual(4, stats['lexicon_entries'])
+        self.assertEqual(0, stats['cache_entries'])
+        self.assertEqual(3, stats['lexicon_hits'])
+        self.assertEqual(1.0, stats['hit_rate'])
+        self.assertTrue(stats['memory_bytes'] > 0)
+
+    def test_get_plural__not_in_lexicon(self):
+        """Verify that nouns missing from lexicon are inflected.
+        """
+        self.assertEqual('berries', Plurals.get_plural('berry'))
+        self.assertEqual(1, Plurals.stats()['misses'])
+
+    def test_get_plurals__lexicon(self):
+        """Verify that batch of nouns is answered from lexicon and inflect.
+        """
+        with patch.object(Plurals, 'inflect_noun', return_value=('berry', 'berries')):
+            self.assertEqual({'moose': 'meese', 'berry': 'berries'},
+                             Plurals.get_plurals(['moose', 'berry', 'moose']))
+        self.assertEqual(1, Plurals.stats()['lexicon_hits'])
+
+    def test_load_lexicon__missing_file(self):
+        """Verify empty lexicon if lexicon file does not exist.
+        """
+        self.assertEqual({}, Plurals.load_lexicon(os.path.join(self.temp_dir, 'missing.txt')))
+
+    def test_read_lexicon(self):
+        """Verify nouns read from lexicon file.
+        """
+        self.assertEqual([('body part', 'body parts'), ('moose', 'meese')],
+                         Plurals.read_lexicon(self.lexicon_path))
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit tests for PreforkServer class.
+"""
+
+from __future__ import unicode_literals
+
+import os
+import signal
+import threading
+import time
+import unittest
+import urllib2
+
+from animalia.prefork_server import PreforkServer
+
+
+def create_app():
+    """Create WSGI app that responds with pid of worker; path /sleep waits a little first.
+    """
+    def app(environ, start_response):
+        if environ['PATH_INFO'] == '/sleep':
+            time.sleep(0.5)
+        start_response(b'200 OK', [(b'Content-Type', b'text/plain')])
+        return [b'{0}'.format(os.getpid())]
+    return app
+
+
+class PreforkServerTests(unittest.TestCase):
+    """Verify requests served by workers of PreforkServer running in child process.
+    """
+    workers = 2
+    threads = 1
+
+    def setUp(self):
+        server = PreforkServer(create_app, port=0, workers=self.workers, threads=self.threads)
+        server.poll_interval = 0.05
+        self.base_uri = 'http://localhost:{0}'.format(server.server_address[1])
+        self.master_pid = os.fork()
+        if self.master_pid == 0:
+            status = 1
+            try:
+                server.run()
+                status = 0
+            finally:
+                os._exit(status)
+        server.socket.close()
+
+    def tearDown(self):
+        if self.master_pid:
+            os.kill(self.master_pid, signal.SIGTERM)
+            os.waitpid(self.master_pid, 0)
+
+    def get(self, path='/'):
+        """
+        :rtype: int
+        :return: pid of worker that served request
+        """
+        response = urllib2.urlopen(self.base_uri + path, timeout=5)
+        return int(response.read())
+
+    def serving_pids(self, requests=20):
+        return set(self.get() for i in range(requests))
+
+    @staticmethod
+    def is_running(pid):
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            return False
+        return True
+
+    def test_requests(self):
+        """Verify that requests are served by worker processes, not master.
+        """
+        pids = self.serving_pids()
+        self.assertTrue(pids)
+        self.assertLessEqual(len(pids), self.workers)
+        self.assertNotIn(self.master_pid, pids)
+
+    def test_reload(self):
+        """Verify that SIGHUP replaces workers without refusing requests.
+        """
+        old_pids = self.serving_pids()
+        os.kill(self.master_pid, signal.SIGHUP)
+        deadline = time.time() + 5
+        pids = self.serving_pids()
+        while pids & old_pids and time.time() < deadline:
+            time.sleep(0.05)
+            pids = self.serving_pids()
+        self.assertFalse(pids & old_pids)
+
+    def test_stop(self):
+        """Verify that SIGTERM stops workers and master.
+        """
+        pids = self.serving_pids()
+        os.kill(self.master_pid, signal.SIGTERM)
+        pid, status = os.waitpid(self.master_pid, 0)
+        self.master_pid = None
+        self.assertEqual(0, status)
+        for pid in pids:
+            with self.assertRaises(OSError):
+                os.kill(pid, 0)
+        with self.assertRaises(urllib2.URLError):
+            self.get()
+
+    def test_master_killed(self):
+        """Verify that workers exit when master dies without stopping them.
+        """
+        pids = self.serving_pids()
+        os.kill(self.master_pid, signal.SIGKILL)
+        os.waitpid(self.master_pid, 0)
+        self.master_pid = None
+        deadline = time.time() + 5
+        while pids and time.time() < deadline:
+            time.sleep(0.05)
+            pids = [pid for pid in pids if self.is_running(pid)]
+        self.assertEqual([], pids)
+
+
+class ThreadedPreforkServerTests(PreforkServerTests):
+    """Verify requests served by threads of single worker of PreforkServer.
+    """
+    workers = 1
+    threads = 4
+
+    def test_concurrent_requests(self):
+        """Verify that one worker serves as many requests at once as it has threads.
+        """
+        results = []
+        requests = [threading.Thread(target=lambda: results.append(self.get('/sleep')))
+                    for i in range(self.threads)]
+        start = time.time()
+        for request in requests:
+            request.start()
+        for request in requests:
+            request.join(5)
+        self.assertLess(time.time() - start, 1.5)
+        self.assertEqual(self.threads, len(results))
+        self.assertEqual(1, len(set(results)))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit tests for QueryCompiler class.
+"""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from mock import Mock, patch
+
+import animalia.fact_model as fact_model
+from animalia.query_compiler import QueryCompiler
+
+
+class CompileWhichAnimalQueryTests(unittest.TestCase):
+    """Verify statements compiled by compile_which_animal_query.
+    """
+    relationship_type_ids = {'is': 1, 'eat': 2, 'have': 3}
+
+    def setUp(self):
+        id_for_name_patcher = patch.object(fact_model.RelationshipType, 'id_for_name',
+                                           side_effect=self.relationship_type_ids.get)
+        id_for_name_patcher.start()
+        self.addCleanup(id_for_name_patcher.stop)
+
+    def make_parsed_query(self, **kwargs):
+        attrs = dict(subject_name='animals',
+                     object_name='bugs',
+                     relationship_type_name='eat',
+                     relationship_number=None,
+                     relationship_negation=False)
+        attrs.update(kwargs)
+        return Mock(name='parsed_query', **attrs)
+
+    def compile(self, parsed_query, **kwargs):
+        statement = QueryCompiler.compile_which_animal_query(parsed_query, **kwargs)
+        compiled = statement.compile()
+        return ' '.join(unicode(compiled).split()), compiled.params
+
+    def test_compile_which_animal_query(self):
+        """Verify single statement with IN clauses for concept type and relationship.
+        """
+        sql, params = self.compile(self.make_parsed_query())
+        self.assertTrue(sql.startswith('SELECT animals.concept_name FROM concepts AS animals '))
+        self.assertEqual(2, sql.count('animals.concept_id IN (SELECT'))
+        self.assertFalse('NOT' in sql)
+        self.assertFalse('relationship_types' in sql)
+        self.assertTrue('FROM concept_ancestors' in sql)
+        self.assertEqual(set(['animals', 2, 'bugs']), set(params.values()))
+
+    def test_compile_which_animal_query__negation(self):
+        """Verify NOT IN clause for negated relationship.
+        """
+        sql, params = self.compile(self.make_parsed_query(relationship_negation=True),
+                                   subject_type='reptiles')
+        self.assertEqual(1, sql.count('animals.concept_id NOT IN (SELECT'))
+        self.assertTrue('reptiles' in params.values())
+
+    def test_compile_which_animal_query__species_object(self):
+        """Verify nested IN clause for objects that are of species.
+        """
+        sql, params = self.compile(self.make_parsed_query(object_name='reptiles'),
+                                   object_is_species=True)
+        self.assertEqual(3, sql.count(' IN (SELECT'))
+        self.assertEqual(2, params.values().count('reptiles'))
+
+    def test_compile_which_animal_query__relationship_number(self):
+        """Verify count clause when relationship number is specified.
+        """
+        sql, params = self.compile(self.make_parsed_query(relationship_type_name='have',
+                                                          object_name='legs',
+                                                          relationship_number='4'))
+        self.assertTrue('.count = :count_1' in sql)
+        self.assertEqual(4, params['count_1'])
+
+
+class CompileHowManyAnimalQueryTests(CompileWhichAnimalQueryTests):
+    """Verify statements compiled by compile_how_many_animal_query.
+    """
+    def compile(self, parsed_query, **kwargs):
+        statement = QueryCompiler.compile_how_many_animal_query(parsed_query, **kwargs)
+        compiled = statement.compile()
+        return ' '.join(unicode(compiled).split()), compiled.params
+
+    def test_compile_which_animal_query(self):
+        """Verify that count replaces concept names with same conditions.
+        """
+        sql, params = self.compile(self.make_parsed_query())
+        self.assertTrue(sql.startswith(
+                'SELECT count(DISTINCT animals.concept_id) AS animal_count FROM concepts AS animals '))
+        self.assertFalse('concept_name FROM concepts AS animals' in sql)
+        self.assertEqual(2, sql.count('animals.concept_id IN (SELECT'))
+        self.assertEqual(set(['animals', 2, 'bugs']), set(params.values()))
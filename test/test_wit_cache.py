@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit tests for WitCache class.
+"""
+
+from __future__ import unicode_literals
+
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+import animalia.wit_cache as wit_cache
+from animalia.wit_cache import WitCache
+import wit_responses
+
+
+class WitCacheTests(unittest.TestCase):
+    """Verify behavior of WitCache.
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'wit_cache.sqlite')
+        self.query_uri = 'https://wit.example.com/message'
+        self.response = copy.deepcopy(wit_responses.animal_leg_fact_data)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @staticmethod
+    def parsed_response(text):
+        return {'_text': text, 'outcomes': [{'_text': text, 'intent': 'animal_fact'}]}
+
+    def test_get__miss(self):
+        """Verify None and miss count for sentence that is not cached.
+        """
+        cache = WitCache(self.path, self.query_uri, 'v1')
+        self.assertIsNone(cache.get('the otter has four legs'))
+        self.assertEqual(0, cache.stats()['hits'])
+        self.assertEqual(1, cache.stats()['misses'])
+
+    def test_set_and_get(self):
+        """Verify cached response is returned for same sentence.
+        """
+        cache = WitCache(self.path, self.query_uri, 'v1')
+        cache.set('the otter has four legs', self.response)
+        self.assertEqual(self.response, cache.get('the otter has four legs'))
+        self.assertEqual({'entries': 1, 'hits': 1, 'misses': 0, 'hit_rate': 1.0}, cache.stats())
+
+    def test_get__normalized_sentence(self):
+        """Verify that sentences differing only in case and whitespace share an entry.
+        """
+        cache = WitCache(self.path, self.query_uri, 'v1')
+        cache.set('the otter has four legs', self.response)
+        self.assertEqual(self.response, cache.get(' The  otter has four LEGS'))
+
+    def test_get__api_version(self):
+        """Verify that responses cached for one API version are not returned for another.
+        """
+        WitCache(self.path, self.query_uri, 'v1').set('the otter has four legs', self.response)
+        self.assertIsNone(WitCache(self.path, self.query_uri, 'v2').get('the otter has four legs'))
+
+    def test_get__query_uri(self):
+        """Verify that responses cached for one query URI are not returned for another.
+        """
+        WitCache(self.path, self.query_uri, 'v1').set('the otter has four legs', self.response)
+        cache = WitCache(self.path, 'http://localhost:8081/message', 'v1')
+        self.assertIsNone(cache.get('the otter has four legs'))
+
+    def test_get__persisted(self):
+        """Verify that responses are available to a new cache instance with same path.
+        """
+        WitCache(self.path, self.query_uri, 'v1').set('the otter has four legs', self.response)
+        cache = WitCache(self.path, self.query_uri, 'v1')
+        self.assertEqual(self.response, cache.get('the otter has four legs'))
+        self.assertEqual(1, cache.stats()['entries'])
+
+    @patch.object(wit_cache, 'time')
+    def test_get__expired(self, mock_time):
+        """Verify that response is not returned and is removed once ttl has passed.
+        """
+        cache = WitCache(self.path, self.query_uri, 'v1', ttl_seconds=60)
+        mock_time.time.return_value = 1000.0
+        cache.set('the otter has four legs', self.response)
+
+        mock_time.time.return_value = 1060.0
+        self.assertEqual(self.response, cache.get('the otter has four legs'))
+
+        mock_time.time.return_value = 1061.0
+        self.assertIsNone(cache.get('the otter has four legs'))
+        self.assertEqual(0, cache.stats()['entries'])
+
+    @patch.object(wit_cache, 'time')
+    def test_set__evict_least_recently_used(self, mock_time):
+        """Verify that least recently used entry is evicted when max_entries is exceeded.
+        """
+        cache = WitCache(self.path, self.query_uri, 'v1', max_entries=2)
+        mock_time.time.return_value = 1000.0
+        cache.set('sentence one', self.parsed_response('sentence one'))
+        mock_time.time.return_value = 1001.0
+        cache.set('sentence two', self.parsed_response('sentence two'))
+        mock_time.time.return_value = 1002.0
+        cache.get('sentence one')
+        mock_time.time.return_value = 1003.0
+        cache.set('sentence three', self.parsed_response('sentence three'))
+
+        self.assertEqual(2, cache.stats()['entries'])
+        self.assertIsNotNone(cache.get('sentence one'))
+        self.assertIsNone(cache.get('sentence two'))
+        self.assertIsNotNone(cache.get('sentence three'))
+
+    def test_set__unknown_intent(self):
+        """Verify that responses without outcomes or with intent UNKNOWN are not cached.
+        """
+        cache = WitCache(self.path, self.query_uri, 'v1')
+        unknown_response = {'_text': 'the otter plays the violin',
+                            'outcomes': [{'_text': 'the otter plays the violin',
+                                          'confidence': 0.0,
+                                          'intent': 'UNKNOWN'}]}
+        for response in (unknown_response, {'_text': 'the otter plays the violin'},
+                         {'_text': 'the otter plays the violin', 'outcomes': []}):
+            self.assertFalse(cache.set('the otter plays the violin', response))
+            self.assertIsNone(cache.get('the otter plays the violin'))
+        self.assertEqual(0, cache.stats()['entries'])
+        self.assertTrue(cache.set('the otter has four legs', self.response))
+
+    def test_set__replace(self):
+        """Verify that setting existing sentence replaces response without adding entry.
+        """
+        cache = WitCache(self.path, self.query_uri, 'v1', max_entries=2)
+        cache.set('the otter has four legs', self.parsed_response('old'))
+        cache.set('the otter has four legs', self.response)
+        self.assertEqual(self.response, cache.get('the otter has four legs'))
+        self.assertEqual(1, cache.stats()['entries'])
+
+    def test_clear(self):
+        """Verify that clear removes entries and resets counts.
+        """
+        cache = WitCache(self.path, self.query_uri, 'v1')
+        cache.set('the otter has four legs', self.response)
+        cache.get('the otter has four legs')
+        cache.clear()
+        self.assertEqual({'entries': 0, 'hits': 0, 'misses': 0, 'hit_rate': 0.0}, cache.stats())
+        self.assertIsNone(cache.get('the otter has four legs'))
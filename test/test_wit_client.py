@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit tests for WitClient class.
+"""
+
+from __future__ import unicode_literals
+
+import copy
+import threading
+import unittest
+
+from mock import Mock, patch
+import requests
+
+import animalia.exc as exc
+from animalia.fake_wit_server import FakeWitServer
+import animalia.wit_client as wit_client
+from animalia.wit_client import WitClient
+import wit_responses
+
+
+class WitClientTests(unittest.TestCase):
+    """Verify behavior of WitClient.
+    """
+    def setUp(self):
+        self.client = WitClient('https://wit.example.com/message', 'token', 'v1', pool_size=4,
+                                connect_timeout=1.5, read_timeout=5)
+        self.response_data = copy.deepcopy(wit_responses.animal_leg_fact_data)
+
+    def tearDown(self):
+        WitClient._shared_client = None
+        WitClient._shared_client_pid = None
+
+    def test_init(self):
+        """Verify session headers and connection pool.
+        """
+        self.assertEqual('Bearer token', self.client.session.headers['Authorization'])
+        self.assertEqual('application/json', self.client.session.headers['Accept'])
+        self.assertEqual(self.client._adapter,
+                         self.client.session.get_adapter('https://wit.example.com/message'))
+        self.assertEqual(4, self.client._adapter._pool_maxsize)
+
+    def test_get(self):
+        """Verify request made by get.
+        """
+        with patch.object(self.client.session, 'get') as session_get:
+            session_get.return_value = mock_response = Mock(name='response')
+            response = self.client.get('the otter has four legs')
+        self.assertEqual(mock_response, response)
+        session_get.assert_called_once_with('https://wit.example.com/message',
+                                            params={'v': 'v1', 'q': 'the otter has four legs'},
+                                            timeout=(1.5, 5))
+        self.assertEqual(1, self.client.stats()['requests'])
+
+    def test_query(self):
+        """Verify response data returned by query.
+        """
+        with patch.object(self.client.session, 'get') as session_get:
+            session_get.return_value = Mock(status_code=200,
+                                            json=Mock(return_value=self.response_data))
+            response_data = self.client.query('the otter has four legs')
+        self.assertEqual(self.response_data, response_data)
+        self.assertEqual(0, self.client.stats()['failures'])
+
+    def test_query__failed_response(self):
+        """Verify ExternalApiError for unsuccessful response.
+        """
+        with patch.object(self.client.session, 'get') as session_get:
+            session_get.return_value = Mock(status_code=500)
+            self.assertRaisesRegexp(exc.ExternalApiError,
+                                    'Failed response from wit.ai',
+                                    self.client.query,
+                                    'the otter has four legs')
+        self.assertEqual(1, self.client.stats()['failures'])
+
+    def test_query__request_exception(self):
+        """Verify ExternalApiError if request fails.
+        """
+        with patch.object(self.client.session, 'get') as session_get:
+            session_get.side_effect = requests.exceptions.ConnectTimeout('too slow')
+            self.assertRaisesRegexp(exc.ExternalApiError,
+                                    'Error communicating with wit.ai: too slow',
+                                    self.client.query,
+                                    'the otter has four legs')
+        self.assertEqual({'requests': 1, 'failures': 1, 'connections': 0,
+                          'reused_connections': 0},
+                         self.client.stats())
+
+    def test_stats__reused_connections(self):
+        """Verify that only completed requests on already open connections count as reused.
+        """
+        server = FakeWitServer(seed=1).start()
+        try:
+            server.add_responses([self.response_data])
+            client = WitClient(server.query_uri, 'token', 'v1', read_timeout=5)
+            for i in range(3):
+                client.query('the otter has four legs')
+            self.assertEqual({'requests': 3, 'failures': 0, 'connections': 1,
+                              'reused_connections': 2},
+                             client.stats())
+
+            server.drop_rate = 1.0
+            with self.assertRaises(exc.ExternalApiError):
+                client.query('the otter has four legs')
+            self.assertEqual(2, client.stats()['reused_connections'])
+        finally:
+            server.stop()
+
+    def test_shared(self):
+        """Verify same client is returned to every caller in a process.
+        """
+        client = WitClient.shared()
+        self.assertTrue(isinstance(client, WitClient))
+        self.assertTrue(client is WitClient.shared())
+
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(WitClient.shared()))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([client] * 4, clients)
+
+    def test_shared__forked_process(self):
+        """Verify new client is created in forked process.
+        """
+        client = WitClient.shared()
+        with patch.object(wit_client.os, 'getpid', return_value=-1):
+            self.assertFalse(client is WitClient.shared())
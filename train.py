@@ -5,6 +5,11 @@
 Go through training data csv, inserting appropriate Concepts and Relationships into database
 using FactManager.
 
+Training runs as a pipeline: the csv is read and sentences are generated from each record in
+one thread, a pool of worker threads parses sentences with wit.ai, and parsed facts are saved
+to the database in batches by the main thread. The number of workers bounds the number of wit.ai
+requests in flight; the batch size bounds the number of facts saved per transaction.
+
 See training_data/animalia.csv for example of training data
 
 """
@@ -14,8 +19,13 @@ from __future__ import unicode_literals
 import argparse
 import csv
 import logging
+import Queue
+import threading
+import time
 
-from animalia import fact_manager, exc
+from animalia import fact_manager, fact_model, exc
+from animalia.config import Config
+from animalia.wit_client import WitClient
 
 ch = logging.StreamHandler()
 ch.setFormatter(logging.Formatter(fmt='%(name)s [%(levelname)s] %(message)s'))
@@ -23,9 +33,15 @@ logging.root.addHandler(ch)
 logger = logging.getLogger('train')
 logger.setLevel(logging.WARN)
 
+# Marks end of input on pipeline queues
+_END = object()
+
 
-def add_data_from_record(rec):
+def sentences_from_record(rec):
     """
+    :rtype: ((unicode, unicode), [unicode, ...])
+    :return: (concept, type) of record and fact sentences generated from record
+
     :type rec: dict
     :arg rec: dictionary of related data
 
@@ -49,41 +65,167 @@ def add_data_from_record(rec):
         return [s.lower() for s in s.split(':')] if s else []
 
     concept = rec['concept']
-    add_concept(concept, rec['type'])
+    sentences = []
 
     if rec.get('parent species'):
-        add_sentence('the {0} is a {1}'.format(concept, rec['parent species']))
+        sentences.append('the {0} is a {1}'.format(concept, rec['parent species']))
     for v in split_str(rec.get('lives')):
-        add_sentence('the {0} lives in the {1}'.format(concept, v))
+        sentences.append('the {0} lives in the {1}'.format(concept, v))
     for v in split_str(rec.get('has body part')):
         if v == 'leg':
             num_legs = rec.get('leg count')
-            add_sentence('the {0} has {1} legs'.format(concept, num_legs if num_legs else ''))
+            sentences.append('the {0} has {1} legs'.format(concept, num_legs if num_legs else ''))
         else:
-            add_sentence('the {0} has a {1}'.format(concept, v))
+            sentences.append('the {0} has a {1}'.format(concept, v))
     if as_bool(rec.get('has fur')):
-        add_sentence('the {0} has fur'.format(concept))
+        sentences.append('the {0} has fur'.format(concept))
     if as_bool(rec.get('has scales')):
-        add_sentence('the {0} has scales'.format(concept))
+        sentences.append('the {0} has scales'.format(concept))
     for v in split_str(rec.get('eats')):
-        add_sentence('the {0} eats {1}'.format(concept, v))
+        sentences.append('the {0} eats {1}'.format(concept, v))
+
+    return (concept, rec['type']), sentences
 
-def add_concept(concept_name, concept_type):
+def read_records(infile, sentence_queue, write_queue, num_workers, stats, errors):
+    """Read csv and generate sentences; sentences go to parse workers, concepts to writer.
+
+    An error reading the csv ends input and is appended to errors, for train to raise.
+    """
     try:
-        fact_manager.FactManager.add_concept(concept_name, concept_type)
-        logger.info("Added concept '{0}' with type '{1}'".format(concept_name, concept_type))
-    except exc.IncomingDataError as ex:
-        logger.error("Failed to add concept '{0}' with type '{1}': {2}".format(
-                concept_name, concept_type, ex))
+        with open(infile, 'r') as f:
+            reader = csv.DictReader(f)
+            for rec in reader:
+                try:
+                    concept, sentences = sentences_from_record(rec)
+                except ValueError as ex:
+                    logger.error("Failed to add data from record '{0}'".format(rec))
+                    continue
+                stats['records'] += 1
+                write_queue.put(('concept', concept))
+                for sentence in sentences:
+                    stats['sentences'] += 1
+                    sentence_queue.put(sentence)
+    except Exception as ex:
+        errors.append(ex)
+    finally:
+        for i in range(num_workers):
+            sentence_queue.put(_END)
+
+def parse_sentences(sentence_queue, write_queue):
+    """Parse sentences with wit.ai until end of input; parsed facts go to writer.
+    """
+    try:
+        while True:
+            sentence = sentence_queue.get()
+            if sentence is _END:
+                break
+            try:
+                parsed_fact = fact_manager.FactManager.parse_fact_sentence(sentence)
+            except Exception as ex:
+                logger.exception("Failed to parse sentence '{0}'".format(sentence))
+                parsed_fact = (sentence, None, ex)
+            write_queue.put(('fact', parsed_fact))
+    finally:
+        write_queue.put(('end', None))
+
+def write_batches(write_queue, num_workers, batch_size, stats):
+    """Save concepts and parsed facts in batches until all parse workers are done.
+    """
+    concepts = []
+    parsed_facts = []
+    num_running = num_workers
+    while num_running:
+        kind, item = write_queue.get()
+        if kind == 'end':
+            num_running -= 1
+        elif kind == 'concept':
+            concepts.append(item)
+        else:
+            parsed_facts.append(item)
+        if len(concepts) + len(parsed_facts) >= batch_size or not num_running:
+            save_batch(concepts, parsed_facts, stats)
+            concepts = []
+            parsed_facts = []
 
-def add_sentence(sentence):
-    fact = None
+def save_concepts(concepts, stats):
+    """Save concepts in a single transaction, or one at a time if any of them cannot be added.
+    """
     try:
-        fact = fact_manager.FactManager.fact_from_sentence(sentence)
-        logger.info("Added sentence '{0}' (fact_id={1})".format(sentence, fact.fact_id))
+        fact_manager.FactManager.add_concepts(concepts)
     except exc.IncomingDataError as ex:
-        logger.error("Failed to add sentence '{0}': {1}".format(sentence, ex))
-    return fact
+        fact_model.db.session.rollback()
+        logger.warn("Failed to add concepts in batch, adding them one at a time: {0}".format(ex))
+    else:
+        stats['concepts'] += len(concepts)
+        for concept_name, concept_type in concepts:
+            logger.info("Added concept '{0}' with type '{1}'".format(concept_name, concept_type))
+        return
+
+    for concept_name, concept_type in concepts:
+        try:
+            fact_manager.FactManager.add_concept(concept_name, concept_type)
+            stats['concepts'] += 1
+            logger.info("Added concept '{0}' with type '{1}'".format(concept_name, concept_type))
+        except exc.IncomingDataError as ex:
+            fact_model.db.session.rollback()
+            logger.error("Failed to add concept '{0}' with type '{1}': {2}".format(
+                    concept_name, concept_type, ex))
+
+def save_batch(concepts, parsed_facts, stats):
+    """Save concepts and then parsed facts, each group in a single transaction.
+    """
+    if concepts:
+        save_concepts(concepts, stats)
+    if parsed_facts:
+        stats['batches'] += 1
+        results = fact_manager.FactManager.save_parsed_facts(parsed_facts)
+        for (sentence, parsed_sentence, parse_error), (fact, error) in zip(parsed_facts,
+                                                                           results):
+            if error:
+                stats['errors'] += 1
+                logger.error("Failed to add sentence '{0}': {1}".format(sentence, error))
+            else:
+                stats['facts'] += 1
+                logger.info("Added sentence '{0}' (fact_id={1})".format(sentence, fact.fact_id))
+
+def train(infile, num_workers, batch_size):
+    """Run training pipeline over csv file.
+
+    :rtype: dict
+    :return: counts of records, concepts, sentences, facts, errors and batches
+    :raise: IOError or :py:class:`csv.Error` if csv cannot be read; records read before the
+      error are saved
+
+    """
+    stats = dict.fromkeys(['records', 'concepts', 'sentences', 'facts', 'errors', 'batches'], 0)
+    # Bound queues so that reading cannot run arbitrarily far ahead of wit.ai or the database
+    sentence_queue = Queue.Queue(maxsize=num_workers * 4)
+    write_queue = Queue.Queue(maxsize=batch_size * 2)
+    read_errors = []
+
+    threads = [threading.Thread(target=read_records,
+                                args=(infile, sentence_queue, write_queue, num_workers, stats,
+                                      read_errors))]
+    threads.extend(threading.Thread(target=parse_sentences, args=(sentence_queue, write_queue))
+                   for i in range(num_workers))
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    write_batches(write_queue, num_workers, batch_size, stats)
+    for thread in threads:
+        thread.join()
+    if read_errors:
+        raise read_errors[0]
+    return stats
+
+def print_stats(stats, elapsed):
+    rate = stats['sentences'] / elapsed if elapsed else 0.0
+    print("Read {records} records; added {concepts} concepts".format(**stats))
+    print("Processed {sentences} sentences: {facts} facts, {errors} errors, "
+          "{batches} batches".format(**stats))
+    print("Elapsed {0:.2f}s; {1:.1f} sentences/s".format(elapsed, rate))
+    print("wit.ai client: {0}".format(WitClient.shared().stats()))
+    print("wit.ai cache: {0}".format(fact_manager.FactManager.wit_cache_stats()))
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -91,6 +233,10 @@ def parse_args():
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('infile', help='csv file of training data')
     parser.add_argument('-v', '--verbose', action='store_true', help='verbose output')
+    parser.add_argument('-w', '--workers', type=int, default=Config.fact_batch_wit_concurrency,
+                        help='number of concurrent wit.ai requests')
+    parser.add_argument('-b', '--batch-size', type=int, default=100,
+                        help='number of facts saved per transaction')
     
     return parser.parse_args()
 
@@ -99,14 +245,17 @@ if __name__ == '__main__':
     args = parse_args()
     if args.verbose:
         logger.setLevel(logging.DEBUG)
+    if args.workers < 1 or args.batch_size < 1:
+        raise SystemExit("--workers and --batch-size must be positive")
 
-    with open(args.infile, 'r') as f:
-        reader = csv.DictReader(f)
-        for rec in reader:
-            try:
-                add_data_from_record(rec)
-            except ValueError as ex:
-                logger.error("Failed to add data from record '{0}'".format(rec))
+    # Keep a pooled connection to wit.ai for every worker
+    Config.wit_pool_size = max(Config.wit_pool_size, args.workers)
 
-    logger.info("Done")
+    start_time = time.time()
+    try:
+        stats = train(args.infile, args.workers, args.batch_size)
+    except (IOError, csv.Error) as ex:
+        raise SystemExit("Failed to read {0}: {1}".format(args.infile, ex))
+    print_stats(stats, time.time() - start_time)
 
+    logger.info("Done")